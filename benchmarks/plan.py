@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""経路探索(RAPTOR)のベンチマーク
+
+ランダムな出発地/目的地/出発時刻の組について、RAPTORと素朴な探索(全ての便を毎回走査する)の
+探索時間を計測し、最も早い到着時刻が一致するかを確認します. 結果はJSONで標準出力に出力します.
+
+Usage:
+  python benchmarks/plan.py gtfs-jp.sqlite3 --date 20240401
+  python benchmarks/plan.py gtfs-jp.sqlite3 --date 20240401 --queries 200 --max-walk 500
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# pylint: disable=wrong-import-position
+from gtfsjpcli.client.gtfsdb import GtfsDbClient
+from gtfsjpcli.planner import raptor
+from gtfsjpcli.planner.timetable import Timetable
+
+
+def naive_earliest_arrival(
+    tt: Timetable,
+    origins: List[int],
+    destinations: List[int],
+    departure: int,
+    max_transfers: int,
+    max_walk: float,
+) -> int:
+    """ラウンドごとに全てのパターンの全ての便を先頭から走査して、最も早い到着時刻を求めます
+
+    RAPTORと同じく、便で着いた停留所/標柱からだけ徒歩で乗り換えます.
+    """
+    arrivals = [raptor.INFINITY] * len(tt.stop_ids)
+    for stop in origins:
+        arrivals[stop] = departure
+    walk(tt, origins, arrivals, max_walk)
+
+    for _ in range(max_transfers + 1):
+        previous = list(arrivals)
+        improved = []
+        for pattern in range(tt.pattern_count):
+            stops_start = tt.pattern_stops_start[pattern]
+            stop_count = tt.pattern_stops_start[pattern + 1] - stops_start
+            times_start = tt.pattern_times_start[pattern]
+            trip_count = tt.pattern_trips_start[pattern + 1] - tt.pattern_trips_start[pattern]
+            for trip in range(trip_count):
+                offset = times_start + trip * stop_count
+                boarded = False
+                for position in range(stop_count):
+                    stop = tt.pattern_stops[stops_start + position]
+                    if boarded:
+                        arrival = tt.arrivals[offset + position]
+                        if arrival < arrivals[stop]:
+                            arrivals[stop] = arrival
+                            improved.append(stop)
+                    elif previous[stop] <= tt.departures[offset + position]:
+                        boarded = True
+        walk(tt, improved, arrivals, max_walk)
+
+    return min(arrivals[x] for x in destinations)
+
+
+def walk(tt: Timetable, stops: List[int], arrivals: List[int], max_walk: float):
+    readies = {x: arrivals[x] for x in stops}
+    for stop, ready in readies.items():
+        for i in range(tt.transfers_start[stop], tt.transfers_start[stop + 1]):
+            if max_walk <= 0 or tt.transfer_meters[i] > max_walk:
+                continue
+            to_stop = tt.transfer_stops[i]
+            arrivals[to_stop] = min(arrivals[to_stop], ready + tt.transfer_seconds[i])
+
+
+def to_summary(seconds: List[float]) -> dict:
+    millis = sorted(x * 1000 for x in seconds)
+    return {
+        "mean_ms": round(statistics.mean(millis), 3),
+        "median_ms": round(statistics.median(millis), 3),
+        "p95_ms": round(millis[int(len(millis) * 0.95) - 1], 3),
+        "max_ms": round(millis[-1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="経路探索(RAPTOR)のベンチマーク")
+    parser.add_argument("source", help="GTFSソースのpath")
+    parser.add_argument("--date", required=True, help="日付 (YYYYMMDD形式)")
+    parser.add_argument("--feed", default="", help="フィードID")
+    parser.add_argument("--queries", type=int, default=100, help="探索する回数")
+    parser.add_argument("--max-transfers", type=int, default=raptor.MAX_TRANSFERS)
+    parser.add_argument(
+        "--max-walk", type=float, default=300, help="徒歩で乗り換えられる最大の距離(m)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    client = GtfsDbClient(args.source)
+    begin = time.perf_counter()
+    tt = client.find_timetable(args.date, args.feed)
+    build_seconds = time.perf_counter() - begin
+
+    served = [
+        x
+        for x in range(len(tt.stop_ids))
+        if tt.stop_patterns_start[x + 1] > tt.stop_patterns_start[x]
+    ]
+    rand = random.Random(args.seed)
+    queries = [
+        (rand.choice(served), rand.choice(served), rand.randrange(6 * 3600, 20 * 3600))
+        for _ in range(args.queries)
+    ]
+
+    raptor_seconds, naive_seconds = [], []
+    mismatches = unreachable = 0
+    for origin, destination, departure in queries:
+        begin = time.perf_counter()
+        journeys = raptor.plan(
+            tt, [origin], [destination], departure, args.max_transfers, args.max_walk
+        )
+        raptor_seconds.append(time.perf_counter() - begin)
+
+        begin = time.perf_counter()
+        expected = naive_earliest_arrival(
+            tt, [origin], [destination], departure, args.max_transfers, args.max_walk
+        )
+        naive_seconds.append(time.perf_counter() - begin)
+
+        actual = journeys[-1].arrival if journeys else raptor.INFINITY
+        if origin == destination:
+            continue
+        unreachable += actual == raptor.INFINITY
+        mismatches += actual != expected
+
+    print(
+        json.dumps(
+            {
+                "source": args.source,
+                "date": args.date,
+                "stops": len(tt.stop_ids),
+                "patterns": tt.pattern_count,
+                "trips": tt.trip_count,
+                "stop_times": len(tt.arrivals),
+                "build_seconds": round(build_seconds, 3),
+                "queries": len(queries),
+                "unreachable": unreachable,
+                "mismatches": mismatches,
+                "raptor": to_summary(raptor_seconds),
+                "naive": to_summary(naive_seconds),
+                "speedup": round(sum(naive_seconds) / sum(raptor_seconds), 1),
+            },
+            indent=2,
+        )
+    )
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""CLIの起動時間のベンチマーク
+
+`gtfsjp get agency` を別プロセスで繰り返し実行して実行時間を計測し、`python -X importtime` で
+モジュールごとの読み込み時間を集計します. 結果はJSONで標準出力に出力します.
+実行時間の中央値が予算を超えた場合や、読み込むべきでないモジュール(DBの作成でしか使わないものなど)を
+読み込んだ場合は終了コード1で終了します. lazy_import したモジュールは -X importtime に自身の名前で現れないので、
+読み込んだかどうかはコマンドを実行したプロセスの中で確認します.
+
+Usage:
+  python benchmarks/startup.py gtfs-jp.sqlite3
+  python benchmarks/startup.py gtfs-jp.sqlite3 --runs 20 --budget-ms 400 --top 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+MAIN = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "gtfsjpcli", "main.py"
+)
+FORBIDDEN_MODULES = ["halo", "numpy", "multiprocessing", "gtfsjpcli.client.loader"]
+"""get agency で読み込まないモジュール"""
+LOADED_MODULES_SCRIPT = """
+import json, runpy, sys
+main, modules = sys.argv[1], json.loads(sys.argv[2])
+sys.argv = [main, *sys.argv[3:]]
+try:
+    runpy.run_path(main, run_name="__main__")
+except SystemExit:
+    pass
+from gtfsjpcli.utils.lazy import is_loaded
+print(json.dumps([x for x in modules if is_loaded(x)]), file=sys.stderr)
+"""
+"""コマンドを実行した後に、指定したモジュールのうち読み込み済みのものを標準エラー出力の最後の行に出力するスクリプト"""
+
+
+def to_command(source: str) -> List[str]:
+    return [sys.executable, MAIN, "get", "agency", source]
+
+
+def measure_wall_seconds(source: str, runs: int) -> List[float]:
+    seconds = []
+    for _ in range(runs):
+        begin = time.perf_counter()
+        subprocess.run(to_command(source), check=True, stdout=subprocess.DEVNULL)
+        seconds.append(time.perf_counter() - begin)
+    return seconds
+
+
+def measure_import_micros(source: str) -> Dict[str, Dict[str, int]]:
+    """モジュールごとの読み込み時間(μs). self は自身だけ、cumulative は依存するモジュールを含みます"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *to_command(source)[1:]],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    micros = {}
+    for line in completed.stderr.splitlines():
+        # import time:       self [us] |  cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        micros[name.strip()] = {"self": int(own), "cumulative": int(cumulative)}
+    return micros
+
+
+def find_loaded_modules(source: str, modules: List[str]) -> List[str]:
+    """コマンドを実行したプロセスで、modulesのうち実際に読み込まれた(lazy_importの場合は属性にアクセスされた)もの"""
+    command = to_command(source)
+    completed = subprocess.run(
+        [command[0], "-c", LOADED_MODULES_SCRIPT, command[1], json.dumps(modules), *command[2:]],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return json.loads(completed.stderr.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLIの起動時間のベンチマーク")
+    parser.add_argument("source", help="GTFSソースのpath")
+    parser.add_argument("--runs", type=int, default=10, help="実行する回数")
+    parser.add_argument("--budget-ms", type=float, default=500, help="実行時間の中央値の上限(ms)")
+    parser.add_argument("--top", type=int, default=15, help="出力する読み込みの遅いモジュールの数")
+    args = parser.parse_args()
+
+    # 1回目はバイトコードのキャッシュ作成などを含むので計測しない
+    measure_wall_seconds(args.source, 1)
+    seconds = measure_wall_seconds(args.source, args.runs)
+    micros = measure_import_micros(args.source)
+
+    median_ms = statistics.median(seconds) * 1000
+    forbidden = find_loaded_modules(args.source, FORBIDDEN_MODULES)
+    slowest = sorted(micros.items(), key=lambda x: -x[1]["self"])[: args.top]
+    print(
+        json.dumps(
+            {
+                "command": " ".join(["gtfsjp", *to_command(args.source)[2:]]),
+                "runs": args.runs,
+                "median_ms": round(median_ms, 1),
+                "min_ms": round(min(seconds) * 1000, 1),
+                "max_ms": round(max(seconds) * 1000, 1),
+                "budget_ms": args.budget_ms,
+                "import_ms": round(sum(x["self"] for x in micros.values()) / 1000, 1),
+                "modules": len(micros),
+                "forbidden_imports": forbidden,
+                "slowest_imports_ms": {k: round(v["self"] / 1000, 1) for k, v in slowest},
+            },
+            indent=2,
+        )
+    )
+
+    if median_ms > args.budget_ms:
+        print(f"Over budget: {median_ms:.1f} ms > {args.budget_ms} ms", file=sys.stderr)
+        sys.exit(1)
+    if forbidden:
+        print(f"Imported modules not needed: {', '.join(forbidden)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""DB作成と問い合わせのベンチマーク
+
+規模ごとに架空のGTFS-JPデータ(gtfsjpcli.utils.synthetic)を作成し、DBの作成(drop_and_create)と
+問い合わせ(ID検索、名前検索(便あり/なし)、事業者一覧)の時間を計測します.
+同じ規模とシードからは同じデータを作成するので、バージョン間やマシン間で結果を比較できます.
+結果はJSONで標準出力(と --output のファイル)に出力します.
+
+問い合わせごとに1回あたりに実行したSQLの数も数え、規模によらず QUERY_LIMITS 以下であることを確認します.
+超えた場合(N+1問題など)は実行したSQLを出力して終了します.
+
+Usage:
+  python benchmarks/suite.py
+  python benchmarks/suite.py --scales small,medium,national --queries 200 --output before.json
+  python benchmarks/suite.py --scales medium --typed --work-dir /tmp/gtfsjp-bench
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+import sqlalchemy
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# pylint: disable=wrong-import-position
+from gtfsjpcli.client.factory import create_gtfs_client
+from gtfsjpcli.client.gtfsdb import GtfsDbClient
+from gtfsjpcli.dao.counter import assert_max_queries
+from gtfsjpcli.main import __version__
+from gtfsjpcli.utils.synthetic import PLACES, SCALES, SUFFIXES, Scale, generate_feed
+
+QUERY_LIMITS = {
+    "find_stops_by_id": 1,
+    "find_stops_by_id_with_trips": 2,
+    "search_stops_by_name": 1,
+    "search_stops_by_name_with_trips": 2,
+}
+"""問い合わせ1回で実行するSQLの上限. 便ありは停留所/標柱をまとめて便IDを取得する1回を加えた数"""
+
+
+def to_summary(seconds: List[float]) -> dict:
+    millis = sorted(x * 1000 for x in seconds)
+    return {
+        "mean_ms": round(statistics.mean(millis), 3),
+        "median_ms": round(statistics.median(millis), 3),
+        "p95_ms": round(millis[max(0, int(len(millis) * 0.95) - 1)], 3),
+        "max_ms": round(millis[-1], 3),
+    }
+
+
+def measure(query: Callable, arguments: List[tuple]) -> dict:
+    """最初の1回(マッパーの初期化などを含む)を除いて、引数ごとに1回ずつ実行した時間を集計します
+
+    名前検索などは結果を順次読み込むイテレータを返すので、全件を読み込むまでを計測します.
+    """
+    list(query(*arguments[0]))
+    seconds = []
+    for x in arguments:
+        begin = time.perf_counter()
+        list(query(*x))
+        seconds.append(time.perf_counter() - begin)
+    return to_summary(seconds)
+
+
+def count_queries(client, query: Callable, arguments: List[tuple], limit: int) -> int:
+    """引数ごとに1回ずつ実行し、1回あたりに実行したSQLの数の最大を返します
+
+    最初の1回(マッパーの初期化などを含む)は数えません. limitを超えた場合はAssertionErrorにします.
+    """
+    list(query(*arguments[0]))
+    counts = []
+    for x in arguments:
+        with assert_max_queries(client.engine, limit) as counter:
+            list(query(*x))
+        counts.append(counter.count)
+    return max(counts)
+
+
+def run_scale(name: str, scale: Scale, directory: str, args: argparse.Namespace) -> dict:
+    feed_path = os.path.join(directory, name)
+    database_path = os.path.join(directory, f"{name}.sqlite3")
+    if os.path.exists(database_path):
+        os.remove(database_path)
+
+    begin = time.perf_counter()
+    rows = generate_feed(feed_path, scale, args.seed)
+    generate_seconds = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    GtfsDbClient(database_path).drop_and_create(
+        feed_path, processes=args.processes, fast=args.fast, typed=args.typed
+    )
+    drop_and_create_seconds = time.perf_counter() - begin
+
+    client = create_gtfs_client(database_path)
+    rand = random.Random(args.seed)
+    stations = rows["stops.txt"] - scale.stops
+    stop_ids = [
+        f"{rand.randrange(stations) + 1}_{rand.randrange(2) + 1:02}" for _ in range(args.queries)
+    ]
+    words = [
+        rand.choice([x[0] for x in PLACES] + [x[0] for x in SUFFIXES if x[0]])
+        for _ in range(args.queries)
+    ]
+    queries = {
+        "find_stops_by_id": measure(client.find_stops_by_id, [(x, False) for x in stop_ids]),
+        "search_stops_by_name": measure(
+            client.search_stops_by_name, [(x, False, args.limit) for x in words]
+        ),
+        "search_stops_by_name_with_trips": measure(
+            client.search_stops_by_name, [(x, True, args.limit) for x in words]
+        ),
+        "fetch_agencies": measure(client.fetch_agencies, [() for _ in range(args.queries)]),
+    }
+    query_counts = {
+        name: count_queries(client, query, arguments, QUERY_LIMITS[name])
+        for name, query, arguments in [
+            ("find_stops_by_id", client.find_stops_by_id, [(x, False) for x in stop_ids]),
+            ("find_stops_by_id_with_trips", client.find_stops_by_id, [(x, True) for x in stop_ids]),
+            (
+                "search_stops_by_name",
+                client.search_stops_by_name,
+                [(x, False, args.limit) for x in words],
+            ),
+            (
+                "search_stops_by_name_with_trips",
+                client.search_stops_by_name,
+                [(x, True, args.limit) for x in words],
+            ),
+        ]
+    }
+    client.release()
+
+    return {
+        "scale": scale._asdict(),
+        "rows": rows,
+        "generate_seconds": round(generate_seconds, 3),
+        "drop_and_create_seconds": round(drop_and_create_seconds, 3),
+        "stop_times_per_second": round(rows["stop_times.txt"] / drop_and_create_seconds),
+        "database_bytes": os.path.getsize(database_path),
+        "queries": queries,
+        "queries_per_call": query_counts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DB作成と問い合わせのベンチマーク")
+    parser.add_argument(
+        "--scales", default="small,medium", help=f"規模 (カンマ区切り: {', '.join(SCALES)})"
+    )
+    parser.add_argument("--queries", type=int, default=100, help="問い合わせごとの実行回数")
+    parser.add_argument("--limit", type=int, default=20, help="名前検索の最大件数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=1, help="CSVを並列に読み込むプロセス数")
+    parser.add_argument("--fast", action="store_true", help="一括登録用の設定でDBを作成する")
+    parser.add_argument("--typed", action="store_true", help="型付きの形式でDBを作成する")
+    parser.add_argument(
+        "--work-dir", help="データとDBの作成先 (省略時は一時ディレクトリに作成して削除する)"
+    )
+    parser.add_argument("--output", help="結果のJSONを書き出すファイル")
+    args = parser.parse_args()
+
+    names = args.scales.split(",")
+    unknown = [x for x in names if x not in SCALES]
+    if unknown:
+        parser.error(f"Unknown scales: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.work_dir or tmp
+        results = {x: run_scale(x, SCALES[x], directory, args) for x in names}
+
+    report = json.dumps(
+        {
+            "version": __version__,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "options": {"processes": args.processes, "fast": args.fast, "typed": args.typed},
+            "scales": results,
+        },
+        indent=2,
+        ensure_ascii=False,
+    )
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,34 @@
 #!/usr/bin/env python
 
+import threading
+from typing import Dict
+
 from gtfsjpcli.client.gtfs import GtfsClient
-from gtfsjpcli.client.gtfsdb import GtfsDbClient
+from gtfsjpcli.utils.lazy import lazy_import
+
+# SQLAlchemyとエンティティの読み込みは、クライアントを作るまで遅らせる (ヘルプの表示などでは読み込まない)
+gtfsdb = lazy_import("gtfsjpcli.client.gtfsdb")
+
+_CLIENTS: Dict[str, GtfsClient] = {}
+_CLIENTS_LOCK = threading.Lock()
 
 
 def create_gtfs_client(source: str) -> GtfsClient:
-    return GtfsDbClient(source)
+    """GTFSソースへ問い合わせるためのクライアントを返します
+
+    ソースごとに読み取り専用のクライアントを1つだけ作成し、全てのスレッドで使い回します.
+    DBのエンジン(接続プール)やキャッシュ(経路探索の時刻表など)は共有し、セッションはスレッドごとに分かれます.
+    """
+    client = _CLIENTS.get(source)
+    if client is None:
+        with _CLIENTS_LOCK:
+            client = _CLIENTS.get(source)
+            if client is None:
+                client = _CLIENTS[source] = gtfsdb.GtfsDbClient(source, read_only=True)
+    return client
+
+
+def release_gtfs_clients():
+    """このスレッドで使っている接続をプールに返します. サーバーなどでリクエストごとに呼びます"""
+    for client in list(_CLIENTS.values()):
+        client.release()
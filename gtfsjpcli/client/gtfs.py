@@ -1,9 +1,12 @@
 #!/usr/bin/env python
 
-from owlmixin import OwlMixin, TList, TOption
+from typing import Dict, Optional
+
+from owlmixin import OwlMixin, TIterator, TList, TOption
 
 
 class Agency(OwlMixin):
+    feed_id: TOption[str]
     id: str
     name: str
     zip_number: TOption[str]
@@ -11,27 +14,152 @@ class Agency(OwlMixin):
 
 
 class Stop(OwlMixin):
+    feed_id: TOption[str]
     id: str
     name: str
     kana: str
     en_name: TOption[str]
     trip_ids: TOption[TList[str]]
+    distance: TOption[float]
+
+
+class Departure(OwlMixin):
+    feed_id: TOption[str]
+    stop_id: str
+    trip_id: str
+    route_id: str
+    service_date: str
+    departure_time: str
+    headsign: TOption[str]
+
+
+class JourneyLeg(OwlMixin):
+    mode: str
+    from_stop_id: str
+    to_stop_id: str
+    departure_time: str
+    arrival_time: str
+    trip_id: TOption[str]
+    route_id: TOption[str]
+    service_date: TOption[str]
+
+
+class Journey(OwlMixin):
+    departure_time: str
+    arrival_time: str
+    transfers: int
+    legs: TList[JourneyLeg]
+
+
+class Shape(OwlMixin):
+    feed_id: TOption[str]
+    id: str
+    points: int
+    bbox: TList[float]
+    """[最小の経度, 最小の緯度, 最大の経度, 最大の緯度] (GeoJSONと同じ順序)"""
+    polyline: str
+    """点の(緯度, 経度)をエンコードした文字列 (gtfsjpcli.utils.polyline, 精度は小数点以下6桁)"""
 
 
 class GtfsClient:
     def __init__(self):
         raise NotImplementedError()
 
+    def release(self):
+        raise NotImplementedError()
+
     def drop_and_create(
-        self, gtfs_dir: str, *, encoding: str = "utf_8_sig", drop_duplicates: bool = False
+        self,
+        gtfs_path: str,
+        *,
+        encoding: str = "utf_8_sig",
+        drop_duplicates: bool = False,
+        batch_size: int = 10000,
+        dedup_buffer_size: int = 500000,
+        processes: int = 1,
+        fast: bool = False,
+        vacuum: bool = False,
+        incremental: bool = False,
+        typed: bool = False,
+        snapshot: bool = False,
+        compact_shapes: bool = False,
     ):
         raise NotImplementedError()
 
-    def find_stop_by_id(self, id_: str, with_trips: bool) -> TOption[Stop]:
+    def drop_and_create_feeds(
+        self,
+        gtfs_paths: Dict[str, str],
+        *,
+        encoding: str = "utf_8_sig",
+        drop_duplicates: bool = False,
+        batch_size: int = 10000,
+        dedup_buffer_size: int = 500000,
+        processes: int = 1,
+        fast: bool = False,
+        vacuum: bool = False,
+        incremental: bool = False,
+        typed: bool = False,
+        snapshot: bool = False,
+        compact_shapes: bool = False,
+    ):
+        raise NotImplementedError()
+
+    def find_stops_by_id(
+        self, id_: str, with_trips: bool, feed_id: Optional[str] = None
+    ) -> TList[Stop]:
+        raise NotImplementedError()
+
+    def search_stops_by_name(
+        self,
+        name: str,
+        with_trips: bool,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        feed_id: Optional[str] = None,
+    ) -> TIterator[Stop]:
+        raise NotImplementedError()
+
+    def search_stops_near(
+        self,
+        lat: float,
+        lon: float,
+        radius: Optional[float],
+        with_trips: bool,
+        limit: Optional[int] = None,
+        feed_id: Optional[str] = None,
+    ) -> TList[Stop]:
+        raise NotImplementedError()
+
+    def fetch_agencies(self, feed_id: Optional[str] = None) -> TList[Agency]:
+        raise NotImplementedError()
+
+    def fetch_departures(
+        self,
+        stop_id: str,
+        date: str,
+        from_time: str,
+        limit: Optional[int] = None,
+        feed_id: Optional[str] = None,
+    ) -> TList[Departure]:
         raise NotImplementedError()
 
-    def search_stops_by_name(self, name: str, with_trips: bool) -> TList[Stop]:
+    def plan_journeys(
+        self,
+        from_stop_id: str,
+        to_stop_id: str,
+        date: str,
+        departure_time: str,
+        *,
+        max_transfers: int = 4,
+        max_walk: float = 300,
+        feed_id: str = "",
+    ) -> TList[Journey]:
         raise NotImplementedError()
 
-    def fetch_agencies(self) -> TList[Agency]:
+    def iter_shapes(
+        self,
+        shape_id: Optional[str] = None,
+        route_id: Optional[str] = None,
+        feed_id: Optional[str] = None,
+    ) -> TIterator[Shape]:
         raise NotImplementedError()
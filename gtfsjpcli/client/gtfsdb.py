@@ -1,21 +1,38 @@
 #!/usr/bin/env python
 
-import csv
 import json
 import os
 import sys
-from typing import List, Optional, Iterable
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from urllib.parse import quote
 
-from halo import Halo
 from owlmixin import TList, TOption, TIterator
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import Table, create_engine
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
-from gtfsjpcli.client.gtfs import Agency, Stop
+from gtfsjpcli.client.gtfs import Agency, Departure, Journey, JourneyLeg, Shape, Stop
 from gtfsjpcli.client.gtfs import GtfsClient
 from gtfsjpcli.dao.agency import AgencyDao
 from gtfsjpcli.dao.entities import (
-    BASE,
     StopEntity,
     StopTimeEntity,
     AgencyEntity,
@@ -29,13 +46,70 @@ from gtfsjpcli.dao.entities import (
     FareAttributeEntity,
     CalendarDateEntity,
     ShapeEntity,
+    ShapeGeometryEntity,
     FeedInfoEntity,
     TranslationEntity,
+    SourceFileEntity,
 )
+from gtfsjpcli.dao.metadata import MetadataDao
 from gtfsjpcli.dao.route import RouteDao
+from gtfsjpcli.dao.service_day import ServiceDayDao
+from gtfsjpcli.dao.shape import ShapeDao
+from gtfsjpcli.dao.schema import (
+    FAST_LOAD_PRAGMAS,
+    analyze_database,
+    create_indexes,
+    create_service_days,
+    create_shape_geometries,
+    to_shape_geometry,
+    create_stop_search_index,
+    create_stop_spatial_index,
+    create_tables,
+    drop_tables,
+    has_current_schema,
+    merge_database,
+    sqlite_pragmas,
+    vacuum_database,
+)
 from gtfsjpcli.dao.stop import StopDao
+from gtfsjpcli.dao.stop_time import StopTimeDao
 from gtfsjpcli.dao.trip import TripDao
-from gtfsjpcli.utils.dicts import fill_none_if_empty
+from gtfsjpcli.planner import raptor
+from gtfsjpcli.planner.timetable import Timetable, to_trip_times
+from gtfsjpcli.planner.transfers import MAX_WALK_METERS, to_walking_transfers
+from gtfsjpcli.dao.types import to_column_converters
+from gtfsjpcli.utils.dedup import DEFAULT_BUFFER_SIZE
+from gtfsjpcli.utils.fingerprint import Fingerprint, to_fingerprint, to_member_fingerprint
+from gtfsjpcli.utils.iterators import chunked
+from gtfsjpcli.utils.lazy import is_loaded, lazy_import
+from gtfsjpcli.utils.stopwatch import Stopwatch
+from gtfsjpcli.utils.times import (
+    DAY_SECONDS,
+    to_coordinate,
+    to_previous_date,
+    to_seconds,
+    to_time_text,
+)
+
+if TYPE_CHECKING:
+    from halo import Halo
+    from gtfsjpcli.client.loader import Batch, LoadTask, SourceFile
+    from gtfsjpcli.dao.snapshot import Snapshot
+
+# DBの作成(init)や経路探索、計測(--stats)でしか使わないモジュールは、問い合わせだけのコマンドの起動を遅くしないよう参照するまで読み込まない
+halo = lazy_import("halo")
+loader = lazy_import("gtfsjpcli.client.loader")
+multiprocessing = lazy_import("multiprocessing")
+snapshots = lazy_import("gtfsjpcli.dao.snapshot")
+stats = lazy_import("gtfsjpcli.utils.stats")
+
+DEFAULT_BATCH_SIZE = 10000
+STOP_BATCH_SIZE = 500
+"""通過する便IDをまとめて取得する停留所/標柱の数"""
+READ_ONLY_POOL_SIZE = 8
+"""読み取り専用の場合に、使い終わっても閉じずに保持する接続の数 (超えた分は使い終わったら閉じる)"""
+TIMETABLE_CACHE_SIZE = 4
+"""経路探索用の時刻表を保持する数. 超えた場合は最も長く使っていないものを捨てる"""
 
 ENTITIES = [
     {"file": "agency.txt", "clz": AgencyEntity},
@@ -56,43 +130,122 @@ ENTITIES = [
 ]
 
 
-def load_csvf(
-    fpath: str,
-    fieldnames: Optional[List[str]],
-    encoding: str = "utf-8",
-    drop_duplicates: bool = False,
-) -> Iterable[dict]:
-    """CSVファイルを読み込みます
+ENTITY_BY_FILE = {x["file"]: x["clz"] for x in ENTITIES}
+
+
+def create_stop_search_index_or_warn(engine):
+    if not create_stop_search_index(engine):
+        print(
+            "Skip to create the stop search index because SQLite doesn't support FTS5 trigram.",
+            file=sys.stderr,
+        )
+
+
+def create_stop_spatial_index_or_warn(engine):
+    if not create_stop_spatial_index(engine):
+        print(
+            "Skip to create the stop spatial index because SQLite doesn't support R*Tree.",
+            file=sys.stderr,
+        )
+
 
-    Args:
-        fpath: CSVファイルのパス
-        fieldnames: カラム名 (Noneの場合はヘッダの値を使用します)
-        encoding: エンコーディング
-        drop_duplicates: 完全重複するレコードを削除するかどうか
+DERIVED_TABLES = [
+    {
+        "name": "search index",
+        "files": ["stops.txt", "translations.txt"],
+        "create": create_stop_search_index_or_warn,
+    },
+    {
+        "name": "spatial index",
+        "files": ["stops.txt"],
+        "create": create_stop_spatial_index_or_warn,
+    },
+    {
+        "name": "service days",
+        "files": ["calendar.txt", "calendar_dates.txt"],
+        "create": create_service_days,
+    },
+]
+"""GTFSのテーブルから作成するテーブル. filesは元になるファイルで、変わった場合に作り直します"""
+
+FEED_VERSION_KEY = "feed_version"
+LOAD_OPTIONS_KEY = "load_options"
+STORAGE_KEY = "storage"
+"""時刻や緯度経度の格納形式 (text または typed)"""
+SHAPES_KEY = "shapes"
+"""描画情報の格納形式 (points: 点ごとの行、polyline: 描画IDごとにまとめたもの)"""
+SHAPES_FILE = "shapes.txt"
+
+
+def to_connect_args(connect_args: dict) -> dict:
+    """計測している(--stats)場合は、取得した行数を数える接続を作るように sqlite3.connect の引数を加えます
+
+    計測を開始するとstatsを読み込むので、読み込んでいなければ計測していない. その場合は読み込まずに返します
     """
-    with open(fpath, mode="r", encoding=encoding) as f:
-        snippet = f.read(8192)
-        f.seek(0)
+    return (
+        stats.to_connect_args(connect_args) if is_loaded("gtfsjpcli.utils.stats") else connect_args
+    )
 
-        dialect = csv.Sniffer().sniff(snippet)
-        dialect.skipinitialspace = True
-        it = csv.DictReader(f, fieldnames=fieldnames, dialect=dialect)
 
-        if not drop_duplicates:
-            yield from it
-        else:
-            sorted_list = sorted(it, key=lambda x: json.dumps(x, ensure_ascii=False))
-            previous: str = None
-            for current in sorted_list:
-                if drop_duplicates and current == previous:
-                    continue
-                yield current
-                previous = current
+def to_source_fingerprint(source: "SourceFile", previous: Optional[Fingerprint]) -> Fingerprint:
+    return (
+        to_fingerprint(source.path, previous)
+        if source.member is None
+        else to_member_fingerprint(source.path, source.member, previous)
+    )
+
+
+def to_load_options(
+    encoding: str, drop_duplicates: bool, typed: bool, compact_shapes: bool = False
+) -> str:
+    """読み込みの設定. 前回と異なる場合は差分更新せずに作り直します"""
+    return json.dumps(
+        {
+            "encoding": encoding,
+            "drop_duplicates": drop_duplicates,
+            "storage": "typed" if typed else "text",
+            "shapes": "polyline" if compact_shapes else "points",
+        },
+        sort_keys=True,
+    )
+
+
+def to_converters(file_name: str, typed: bool) -> Dict[str, Callable]:
+    return to_column_converters(ENTITY_BY_FILE[file_name].__table__, typed)
+
+
+def to_stored_tables(file_name: str) -> List[Table]:
+    """ファイルのレコードを格納するテーブル. 描画情報は描画IDごとにまとめたテーブルにもあります"""
+    table = ENTITY_BY_FILE[file_name].__table__
+    return [table, ShapeGeometryEntity.__table__] if file_name == SHAPES_FILE else [table]
+
+
+def to_changed_files(
+    fingerprints: Dict[str, Fingerprint], previous: Dict[str, Fingerprint]
+) -> Set[str]:
+    """前回から内容が変わったファイル. 追加/削除されたファイルを含みます"""
+    return {
+        k for k, v in fingerprints.items() if k not in previous or previous[k].sha256 != v.sha256
+    } | (previous.keys() - fingerprints.keys())
+
+
+def to_table(file_name: str) -> str:
+    return str(ENTITY_BY_FILE[file_name].__table__)
+
+
+def to_insert_statement(table: str, columns: Tuple[str, ...]) -> str:
+    """カラム順のタプルをパラメータにするINSERT文"""
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+
+def to_rate(count: int, elapsed_sec: float) -> str:
+    return f"{count / elapsed_sec:,.0f} rows/sec" if elapsed_sec > 0 else "- rows/sec"
 
 
 def to_agency(record: AgencyEntity) -> "Agency":
     return Agency.from_dict(
         {
+            "feed_id": record.feed_id or None,
             "id": record.agency_id,
             "name": record.agency_name,
             "zip_number": record.jp.agency_zip_number if record.jp else None,
@@ -105,22 +258,78 @@ def to_agencies(records: Iterable[AgencyEntity]) -> "TList[Agency]":
     return TList(records).map(to_agency)
 
 
-def to_stop(record: StopEntity, with_trips: bool) -> "Stop":
+def to_stop(
+    record: StopEntity, trip_ids: Optional[List[str]] = None, distance: Optional[float] = None
+) -> "Stop":
     return Stop.from_dict(
         {
+            "feed_id": record.feed_id or None,
             "id": record.stop_id,
             "name": record.translation_ja.translation,
             "kana": record.translation_kana.translation,
             "en_name": record.translation_en.translation,
-            "trip_ids": TIterator(record.stop_times).map(lambda x: x.trip_id).uniq().to_list()
-            if with_trips
-            else None,
+            "trip_ids": trip_ids,
+            "distance": None if distance is None else round(distance, 1),
+        }
+    )
+
+
+def to_shape(record: ShapeGeometryEntity) -> "Shape":
+    return Shape.from_dict(
+        {
+            "feed_id": record.feed_id or None,
+            "id": record.shape_id,
+            "points": record.points,
+            "bbox": [record.min_lon, record.min_lat, record.max_lon, record.max_lat],
+            "polyline": record.polyline,
         }
     )
 
 
-def to_stops(records: Iterable[StopEntity], with_trips: bool) -> "TIterator[Stop]":
-    return TIterator(records).map(lambda x: to_stop(x, with_trips))
+def to_coordinates(points: Iterable[tuple]) -> List[Tuple[float, float]]:
+    """(フィードID, 描画ID, 緯度, 経度) の点を (緯度, 経度) の実数にします"""
+    return [(to_coordinate(x[2]), to_coordinate(x[3])) for x in points]
+
+
+def to_departure(service_date: str, stop_time: StopTimeEntity, trip: TripEntity) -> "Departure":
+    return Departure.from_dict(
+        {
+            "feed_id": stop_time.feed_id or None,
+            "stop_id": stop_time.stop_id,
+            "trip_id": stop_time.trip_id,
+            "route_id": trip.route_id,
+            "service_date": service_date,
+            "departure_time": stop_time.departure_time,
+            "headsign": stop_time.stop_headsign or trip.trip_headsign,
+        }
+    )
+
+
+def to_journey_leg(timetable: Timetable, leg: raptor.Leg) -> "JourneyLeg":
+    transit = leg.trip != raptor.WALK
+    return JourneyLeg.from_dict(
+        {
+            "mode": "transit" if transit else "walk",
+            "from_stop_id": timetable.stop_ids[leg.from_stop],
+            "to_stop_id": timetable.stop_ids[leg.to_stop],
+            "departure_time": to_time_text(leg.departure),
+            "arrival_time": to_time_text(leg.arrival),
+            "trip_id": timetable.trip_ids[leg.trip] if transit else None,
+            "route_id": timetable.trip_route_ids[leg.trip] if transit else None,
+            "service_date": timetable.trip_service_dates[leg.trip] if transit else None,
+        }
+    )
+
+
+def to_journey(timetable: Timetable, journey: raptor.Journey) -> "Journey":
+    return Journey.from_dict(
+        {
+            "departure_time": to_time_text(journey.departure),
+            "arrival_time": to_time_text(journey.arrival),
+            "transfers": journey.transfers,
+            "legs": [to_journey_leg(timetable, x) for x in journey.legs],
+        }
+    )
 
 
 class GtfsDbClient(GtfsClient):
@@ -128,67 +337,794 @@ class GtfsDbClient(GtfsClient):
     session: Session
 
     agency: AgencyDao
+    metadata: MetadataDao
     stop: StopDao
+    stop_time: StopTimeDao
     route: RouteDao
+    service_day: ServiceDayDao
     trip: TripDao
 
-    def __init__(self, source: str = "gtfs-jp.sqlite3"):
+    def __init__(self, source: str = "gtfs-jp.sqlite3", read_only: bool = False):
+        """
+        Args:
+            source: DBファイルのパス. 空の場合はメモリ上のDB
+            read_only: 読み取り専用で開くかどうか. DBファイルが存在しない場合は作成せずにエラーになります.
+                読み取り専用の場合は複数のスレッドから使えます (セッションはスレッドごと、接続はプールから取得)
+        """
         # pylint: disable=super-init-not-called
-        connection_string = source or ":memory:"
-        self.engine = create_engine(f"sqlite:///{connection_string}", echo=False)
-        self.session: Session = sessionmaker(bind=self.engine)()
+        self.database_path: Optional[str] = source or None
+        self.session: Union[Session, scoped_session]
+        if read_only and source:
+            # 接続はスレッド間で受け渡すのでスレッドのチェックは外す. 1つの接続を同時に使うスレッドは常に1つだけ
+            self.engine = create_engine(
+                f"sqlite:///file:{quote(source)}?mode=ro&uri=true",
+                echo=False,
+                poolclass=QueuePool,
+                pool_size=READ_ONLY_POOL_SIZE,
+                max_overflow=-1,
+                connect_args=to_connect_args({"check_same_thread": False}),
+            )
+            self.session = scoped_session(sessionmaker(bind=self.engine))
+        else:
+            self.engine = create_engine(
+                f"sqlite:///{source or ':memory:'}",
+                echo=False,
+                connect_args=to_connect_args({}),
+            )
+            self.session = sessionmaker(bind=self.engine)()
 
         self.agency = AgencyDao(self.session)
+        self.metadata = MetadataDao(self.session)
         self.route = RouteDao(self.session)
+        self.service_day = ServiceDayDao(self.session)
+        self.shape = ShapeDao(self.session)
         self.stop = StopDao(self.session)
+        self.stop_time = StopTimeDao(self.session)
         self.trip = TripDao(self.session)
+        self.timetables: "OrderedDict[Tuple[str, str], Timetable]" = OrderedDict()
+        self.timetables_lock = threading.Lock()
+        self.snapshot: Optional["Snapshot"] = None
+
+    def release(self):
+        """このスレッドの読み取り中のトランザクションを終了し、接続をプールに返します. キャッシュは保持します"""
+        if isinstance(self.session, scoped_session):
+            self.session.remove()
+        else:
+            self.session.rollback()
 
     def drop_and_create(
-        self, gtfs_dir: str, *, encoding: str = "utf_8_sig", drop_duplicates: bool = False
+        self,
+        gtfs_path: str,
+        *,
+        encoding: str = "utf_8_sig",
+        drop_duplicates: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        dedup_buffer_size: int = DEFAULT_BUFFER_SIZE,
+        processes: int = 1,
+        fast: bool = False,
+        vacuum: bool = False,
+        incremental: bool = False,
+        typed: bool = False,
+        snapshot: bool = False,
+        compact_shapes: bool = False,
     ):
-        self.__drop_database()
-        self.__create_database_with_inserts(gtfs_dir, encoding, drop_duplicates)
+        """GTFSデータからデータベースを作り直します
 
-    def find_stop_by_id(self, id_: str, with_trips: bool) -> TOption[Stop]:
-        return TOption(self.stop.find_by_id(id_)).map(lambda x: to_stop(x, with_trips))
+        Args:
+            gtfs_path: GTFSディレクトリまたはzipファイル. zipファイルは展開せずに読み込みます
+            encoding: CSVファイルのエンコーディング
+            drop_duplicates: 完全重複するレコードを削除するかどうか
+            batch_size: 1回のinsertでまとめて登録するレコード数
+            dedup_buffer_size: 重複削除でメモリ上に保持する最大件数
+            processes: CSVを読み込むプロセス数. 2以上の場合は並列に読み込み、このプロセスが書き込みます
+            fast: 一括登録用の設定で作成するかどうか.
+                主キーなしでテーブルを作成し、ジャーナルと同期を無効にして登録した後、
+                インデックスをまとめて作成してANALYZEします. 途中で失敗した場合のDBは使えません
+            vacuum: 最後にVACUUMするかどうか
+            incremental: 前回読み込んだ時から内容が変わったファイルのテーブルだけを入れ替えるかどうか.
+                前回の読み込み情報がない場合や、読み込みの設定が変わった場合、
+                複数のフィードから作成したDB(init feeds)の場合は全て作り直します
+            typed: 時刻を整数(秒)、緯度経度を実数で格納するかどうか. 取得する時は文字列に戻します
+            snapshot: 通過時刻情報のスナップショット(NumPy配列)をDBファイルの隣に書き出すかどうか.
+                書き出さない場合、既存のスナップショットは削除します
+            compact_shapes: 描画情報を描画IDごとに1行(エンコードした座標列)にまとめて格納するかどうか.
+                点ごとの行は削除します. 削除した分だけDBを小さくするにはvacuumも指定してください
+        """
+        sources = loader.find_source_files(gtfs_path, list(ENTITY_BY_FILE))
+        load_options = to_load_options(encoding, drop_duplicates, typed, compact_shapes)
 
-    def search_stops_by_name(self, name: str, with_trips: bool) -> TIterator[Stop]:
-        return to_stops(self.stop.search_by_name(name), with_trips)
+        stopwatch = Stopwatch()
+        with stopwatch.measure("fingerprint"):
+            previous = self.__find_previous_fingerprints(load_options) if incremental else None
+            if previous is not None and set(self.metadata.feed_ids()) - {""}:
+                # init feeds で作成したDBは、フィードIDなしの行だけを入れ替えると他のフィードが残るため
+                print("Reload all files because the database has multiple feeds.", file=sys.stderr)
+                previous = None
+            fingerprints = {
+                k: to_source_fingerprint(v, (previous or {}).get(k)) for k, v in sources.items()
+            }
+        # Noneは全てのファイルが対象
+        targets: Optional[Set[str]] = (
+            None if previous is None else to_changed_files(fingerprints, previous)
+        )
 
-    def fetch_agencies(self) -> TList[Agency]:
-        return to_agencies(self.agency.all())
+        if targets is None:
+            with stopwatch.measure("drop"):
+                drop_tables(self.engine)
+            with stopwatch.measure("create"):
+                create_tables(self.engine, with_keys=not fast, typed=typed)
+        elif targets:
+            print(f"Reload only changed files: {', '.join(sorted(targets))}", file=sys.stderr)
+        else:
+            print("Skip to load because all files are unchanged.", file=sys.stderr)
+            # 更新日時だけが変わったファイルのため、次回ハッシュ値の計算を省略できるように保存する
+            self.__save_metadata(fingerprints, load_options)
+            self.__update_snapshot(stopwatch, snapshot)
+            return
 
-    def __create_database_with_inserts(self, gtfs_dir: str, encoding: str, drop_duplicates: bool):
-        BASE.metadata.create_all(self.engine)
-        for e in [x for x in ENTITIES if os.path.exists(os.path.join(gtfs_dir, x["file"]))]:
-            self.__insert_records(gtfs_dir, e["clz"], e["file"], encoding, drop_duplicates)
-        self.session.commit()
+        tasks = [
+            task
+            for file_name, source in sources.items()
+            if targets is None or file_name in targets
+            for task in loader.to_tasks(
+                file_name,
+                source,
+                encoding=encoding,
+                drop_duplicates=drop_duplicates,
+                dedup_buffer_size=dedup_buffer_size,
+                batch_size=batch_size,
+                converters=to_converters(file_name, typed),
+            )
+        ]
+
+        self.session.close()
+        with sqlite_pragmas(self.engine, FAST_LOAD_PRAGMAS if fast else {}):
+            if targets:
+                with stopwatch.measure("truncate"):
+                    for file_name in targets:
+                        for table in to_stored_tables(file_name):
+                            self.session.execute(table.delete().where(table.c.feed_id == ""))
+            with stopwatch.measure("insert"):
+                self.__insert_all(tasks, processes)
+            if fast and targets is None:
+                with stopwatch.measure("index"):
+                    create_indexes(self.engine)
+            self.__create_derived_tables(stopwatch, targets, compact_shapes)
+            if fast:
+                with stopwatch.measure("analyze"):
+                    analyze_database(self.engine)
+
+        if vacuum:
+            with stopwatch.measure("vacuum"):
+                vacuum_database(self.engine)
 
-    def __drop_database(self):
-        BASE.metadata.drop_all(self.engine)
+        self.__save_metadata(fingerprints, load_options)
+        self.__update_snapshot(stopwatch, snapshot)
+        stats.add_phases(stopwatch.laps)
+        print(stopwatch.to_table(), file=sys.stderr)
 
-    # pylint: disable=too-many-arguments
-    def __insert_records(
-        self, gtfs_dir: str, clz, file_name: str, encoding: str, drop_duplicates: bool
+    def drop_and_create_feeds(
+        self,
+        gtfs_paths: Dict[str, str],
+        *,
+        encoding: str = "utf_8_sig",
+        drop_duplicates: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        dedup_buffer_size: int = DEFAULT_BUFFER_SIZE,
+        processes: int = 1,
+        fast: bool = False,
+        vacuum: bool = False,
+        incremental: bool = False,
+        typed: bool = False,
+        snapshot: bool = False,
+        compact_shapes: bool = False,
     ):
-        spinner = Halo(text=f"{file_name:<20} -- Loading", spinner="dots", stream=sys.stderr)
+        """複数のフィードからデータベースを作り直します. レコードはフィードIDで区別します
+
+        フィードごとに別プロセスで一時的なSQLiteファイル(ステージング)へ読み込み、
+        読み込み終わったものから順にATTACHしてINSERT ... SELECTでまとめて追加します.
+
+        Args:
+            gtfs_paths: フィードIDと、GTFSディレクトリまたはzipファイル
+            encoding: CSVファイルのエンコーディング
+            drop_duplicates: 完全重複するレコードを削除するかどうか
+            batch_size: 1回のinsertでまとめて登録するレコード数
+            dedup_buffer_size: 重複削除でメモリ上に保持する最大件数
+            processes: 同時に読み込むフィードの数
+            fast: 一括登録用の設定で作成するかどうか (drop_and_createと同じ)
+            vacuum: 最後にVACUUMするかどうか
+            incremental: 前回読み込んだ時から内容が変わったフィードだけを入れ替えるかどうか.
+                指定しなかったフィードはそのまま残します
+            typed: 時刻を整数(秒)、緯度経度を実数で格納するかどうか (drop_and_createと同じ)
+            snapshot: 通過時刻情報のスナップショットを書き出すかどうか (drop_and_createと同じ)
+            compact_shapes: 描画情報を描画IDごとに1行にまとめて格納するかどうか (drop_and_createと同じ)
+        """
+        load_options = to_load_options(encoding, drop_duplicates, typed, compact_shapes)
+
+        stopwatch = Stopwatch()
+        previous = self.__find_previous_fingerprints_by_feed(load_options) if incremental else None
+        if previous is None:
+            with stopwatch.measure("drop"):
+                drop_tables(self.engine)
+            with stopwatch.measure("create"):
+                create_tables(self.engine, with_keys=not fast, typed=typed)
+
+        self.session.close()
+        with tempfile.TemporaryDirectory() as staging_dir, sqlite_pragmas(
+            self.engine, FAST_LOAD_PRAGMAS if fast else {}
+        ):
+            tasks = [
+                StagingTask(
+                    feed_id,
+                    path,
+                    os.path.join(staging_dir, f"{i}.sqlite3"),
+                    encoding,
+                    drop_duplicates,
+                    dedup_buffer_size,
+                    batch_size,
+                    typed,
+                    None if previous is None else previous.get(feed_id, {}),
+                    stats.is_enabled(),
+                )
+                for i, (feed_id, path) in enumerate(gtfs_paths.items())
+            ]
+            with stopwatch.measure("stage and merge"):
+                results = self.__stage_and_merge(tasks, processes, replace=previous is not None)
+
+            if fast and previous is None:
+                with stopwatch.measure("index"):
+                    create_indexes(self.engine)
+            if previous is None or any(x.counts is not None for x in results):
+                self.__create_derived_tables(stopwatch, None, compact_shapes)
+                if fast:
+                    with stopwatch.measure("analyze"):
+                        analyze_database(self.engine)
+
+        if vacuum:
+            with stopwatch.measure("vacuum"):
+                vacuum_database(self.engine)
+
+        for result in results:
+            self.__save_metadata(result.fingerprints, load_options, result.feed_id)
+        self.__update_snapshot(stopwatch, snapshot)
+        stats.add_phases(stopwatch.laps)
+        print(stopwatch.to_table(), file=sys.stderr)
+
+    def load_staging(
+        self,
+        sources: Dict[str, "SourceFile"],
+        *,
+        feed_id: str,
+        encoding: str,
+        drop_duplicates: bool,
+        dedup_buffer_size: int,
+        batch_size: int,
+        typed: bool,
+    ) -> Dict[str, int]:
+        """ステージング用の空のデータベースに1フィードを読み込みます. 主キーやインデックスは作成しません
+
+        Returns:
+            ファイル名と登録したレコード数
+        """
+        create_tables(self.engine, with_keys=False, typed=typed)
+
+        counts: Dict[str, int] = {}
+        self.session.close()
+        with sqlite_pragmas(self.engine, FAST_LOAD_PRAGMAS):
+            for file_name, source in sources.items():
+                for task in loader.to_tasks(
+                    file_name,
+                    source,
+                    encoding=encoding,
+                    drop_duplicates=drop_duplicates,
+                    dedup_buffer_size=dedup_buffer_size,
+                    batch_size=batch_size,
+                    feed_id=feed_id,
+                    converters=to_converters(file_name, typed),
+                ):
+                    label = loader.to_label(task)
+                    for batch in loader.load_batches(task):
+                        self.__insert_batch(label, file_name, batch)
+                        counts[file_name] = counts.get(file_name, 0) + len(batch.rows)
+            self.session.commit()
+        self.session.close()
+        return counts
+
+    def find_stops_by_id(
+        self, id_: str, with_trips: bool, feed_id: Optional[str] = None
+    ) -> TList[Stop]:
+        """IDで検索します. feed_idを指定しない場合は全てのフィードから検索します"""
+        return self.__to_stops(self.stop.search_by_id(id_, feed_id).all(), with_trips)
+
+    def search_stops_by_name(
+        self,
+        name: str,
+        with_trips: bool,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        feed_id: Optional[str] = None,
+    ) -> TIterator[Stop]:
+        """名称で検索します. カーソルから読み込んだ分だけ順次変換するので、全件をメモリに展開しません"""
+        records = self.stop.search_by_name(name, limit, offset, feed_id).yield_per(STOP_BATCH_SIZE)
+        return TIterator(chunked(records, STOP_BATCH_SIZE)).flat_map(
+            lambda records: self.__to_stops(records, with_trips)
+        )
+
+    def search_stops_near(
+        self,
+        lat: float,
+        lon: float,
+        radius: Optional[float],
+        with_trips: bool,
+        limit: Optional[int] = None,
+        feed_id: Optional[str] = None,
+    ) -> TList[Stop]:
+        """位置から近い順に検索します. radiusを指定しない場合はlimit件の最寄りを返します"""
+        found = self.stop.search_near(lat, lon, radius, limit, feed_id)
+        return self.__to_stops([x for x, _ in found], with_trips, [d for _, d in found])
+
+    def iter_shapes(
+        self,
+        shape_id: Optional[str] = None,
+        route_id: Optional[str] = None,
+        feed_id: Optional[str] = None,
+    ) -> TIterator[Shape]:
+        """描画情報を描画IDごとに、フィードIDと描画IDの順に少しずつ読み込みます
+
+        描画IDごとにまとめて格納したDB(compact_shapes)はその行をそのまま返します.
+        それ以外のDBは点を描画順序の順に読み込み、描画IDごとにまとめてから返します.
+
+        Args:
+            shape_id: 描画ID (Noneの場合は全て)
+            route_id: 経路ID. 経路の便が使う描画情報に絞り込みます (Noneの場合は全て)
+            feed_id: フィードID (Noneの場合は全てのフィード)
+        """
+        if self.metadata.find_property(SHAPES_KEY) == "polyline":
+            return TIterator(self.shape.geometries(shape_id, route_id, feed_id)).map(to_shape)
+
+        points = self.shape.points(shape_id, route_id, feed_id)
+        return TIterator(
+            to_shape(ShapeGeometryEntity(**to_shape_geometry(*key, to_coordinates(group))))
+            for key, group in groupby(points, key=itemgetter(0, 1))
+        )
+
+    def fetch_agencies(self, feed_id: Optional[str] = None) -> TList[Agency]:
+        return to_agencies(self.agency.all(feed_id))
+
+    def fetch_departures(
+        self,
+        stop_id: str,
+        date: str,
+        from_time: str,
+        limit: Optional[int] = None,
+        feed_id: Optional[str] = None,
+    ) -> TList[Departure]:
+        """停留所/標柱を指定日時以降に出発する便を、出発時刻の早い順に取得します
+
+        前日が運行日で24時以降(25:10:00など)に出発する便も含みます.
+
+        Args:
+            stop_id: 停留所/標柱ID
+            date: 日付 (YYYYMMDD形式)
+            from_time: この時刻以降に出発する便が対象 (HH:MM:SS形式)
+            limit: 最大件数 (Noneの場合は全件)
+            feed_id: フィードID (Noneの場合は全てのフィード)
+        """
+        typed = self.__is_typed()
+        from_seconds = to_seconds(from_time)
+
+        departures = []
+        for service_date, offset in ((date, 0), (to_previous_date(date), DAY_SECONDS)):
+            service_ids_by_feed = self.service_day.service_ids_on(service_date, feed_id)
+            for feed_id_, service_ids in service_ids_by_feed.items():
+                departures.extend(
+                    (seconds - offset, service_date, st, trip)
+                    for seconds, st, trip in self.stop_time.search_departures(
+                        stop_id, feed_id_, service_ids, from_seconds + offset, limit, typed
+                    )
+                )
+
+        departures.sort(key=lambda x: (x[0], x[2].feed_id, x[2].trip_id))
+        return TList(departures[:limit]).map(lambda x: to_departure(x[1], x[2], x[3]))
+
+    def plan_journeys(
+        self,
+        from_stop_id: str,
+        to_stop_id: str,
+        date: str,
+        departure_time: str,
+        *,
+        max_transfers: int = raptor.MAX_TRANSFERS,
+        max_walk: float = 300,
+        feed_id: str = "",
+    ) -> TList[Journey]:
+        """出発時刻以降に出発して目的地に最も早く着く経路を、乗り換え回数ごとに探索します (RAPTOR)
+
+        停留所/標柱IDに親駅IDを指定した場合は、属するいずれかの停留所/標柱を出発地(目的地)にします.
+        時刻表は日付とフィードごとに作成して使い回します. 徒歩の乗り換えは探索ごとにmax_walkで絞り込みます.
+
+        Args:
+            from_stop_id: 出発地の停留所/標柱ID
+            to_stop_id: 目的地の停留所/標柱ID
+            date: 日付 (YYYYMMDD形式)
+            departure_time: 出発時刻 (HH:MM:SS形式)
+            max_transfers: 最大乗り換え回数
+            max_walk: 徒歩で乗り換えられる最大の距離(m). MAX_WALK_METERS まで
+            feed_id: フィードID
+
+        Raises:
+            ValueError: 停留所/標柱IDが存在しない場合や、max_walkが MAX_WALK_METERS を超える場合
+        """
+        if max_walk > MAX_WALK_METERS:
+            raise ValueError(f"max_walk must be {MAX_WALK_METERS} or less: {max_walk:g}")
+        timetable = self.find_timetable(date, feed_id)
+        origins = timetable.to_stop_indexes(from_stop_id)
+        destinations = timetable.to_stop_indexes(to_stop_id)
+        for stop_id, indexes in ((from_stop_id, origins), (to_stop_id, destinations)):
+            if not indexes:
+                feed = f" in the feed {feed_id}" if feed_id else ""
+                raise ValueError(f"Stop {stop_id} is not found{feed}.")
+
+        journeys = raptor.plan(
+            timetable, origins, destinations, to_seconds(departure_time), max_transfers, max_walk
+        )
+        return TList(journeys).map(lambda x: to_journey(timetable, x))
+
+    def find_timetable(self, date: str, feed_id: str = "") -> Timetable:
+        """経路探索用の時刻表. 前日の運行日で24時以降も走る便と、MAX_WALK_METERS までの徒歩の乗り換えを含みます
+
+        作成した時刻表は、最近使ったものから TIMETABLE_CACHE_SIZE 個までキャッシュします.
+        """
+        key = (date, feed_id)
+        # 同じ時刻表を複数のスレッドで同時に作らないようにする
+        with self.timetables_lock:
+            if key in self.timetables:
+                self.timetables.move_to_end(key)
+            else:
+                self.timetables[key] = self.__build_timetable(date, feed_id)
+                while len(self.timetables) > TIMETABLE_CACHE_SIZE:
+                    self.timetables.popitem(last=False)
+            return self.timetables[key]
+
+    def __build_timetable(self, date: str, feed_id: str) -> Timetable:
+        stop_ids = []
+        coordinates = []
+        stations: Dict[str, List[int]] = {}
+        for index, (stop_id, lat, lon, parent_station) in enumerate(
+            self.stop.iter_locations(feed_id)
+        ):
+            stop_ids.append(stop_id)
+            coordinates.append(
+                None if lat is None or lon is None else (to_coordinate(lat), to_coordinate(lon))
+            )
+            if parent_station:
+                stations.setdefault(parent_station, []).append(index)
+        stop_index = {x: i for i, x in enumerate(stop_ids)}
+
+        trips = []
+        for service_date, offset in ((date, 0), (to_previous_date(date), DAY_SECONDS)):
+            service_ids = self.service_day.service_ids_on(service_date, feed_id).get(feed_id)
+            if service_ids:
+                rows = (self.__open_snapshot() or self.stop_time).iter_timetable_rows(
+                    feed_id, service_ids
+                )
+                trips.extend(to_trip_times(rows, stop_index, service_date, offset))
+
+        transfers = to_walking_transfers(coordinates, MAX_WALK_METERS)
+        return Timetable(stop_ids, trips, transfers, stations)
+
+    def __open_snapshot(self) -> Optional["Snapshot"]:
+        """DBと同じ内容のスナップショットがあれば開きます. 一度開いたものを使い回します"""
+        if self.snapshot is None and self.database_path:
+            self.snapshot = snapshots.open_snapshot(self.database_path)
+        return self.snapshot
+
+    def __update_snapshot(self, stopwatch: Stopwatch, snapshot: bool):
+        """DBを更新した後に、スナップショットを書き出し(または古いものを削除し)ます"""
+        self.snapshot = None
+        if not self.database_path:
+            return
+        if not snapshot:
+            snapshots.remove_snapshot(self.database_path)
+            return
+        with stopwatch.measure("snapshot"):
+            self.session.close()
+            snapshots.write_snapshot(self.engine, self.database_path)
+
+    def __is_typed(self) -> bool:
+        """時刻や緯度経度を型付き形式で格納したDBかどうか. 全てのフィードは同じ形式です"""
+        feed_ids = self.metadata.feed_ids()
+        return bool(feed_ids) and self.metadata.find_property(STORAGE_KEY, feed_ids[0]) == "typed"
+
+    def __to_stops(
+        self,
+        records: List[StopEntity],
+        with_trips: bool,
+        distances: Optional[List[float]] = None,
+    ) -> TList[Stop]:
+        """停留所/標柱をまとめて変換します. 通過する便IDはまとめて1回で取得します"""
+        trip_ids_by_stop = (
+            self.stop_time.trip_ids_by_stop_ids(
+                {x.stop_id for x in records},
+                records[0].feed_id if len({x.feed_id for x in records}) == 1 else None,
+            )
+            if with_trips and records
+            else {}
+        )
+        return TList(zip(records, distances or [None] * len(records))).map(
+            lambda x: to_stop(
+                x[0],
+                trip_ids_by_stop.get((x[0].feed_id, x[0].stop_id), []) if with_trips else None,
+                x[1],
+            )
+        )
+
+    def __stage_and_merge(
+        self, tasks: List["StagingTask"], processes: int, replace: bool
+    ) -> List["StagingResult"]:
+        """フィードを複数プロセスでステージングに読み込み、読み込み終わったものから順にこのプロセスで追加します
+
+        Args:
+            tasks: タスク
+            processes: プロセス数
+            replace: 追加する前に同じフィードIDのレコードを削除するかどうか
+        """
+        spinner = halo.Halo(
+            text=f"Loading {len(tasks)} feeds in {processes} processes",
+            spinner="dots",
+            stream=sys.stderr,
+        )
+        results = []
 
         spinner.start()
-        dicts = [
-            fill_none_if_empty(x)
-            for x in load_csvf(
-                os.path.join(gtfs_dir, file_name),
-                fieldnames=None,
-                encoding=encoding,
-                drop_duplicates=drop_duplicates,
+        with multiprocessing.Pool(max(min(processes, len(tasks)), 1)) as pool:
+            for result in pool.imap_unordered(stage_feed, tasks):
+                results.append(result)
+                if result.stats:
+                    stats.get_stats().merge(result.stats)
+                if result.counts is None:
+                    spinner.info(f"{result.feed_id:<20} -- Skip because all files are unchanged")
+                    spinner.start()
+                    continue
+
+                begin = time.perf_counter()
+                if replace:
+                    for table in [x for f in ENTITY_BY_FILE for x in to_stored_tables(f)]:
+                        self.session.execute(
+                            table.delete().where(table.c.feed_id == result.feed_id)
+                        )
+                    self.session.commit()
+                    self.session.close()
+                merge_database(
+                    self.engine, result.staging_path, [e["clz"].__table__ for e in ENTITIES]
+                )
+                os.remove(result.staging_path)
+
+                count = sum(result.counts.values())
+                spinner.succeed(
+                    f"{result.feed_id:<20} -- Insert {count} records"
+                    f" (load {result.elapsed:.3f} sec, merge {time.perf_counter() - begin:.3f} sec)"
+                )
+                spinner.start()
+        spinner.stop()
+        return results
+
+    def __find_previous_fingerprints(
+        self, load_options: str, feed_id: str = ""
+    ) -> Optional[Dict[str, Fingerprint]]:
+        """前回読み込んだファイルのFingerprint. 差分更新できない場合はNone"""
+        if not has_current_schema(self.engine):
+            return None
+        if self.metadata.find_property(LOAD_OPTIONS_KEY) != load_options:
+            return None
+        return {
+            k: Fingerprint(v.size, v.mtime_ns, v.sha256)
+            for k, v in self.metadata.source_files(feed_id).items()
+        }
+
+    def __find_previous_fingerprints_by_feed(
+        self, load_options: str
+    ) -> Optional[Dict[str, Dict[str, Fingerprint]]]:
+        """前回読み込んだフィードごとのファイルのFingerprint. 差分更新できない場合はNone"""
+        if not has_current_schema(self.engine):
+            return None
+        if self.metadata.find_property(LOAD_OPTIONS_KEY) != load_options:
+            return None
+        return {
+            feed_id: self.__find_previous_fingerprints(load_options, feed_id)
+            for feed_id in self.metadata.feed_ids()
+        }
+
+    def __create_derived_tables(
+        self, stopwatch: Stopwatch, targets: Optional[Set[str]], compact_shapes: bool
+    ):
+        """GTFSのテーブルから作成するテーブル(検索用など)を、元になるファイルが変わった場合だけ作り直します"""
+        for derived in DERIVED_TABLES:
+            if targets is None or targets & set(derived["files"]):
+                with stopwatch.measure(derived["name"]):
+                    derived["create"](self.engine)
+        if compact_shapes and (targets is None or SHAPES_FILE in targets):
+            with stopwatch.measure("shape geometries"):
+                create_shape_geometries(self.engine)
+
+    def __save_metadata(
+        self, fingerprints: Dict[str, Fingerprint], load_options: str, feed_id: str = ""
+    ):
+        loaded_at = datetime.now().isoformat(timespec="seconds")
+        for file_name in set(self.metadata.source_files(feed_id)) - set(fingerprints):
+            self.metadata.delete_source_file(file_name, feed_id)
+        for file_name, fingerprint in fingerprints.items():
+            self.metadata.save_source_file(
+                SourceFileEntity(
+                    feed_id=feed_id,
+                    file_name=file_name,
+                    loaded_at=loaded_at,
+                    **fingerprint._asdict(),
+                )
             )
-        ]
+
+        previous_version = self.metadata.find_property(FEED_VERSION_KEY, feed_id)
+        feed_version = self.metadata.feed_version(feed_id)
+        if previous_version != feed_version:
+            print(
+                f"{feed_id + ' ' if feed_id else ''}feed_version: {previous_version} -> {feed_version}",
+                file=sys.stderr,
+            )
+
+        self.metadata.save_property(FEED_VERSION_KEY, feed_version, feed_id)
+        self.metadata.save_property(LOAD_OPTIONS_KEY, load_options)
+        self.metadata.save_property(STORAGE_KEY, json.loads(load_options)["storage"])
+        self.metadata.save_property(SHAPES_KEY, json.loads(load_options)["shapes"])
+        self.session.commit()
+
+    def __insert_all(self, tasks: Iterable["LoadTask"], processes: int):
+        if processes > 1:
+            self.__insert_records_in_parallel(tasks, processes)
+        else:
+            for task in tasks:
+                self.__insert_records(task)
+        self.session.commit()
+
+    def __insert_records(self, task: "LoadTask"):
+        """CSVをストリームで読み込み、batch_size件ずつトランザクション内でinsertする
+
+        ファイル全体をメモリに展開しないので、ファイルサイズに関わらずメモリ使用量は一定になります
+        """
+        spinner = halo.Halo(
+            text=f"{task.file_name:<20} -- Loading", spinner="dots", stream=sys.stderr
+        )
+        progress = InsertProgress(task.file_name)
+
+        label = loader.to_label(task)
+        spinner.start()
+        for batch in loader.load_batches(task):
+            self.__insert_batch(label, task.file_name, batch)
+            progress.add(len(batch.rows))
+            spinner.text = progress.to_message()
+        progress.finish(spinner)
+
+    def __insert_records_in_parallel(self, tasks: Iterable["LoadTask"], processes: int):
+        """CSVを複数プロセスで読み込み、届いたレコードから順にこのプロセスだけでinsertする
+
+        SQLiteへの書き込みは1コネクションに限定し、CSVのデコードや正規化を並列化します
+        """
+        tasks = list(tasks)
+        remaining_tasks: Dict[str, int] = dict(TList(tasks).count_by(lambda x: x.file_name))
+        progresses = {x: InsertProgress(x) for x in remaining_tasks}
+        labels = {x.file_name: loader.to_label(x) for x in tasks}
+        spinner = halo.Halo(
+            text=f"Loading in {processes} processes", spinner="dots", stream=sys.stderr
+        )
+
+        spinner.start()
+        for file_name, batch in loader.load_batches_in_parallel(tasks, processes):
+            progress = progresses[file_name]
+            if batch is not None:
+                self.__insert_batch(labels[file_name], file_name, batch)
+                progress.add(len(batch.rows))
+                spinner.text = progress.to_message()
+                continue
+
+            remaining_tasks[file_name] -= 1
+            if remaining_tasks[file_name] == 0:
+                progress.finish(spinner)
+                spinner.start()
         spinner.stop()
 
-        if dicts:
-            spinner.start(f"{file_name:<20} -- Insert {len(dicts)} records to `{clz.__table__}`")
-            # スピード優先でcoreを使う
-            self.session.execute(clz.__table__.insert(), dicts)
-            spinner.succeed()
+    def __insert_batch(self, label: str, file_name: str, batch: "Batch"):
+        # スピード優先で、カラム順のタプルをそのままexecutemanyのパラメータにする
+        with stats.measure(label, "insert"):
+            self.session.connection().execute(
+                to_insert_statement(to_table(file_name), batch.columns), batch.rows
+            )
+        stats.add_rows(label, len(batch.rows))
+
+
+class StagingTask(NamedTuple):
+    """1フィードをステージング用のSQLiteファイルに読み込むタスク"""
+
+    feed_id: str
+    gtfs_path: str
+    staging_path: str
+    encoding: str
+    drop_duplicates: bool
+    dedup_buffer_size: int
+    batch_size: int
+    typed: bool
+    previous: Optional[Dict[str, Fingerprint]] = None
+    """前回読み込んだ時のFingerprint. 指定した場合、内容が変わっていなければ読み込みません"""
+    collect_stats: bool = False
+    """計測して(--stats)、結果を返すかどうか"""
+
+
+class StagingResult(NamedTuple):
+    feed_id: str
+    staging_path: str
+    fingerprints: Dict[str, Fingerprint]
+    counts: Optional[Dict[str, int]]
+    """ファイル名と登録したレコード数. 読み込みを省略した場合はNone"""
+    elapsed: float
+    stats: Optional[dict] = None
+    """計測した場合の、ワーカープロセスでの計測結果 (Stats.take)"""
+
+
+def stage_feed(task: StagingTask) -> StagingResult:
+    """1フィードをステージング用のSQLiteファイルに読み込みます. ワーカープロセスで実行します"""
+    begin = time.perf_counter()
+    if task.collect_stats:
+        stats.enable()
+    sources = loader.find_source_files(task.gtfs_path, list(ENTITY_BY_FILE))
+    fingerprints = {
+        k: to_source_fingerprint(v, (task.previous or {}).get(k)) for k, v in sources.items()
+    }
+    if task.previous is not None and not to_changed_files(fingerprints, task.previous):
+        return StagingResult(task.feed_id, task.staging_path, fingerprints, None, 0)
+
+    counts = GtfsDbClient(task.staging_path).load_staging(
+        sources,
+        feed_id=task.feed_id,
+        encoding=task.encoding,
+        drop_duplicates=task.drop_duplicates,
+        dedup_buffer_size=task.dedup_buffer_size,
+        batch_size=task.batch_size,
+        typed=task.typed,
+    )
+    return StagingResult(
+        task.feed_id,
+        task.staging_path,
+        fingerprints,
+        counts,
+        time.perf_counter() - begin,
+        stats.get_stats().take() if task.collect_stats else None,
+    )
+
+
+class InsertProgress:
+    """1ファイルのinsert件数と速度"""
+
+    file_name: str
+    count: int
+    begin: float
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.count = 0
+        self.begin = time.perf_counter()
+
+    def add(self, count: int):
+        self.count += count
+
+    def to_message(self) -> str:
+        return (
+            f"{self.file_name:<20} -- Inserted {self.count} records to `{to_table(self.file_name)}`"
+            f" ({to_rate(self.count, time.perf_counter() - self.begin)})"
+        )
+
+    def finish(self, spinner: "Halo"):
+        if self.count:
+            spinner.succeed(
+                f"{self.file_name:<20} -- Insert {self.count} records to `{to_table(self.file_name)}`"
+                f" ({to_rate(self.count, time.perf_counter() - self.begin)})"
+            )
         else:
-            spinner.warn(f"{file_name:<19} -- Skip to insert because there are no records.")
+            spinner.warn(f"{self.file_name:<19} -- Skip to insert because there are no records.")
@@ -0,0 +1,455 @@
+#!/usr/bin/env python
+"""GTFSのCSVファイルを読み込んでinsert用のレコードにする処理
+
+GTFSディレクトリとzipファイルのどちらからも読み込めます. zipファイルは展開せずにストリームで読み込みます.
+ヘッダはファイルごとに1回だけテーブルのカラムと対応づけ(Schema)、各行はカラム順のタプルにします.
+テーブルにないカラムはこの時点で捨てるので、行ごとに辞書を作ることはありません.
+複数プロセスで並列に読み込む場合も、DBへの書き込みは呼び出し元(単一のwriter)が行います.
+"""
+
+import csv
+import io
+import multiprocessing
+import os
+import posixpath
+import queue
+import time
+import zipfile
+from collections import Counter
+from contextlib import contextmanager
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from gtfsjpcli.dao.types import to_nullable_text
+from gtfsjpcli.utils import dedup, stats
+from gtfsjpcli.utils.dedup import DEFAULT_BUFFER_SIZE
+from gtfsjpcli.utils.iterators import chunked
+
+SNIFF_BYTES = 8192
+"""区切り文字などの判定に使うファイル先頭のバイト数"""
+CHUNK_BYTES = 32 * 1024 * 1024
+"""並列読み込み時に1ファイルを分割するサイズ"""
+CHUNKABLE_FILES = ["stop_times.txt", "shapes.txt"]
+"""分割して並列に読み込むファイル. 改行を含む値が出現しない前提のファイルに限定しています"""
+FEED_ID_COLUMN = "feed_id"
+"""CSVの値ではなく、タスクのフィードIDを格納するカラム"""
+
+
+class SourceFile(NamedTuple):
+    """GTFSのCSVファイルの場所"""
+
+    path: str
+    """CSVファイル、またはCSVファイルを含むzipファイルのパス"""
+    member: Optional[str] = None
+    """zipファイル内のパス. Noneの場合はpathがCSVファイル"""
+
+
+def find_source_files(gtfs_path: str, file_names: List[str]) -> Dict[str, SourceFile]:
+    """GTFSディレクトリまたはzipファイルから、読み込むCSVファイルを探します
+
+    zipファイルの場合は、最も多くのCSVファイルを含むディレクトリ(直下とは限らない)を対象にします.
+
+    Args:
+        gtfs_path: GTFSディレクトリまたはzipファイルのパス
+        file_names: 探すファイル名 (ex: stops.txt)
+
+    Returns:
+        ファイル名とその場所. 存在しないファイルは含みません
+    """
+    if not zipfile.is_zipfile(gtfs_path):
+        return {
+            x: SourceFile(os.path.join(gtfs_path, x))
+            for x in file_names
+            if os.path.exists(os.path.join(gtfs_path, x))
+        }
+
+    with zipfile.ZipFile(gtfs_path) as z:
+        members = [
+            x for x in z.namelist() if not x.endswith("/") and posixpath.basename(x) in file_names
+        ]
+    if not members:
+        return {}
+
+    directory, _ = Counter(posixpath.dirname(x) for x in members).most_common(1)[0]
+    return {
+        posixpath.basename(x): SourceFile(gtfs_path, x)
+        for x in members
+        if posixpath.dirname(x) == directory
+    }
+
+
+@contextmanager
+def open_binary(path: str, member: Optional[str] = None) -> Iterator[BinaryIO]:
+    """CSVファイルをバイナリで開きます. 先頭をpeekできるようにバッファリングしたストリームを返します
+
+    Args:
+        path: CSVファイル、またはCSVファイルを含むzipファイルのパス
+        member: zipファイル内のパス. Noneの場合はpathをそのまま開きます
+    """
+    if member is None:
+        with open(path, mode="rb") as f:
+            yield f
+        return
+
+    with zipfile.ZipFile(path) as z, z.open(member) as f:
+        yield io.BufferedReader(f, buffer_size=SNIFF_BYTES)
+
+
+class LoadTask(NamedTuple):
+    """1プロセスが担当する読み込み範囲"""
+
+    file_name: str
+    path: str
+    encoding: str
+    drop_duplicates: bool
+    dedup_buffer_size: int
+    batch_size: int
+    start: Optional[int] = None
+    """読み込み開始位置(byte). Noneの場合はファイル全体"""
+    end: Optional[int] = None
+    """読み込み終了位置(byte)"""
+    member: Optional[str] = None
+    """zipファイル内のパス. Noneの場合はpathがCSVファイル"""
+    feed_id: str = ""
+    """全レコードに設定するフィードID"""
+    converters: Optional[Dict[str, Callable[[str], Any]]] = None
+    """テーブルの全カラムの名前と、CSVの値を格納する値に変換する関数. CSVのカラムのうちここにないものは捨てます.
+    Noneの場合はCSVの全カラムを、空文字をNoneにして格納します"""
+
+
+class Schema(NamedTuple):
+    """CSVのヘッダとテーブルのカラムの対応"""
+
+    columns: Tuple[str, ...]
+    """insertするカラム. 最後はフィードID"""
+    indexes: Tuple[int, ...]
+    """フィードID以外の各カラムの、CSVでの位置"""
+    converters: Tuple[Callable[[str], Any], ...]
+    """フィードID以外の各カラムの値を変換する関数"""
+
+
+class Batch(NamedTuple):
+    """insertするレコードのまとまり"""
+
+    columns: Tuple[str, ...]
+    """レコードの各値に対応するカラム"""
+    rows: List[tuple]
+
+
+def compile_schema(header: List[str], converters: Optional[Dict[str, Callable]]) -> Schema:
+    """CSVのヘッダをテーブルのカラムと対応づけます. テーブルにないカラムとフィードIDのカラムは除きます
+
+    Args:
+        header: CSVのヘッダ
+        converters: テーブルの全カラムの名前と値を変換する関数. Noneの場合はヘッダの全カラムを使います
+
+    Usage:
+
+        >>> schema = compile_schema(["stop_name", "memo", "stop_id"], {"stop_id": str, "stop_name": str, "feed_id": str})
+        >>> schema.columns, schema.indexes
+        (('stop_id', 'stop_name', 'feed_id'), (2, 0))
+    """
+    positions = {name: i for i, name in enumerate(header)}
+    names = list(positions) if converters is None else [x for x in converters if x in positions]
+    names = [x for x in names if x != FEED_ID_COLUMN]
+    return Schema(
+        columns=(*names, FEED_ID_COLUMN),
+        indexes=tuple(positions[x] for x in names),
+        converters=tuple((converters or {}).get(x, to_nullable_text) for x in names),
+    )
+
+
+def read_csvf(
+    fpath: str,
+    encoding: str = "utf-8",
+    drop_duplicates: bool = False,
+    dedup_buffer_size: int = DEFAULT_BUFFER_SIZE,
+    member: Optional[str] = None,
+    label: Optional[str] = None,
+) -> Iterator[List[str]]:
+    """CSVファイルを読み込みます. 最初にヘッダ、続けて各行の値のリストを返します. 空行は除きます
+
+    区切り文字はバッファリングした先頭部分から判定するので、シークできないストリーム(zip内のファイル)も読み込めます.
+
+    Args:
+        fpath: CSVファイル、またはCSVファイルを含むzipファイルのパス
+        encoding: エンコーディング
+        drop_duplicates: 完全重複する行を削除するかどうか (出現順は維持されます)
+        dedup_buffer_size: 重複削除でメモリ上に保持する最大件数. 超えた分は一時ファイルで処理します
+        member: zipファイル内のパス. Noneの場合はfpathがCSVファイル
+        label: 計測結果(--stats)に記録するファイル名. Noneの場合は記録しません
+    """
+    with open_binary(fpath, member) as f:
+        with stats.measure(label, "sniff"):
+            snippet = f.peek(SNIFF_BYTES)[:SNIFF_BYTES].decode(encoding, errors="ignore")
+            dialect = csv.Sniffer().sniff(snippet)
+            dialect.skipinitialspace = True
+
+        with io.TextIOWrapper(f, encoding=encoding, newline="") as text:
+            it = (x for x in csv.reader(text, dialect=dialect) if x)
+            header = next(it, None)
+            if header is None:
+                return
+            yield header
+            if not drop_duplicates:
+                yield from stats.timed(it, label, "parse")
+            else:
+                yield from stats.timed(
+                    dedup.drop_duplicates(it, buffer_size=dedup_buffer_size), label, "parse"
+                )
+
+
+def read_csvf_range(
+    fpath: str, encoding: str, start: int, end: int, label: Optional[str] = None
+) -> Iterator[List[str]]:
+    """CSVファイルの[start, end)の範囲を読み込みます. 最初にファイル先頭のヘッダ、続けて各行の値のリストを返します
+
+    区切り文字とカラム名はファイル先頭から判定します. start/endは行頭である必要があります.
+
+    Args:
+        fpath: CSVファイルのパス
+        encoding: エンコーディング
+        start: 読み込み開始位置(byte)
+        end: 読み込み終了位置(byte)
+        label: 計測結果(--stats)に記録するファイル名. Noneの場合は記録しません
+    """
+    with open(fpath, mode="rb") as f:
+        with stats.measure(label, "sniff"):
+            snippet = f.read(SNIFF_BYTES).decode(encoding, errors="ignore")
+            dialect = csv.Sniffer().sniff(snippet)
+            dialect.skipinitialspace = True
+
+            f.seek(0)
+            header = f.readline().decode(encoding)
+            yield next(csv.reader([header], dialect=dialect))
+
+        f.seek(start)
+        with io.TextIOWrapper(
+            io.BufferedReader(RangeReader(f, end - start)), encoding=encoding, newline=""
+        ) as text:
+            yield from stats.timed(
+                (x for x in csv.reader(text, dialect=dialect) if x), label, "parse"
+            )
+
+
+def split_csvf(fpath: str, chunk_bytes: int = CHUNK_BYTES) -> List[Tuple[int, int]]:
+    """CSVファイルのヘッダを除いた部分を、行の途中で分断しないようにおよそchunk_bytesごとの範囲に分割します
+
+    Args:
+        fpath: CSVファイルのパス
+        chunk_bytes: 1範囲あたりのおよそのサイズ(byte)
+    """
+    size = os.path.getsize(fpath)
+    with open(fpath, mode="rb") as f:
+        f.readline()
+        start = f.tell()
+
+        ranges = []
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+        return ranges
+
+
+def to_tasks(
+    file_name: str,
+    source: SourceFile,
+    *,
+    encoding: str,
+    drop_duplicates: bool,
+    dedup_buffer_size: int,
+    batch_size: int,
+    feed_id: str = "",
+    converters: Optional[Dict[str, Callable]] = None,
+) -> List[LoadTask]:
+    """1ファイルを読み込むためのタスクを作成します. 分割可能なファイルは範囲ごとのタスクにします"""
+    task = LoadTask(
+        file_name,
+        source.path,
+        encoding,
+        drop_duplicates,
+        dedup_buffer_size,
+        batch_size,
+        member=source.member,
+        feed_id=feed_id,
+        converters=converters,
+    )
+    # 重複削除はファイル全体で行う必要があるので分割しない
+    # zip内のファイルはシークできないので分割しない
+    if file_name not in CHUNKABLE_FILES or drop_duplicates or source.member is not None:
+        return [task]
+    return [task._replace(start=s, end=e) for s, e in split_csvf(source.path)]
+
+
+def load_batches(task: LoadTask) -> Iterator[Batch]:
+    """タスクの範囲を読み込み、insert用のレコード(フィードID付き)をbatch_size件ずつ返します"""
+    label = to_label(task) if stats.is_enabled() else None
+    rows = (
+        read_csvf(
+            task.path,
+            encoding=task.encoding,
+            drop_duplicates=task.drop_duplicates,
+            dedup_buffer_size=task.dedup_buffer_size,
+            member=task.member,
+            label=label,
+        )
+        if task.start is None
+        else read_csvf_range(task.path, task.encoding, task.start, task.end, label)
+    )
+    header = next(rows, None)
+    if header is None:
+        return
+
+    schema = compile_schema(header, task.converters)
+    records = (
+        to_records(rows, schema, task.feed_id)
+        if label is None
+        else to_records_with_stats(rows, schema, task.feed_id, label)
+    )
+    for chunk in chunked(records, task.batch_size):
+        yield Batch(schema.columns, chunk)
+
+
+def to_label(task: LoadTask) -> str:
+    """計測結果(--stats)に記録するファイル名. フィードIDがある場合は `フィードID/ファイル名`"""
+    return f"{task.feed_id}/{task.file_name}" if task.feed_id else task.file_name
+
+
+def to_converter(schema: Schema, feed_id: str) -> Callable[[List[str]], tuple]:
+    """CSVの1行を、schemaのカラム順に変換した値とフィードIDのタプルにする関数を作ります
+
+    値が足りない行は空文字として変換し、余分な値は捨てます.
+
+    Usage:
+
+        >>> schema = compile_schema(["stop_id", "stop_name"], {"stop_name": str.upper, "stop_id": int})
+        >>> convert = to_converter(schema, "f1")
+        >>> convert(["1", "a"]), convert(["2"])
+        (('A', 1, 'f1'), ('', 2, 'f1'))
+    """
+    pairs = tuple(zip(schema.indexes, schema.converters))
+    width = max(schema.indexes, default=-1) + 1
+
+    def convert(row: List[str]) -> tuple:
+        if len(row) < width:
+            row = row + [""] * (width - len(row))
+        return (*[f(row[i]) for i, f in pairs], feed_id)
+
+    return convert
+
+
+def to_records(rows: Iterable[List[str]], schema: Schema, feed_id: str) -> Iterator[tuple]:
+    """CSVの各行をinsert用のレコード(タプル)にします"""
+    return map(to_converter(schema, feed_id), rows)
+
+
+def to_records_with_stats(
+    rows: Iterable[List[str]], schema: Schema, feed_id: str, label: str
+) -> Iterator[tuple]:
+    """to_records と同じ変換を、時間(convert)を計測しながら行います"""
+    convert = to_converter(schema, feed_id)
+    seconds = 0.0
+    try:
+        for row in rows:
+            begin = time.perf_counter()
+            record = convert(row)
+            seconds += time.perf_counter() - begin
+            yield record
+    finally:
+        stats.add_time(label, "convert", seconds)
+
+
+def load_batches_in_parallel(
+    tasks: List[LoadTask], processes: int
+) -> Iterator[Tuple[str, Optional[Batch]]]:
+    """タスクを複数プロセスで読み込み、読み込んだ順に (ファイル名, Batch(カラム名, 行)) を返します
+
+    1タスクを読み終えるたびに (ファイル名, None) を返します.
+    計測している(--stats)場合は、各プロセスでの読み込みの計測結果をこのプロセスの計測結果に加えます.
+    キューの大きさを制限しているので、書き込みが追いつかない場合は読み込み側が待ちます.
+
+    Args:
+        tasks: タスク
+        processes: プロセス数
+    """
+    batch_queue = multiprocessing.Queue(maxsize=processes * 4)
+    with multiprocessing.Pool(
+        processes, initializer=init_worker, initargs=(batch_queue, stats.is_enabled())
+    ) as pool:
+        result = pool.map_async(produce_batches, tasks)
+
+        remaining = len(tasks)
+        while remaining:
+            try:
+                file_name, payload = batch_queue.get(timeout=1)
+            except queue.Empty:
+                if result.ready():
+                    result.get()
+                    raise RuntimeError("A loader process exited without finishing its task.")
+                continue
+
+            if isinstance(payload, Exception):
+                raise payload
+            if isinstance(payload, dict):
+                stats.get_stats().merge(payload)
+                continue
+            if payload is None:
+                remaining -= 1
+            yield file_name, payload
+
+
+WORKER_QUEUE: Optional[multiprocessing.Queue] = None
+"""読み込み用プロセスで、読み込んだBatchを親プロセスに渡すキュー"""
+
+
+def init_worker(batch_queue: multiprocessing.Queue, collect_stats: bool):
+    """読み込み用プロセスの初期化処理. キューを設定し、必要なら計測を有効にします"""
+    global WORKER_QUEUE  # pylint: disable=global-statement
+    WORKER_QUEUE = batch_queue
+    if collect_stats:
+        stats.enable()
+
+
+def produce_batches(task: LoadTask):
+    """読み込み用プロセスでタスクを読み込み、Batch・計測結果・終了(None)・例外をキューに入れます"""
+    try:
+        for batch in load_batches(task):
+            WORKER_QUEUE.put((task.file_name, batch))
+        if stats.is_enabled():
+            WORKER_QUEUE.put((task.file_name, stats.get_stats().take()))
+        WORKER_QUEUE.put((task.file_name, None))
+    except Exception as e:  # pylint: disable=broad-except
+        WORKER_QUEUE.put((task.file_name, e))
+
+
+class RangeReader(io.RawIOBase):
+    """ファイルの現在位置からsize byteだけを読み込むストリーム"""
+
+    def __init__(self, f, size: int):
+        super().__init__()
+        self.f = f
+        self.remaining = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self.remaining <= 0:
+            return 0
+        data = self.f.read(min(len(b), self.remaining))
+        b[: len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
@@ -0,0 +1,29 @@
+"""DAOが発行するクエリの実行計画を表示します
+
+Usage:
+  {cli} [<source>]
+  {cli} (-h | --help)
+
+Options:
+  <source>               GTFSソースのpath [default: gtfs-jp.sqlite3]
+  -h --help              Show this screen.
+
+Examples:
+  {cli} tmp.sqlite3
+"""
+from owlmixin import OwlMixin
+
+from gtfsjpcli.client.gtfsdb import GtfsDbClient
+from gtfsjpcli.dao.explain import explain, to_targets
+
+
+class Args(OwlMixin):
+    source: str = "gtfs-jp.sqlite3"
+
+
+def run(args: Args):
+    session = GtfsDbClient(args.source).session
+    for name, query in to_targets(session).items():
+        print(name)
+        for step in explain(session, query):
+            print(f"  {step}")
@@ -1,24 +1,27 @@
 """事業者情報(詳細含む)の取得
 
 Usage:
-  {cli} [<source>]
+  {cli} [--feed <feed_id>] [<source>]
   {cli} (-h | --help)
 
 Options:
+  --feed <feed_id>       フィードIDで絞り込む (省略時は全てのフィード)
   <source>               GTFSソースのpath [default: gtfs-jp.sqlite3]
   -h --help              Show this screen.
 
 Examples:
   {cli} tmp.sqlite3
+  {cli} --feed toei
 """
-from owlmixin import OwlMixin
+from owlmixin import OwlMixin, TOption
 
 from gtfsjpcli.services.agency import fetch_agencies
 
 
 class Args(OwlMixin):
+    feed: TOption[str]
     source: str = "gtfs-jp.sqlite3"
 
 
 def run(args: Args):
-    print(fetch_agencies(args.source).to_pretty_json())
+    print(fetch_agencies(args.source, args.feed.get()).to_pretty_json())
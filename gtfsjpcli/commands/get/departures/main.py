@@ -0,0 +1,62 @@
+"""停留所/標柱の出発便(時刻表)の取得
+
+Usage:
+  {cli} --stop <stop_id> --date <date> [--from <time>] [--limit <limit>] [--feed <feed_id>] [--ndjson] [<source>]
+  {cli} (-h | --help)
+
+Options:
+  --stop <stop_id>       出発する停留所/標柱のID
+  --date <date>          日付 (YYYYMMDD形式). 前日の運行日で24時以降に出発する便も含む
+  --from <time>          この時刻以降に出発する便を返す (HH:MM または HH:MM:SS形式) [default: 00:00]
+  --limit <limit>        最大件数 [default: 10]
+  --feed <feed_id>       フィードIDで絞り込む (省略時は全てのフィード)
+  --ndjson               1行に1件ずつJSON(NDJSON)で出力する
+  <source>               GTFSソースのpath [default: gtfs-jp.sqlite3]
+  -h --help              Show this screen.
+
+Examples:
+  {cli} --stop 100_10 --date 20240401 --from 08:30
+  {cli} --stop 100_10 --date 20240401 --from 23:00 --limit 5 tmp.sqlite3
+"""
+
+import sys
+
+from owlmixin import OwlMixin, TOption
+
+from gtfsjpcli.services.departure import fetch_departures
+from gtfsjpcli.utils.times import is_date_text, to_time_option
+
+
+class Args(OwlMixin):
+    stop: str
+    date: str
+    from_time: str = "00:00"
+    limit: int = 10
+    feed: TOption[str]
+    ndjson: bool
+    source: str = "gtfs-jp.sqlite3"
+
+    @classmethod
+    def from_dict(cls, d: dict, **kwargs) -> "Args":
+        # fromは予約語で属性名にできないので、--fromをfrom_timeに割り当てる
+        return super().from_dict(
+            {("--from-time" if k == "--from" else k): v for k, v in d.items()}, **kwargs
+        )
+
+
+def run(args: Args):
+    if not is_date_text(args.date):
+        sys.exit(f"--date must be in the form of YYYYMMDD: {args.date}")
+    from_time = to_time_option(args.from_time)
+    if from_time is None:
+        sys.exit(f"--from must be in the form of HH:MM or HH:MM:SS: {args.from_time}")
+
+    document = fetch_departures(
+        args.source, args.stop, args.date, from_time, args.limit, args.feed.get()
+    )
+    if args.ndjson:
+        for departure in document.departures:
+            print(departure.to_json(), flush=True)
+        return
+
+    print(document.to_pretty_json())
@@ -0,0 +1,47 @@
+"""描画情報(shapes)のGeoJSONでの取得
+
+描画IDごとにLineStringのFeatureにして、全件をメモリ上に展開せずに順次出力します.
+DBを --compact-shapes で作成した場合は、描画IDごとにまとめた行からそのまま出力します.
+
+Usage:
+  {cli} [--id <shape_id> | --route <route_id>] [--feed <feed_id>] [--ndjson] [<source>]
+  {cli} (-h | --help)
+
+Options:
+  --id <shape_id>        取得する描画ID (--id/--routeを省略した場合は全て)
+  --route <route_id>     経路の便が使う描画情報を取得する
+  --feed <feed_id>       フィードIDで絞り込む (省略時は全てのフィード)
+  --ndjson               1行に1件ずつFeatureを出力する (省略時はFeatureCollection)
+  <source>               GTFSソースのpath [default: gtfs-jp.sqlite3]
+  -h --help              Show this screen.
+
+Examples:
+  {cli} --id S_1001
+  {cli} --route 20002_200243_1 tmp.sqlite3
+  {cli} --feed toei --ndjson > shapes.geojsonl
+  {cli} > shapes.geojson
+"""
+
+import sys
+
+from owlmixin import OwlMixin, TOption
+
+from gtfsjpcli.services.shape import iter_features, to_json, write_feature_collection
+
+
+class Args(OwlMixin):
+    id: TOption[str]
+    route: TOption[str]
+    feed: TOption[str]
+    ndjson: bool
+    source: str = "gtfs-jp.sqlite3"
+
+
+def run(args: Args):
+    features = iter_features(args.source, args.id.get(), args.route.get(), args.feed.get())
+    if args.ndjson:
+        for feature in features:
+            print(to_json(feature), flush=True)
+        return
+
+    write_feature_collection(features, sys.stdout)
@@ -1,36 +1,116 @@
 """停留所/標柱情報の取得
 
 Usage:
-  {cli} --id <id> [--trips] [<source>]
-  {cli} (-w <word> | --word <word>) [--trips] [<source>]
+  {cli} --id <id> [--feed <feed_id>] [--trips] [--ndjson] [<source>]
+  {cli} (-w <word> | --word <word>) [--feed <feed_id>] [--trips] [--limit <limit>] [--offset <offset>] [--ndjson] [<source>]
+  {cli} --near <near> [--radius <radius>] [--feed <feed_id>] [--trips] [--limit <limit>] [--ndjson] [<source>]
   {cli} (-h | --help)
 
 Options:
   --id <id>              検索するStopのID
-  -w, --word <word>      検索するStop名称(部分一致)
+  -w, --word <word>      検索するStop名称(日本語/読み仮名/英語の部分一致). 一致度の高い順に返す
+  --near <near>          検索する位置 (緯度,経度). 近い順に返す
+  --radius <radius>      位置で検索する場合の半径(m). 省略時は最寄りの--limit件(省略時は10件)
+  --feed <feed_id>       フィードIDで絞り込む (省略時は全てのフィード)
   --trips                trips情報を付与するかどうか
+  --limit <limit>        名称/位置で検索する場合の最大件数
+  --offset <offset>      名称で検索する場合に読み飛ばす件数 [default: 0]
+  --ndjson               1行に1件ずつJSON(NDJSON)で、取得した順に出力する
   <source>               GTFSソースのpath [default: gtfs-jp.sqlite3]
   -h --help              Show this screen.
 
 Examples:
   {cli} --id C03_1
   {cli} -w 東京 tmp.sqlite3
+  {cli} -w 東京駅 --limit 10
+  {cli} -w 東京 --limit 100 --offset 200 --ndjson
+  {cli} --id C03_1 --feed toei
+  {cli} --near 35.681236,139.767125 --radius 500
+  {cli} --near 35.681236,139.767125 --limit 3 --trips
 """
+import sys
+from typing import Tuple
+
 from owlmixin import OwlMixin, TOption
 
-from gtfsjpcli.services.stop import search_by_word, search_by_id
+from gtfsjpcli.services.stop import (
+    iter_by_id,
+    iter_by_location,
+    iter_by_word,
+    search_by_id,
+    search_by_location,
+    search_by_word,
+)
+from gtfsjpcli.utils.geo import to_location_option
+
+DEFAULT_NEAR_LIMIT = 10
 
 
 class Args(OwlMixin):
     id: TOption[str]
     word: TOption[str]
+    near: TOption[str]
+    radius: TOption[float]
+    feed: TOption[str]
     trips: bool
+    limit: TOption[int]
+    offset: int = 0
+    ndjson: bool
     source: str = "gtfs-jp.sqlite3"
 
 
+def to_location(value: str) -> Tuple[float, float]:
+    """緯度と経度をカンマで区切った文字列を (緯度, 経度) にします"""
+    location = to_location_option(value)
+    if location is None:
+        sys.exit(f"--near must be in the form of LAT,LON within range: {value}")
+    return location
+
+
 def run(args: Args):
+    near_limit = args.limit.get() if args.radius.any() else args.limit.get_or(DEFAULT_NEAR_LIMIT)
+
+    if args.ndjson:
+        stops = (
+            args.id.map(lambda id_: iter_by_id(args.source, id_, args.trips, args.feed.get())).get()
+            or args.word.map(
+                lambda word: iter_by_word(
+                    args.source, word, args.trips, args.limit.get(), args.offset, args.feed.get()
+                )
+            ).get()
+            or args.near.map(
+                lambda near: iter_by_location(
+                    args.source,
+                    *to_location(near),
+                    args.radius.get(),
+                    args.trips,
+                    near_limit,
+                    args.feed.get(),
+                )
+            ).get()
+        )
+        for stop in stops:
+            print(stop.to_json(), flush=True)
+        return
+
     print(
-        args.id.map(lambda id_: search_by_id(args.source, id_, args.trips).to_pretty_json()).get()
-        or args.word.map(lambda word: search_by_word(args.source, word, args.trips).to_pretty_json()).get()
+        args.id.map(
+            lambda id_: search_by_id(args.source, id_, args.trips, args.feed.get()).to_pretty_json()
+        ).get()
+        or args.word.map(
+            lambda word: search_by_word(
+                args.source, word, args.trips, args.limit.get(), args.offset, args.feed.get()
+            ).to_pretty_json()
+        ).get()
+        or args.near.map(
+            lambda near: search_by_location(
+                args.source,
+                *to_location(near),
+                args.radius.get(),
+                args.trips,
+                near_limit,
+                args.feed.get(),
+            ).to_pretty_json()
+        ).get()
         or "到達しない領域に到達しました。実装に問題があります"
     )
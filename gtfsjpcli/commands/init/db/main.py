@@ -1,29 +1,74 @@
 """GTFSデータからデータベースを作成します
 
 Usage:
-  {cli} <gtfs_dir> [-d | --drop-duplicates] [<dst>]
+  {cli} <gtfs_path> [options] [<dst>]
   {cli} (-h | --help)
 
 Options:
-  <gtfs_dir>                        GTFSディレクトリ
+  <gtfs_path>                       GTFSディレクトリまたはzipファイル
   -d --drop-duplicates              完全一致するレコードを削除する
+  --dedup-buffer <dedup_buffer>     重複削除でメモリ上に保持する最大件数 (超えた分は一時ファイルで処理) [default: 500000]
+  --batch-size <batch_size>         1回のinsertでまとめて登録するレコード数 [default: 10000]
+  -p --processes <processes>        CSVを並列に読み込むプロセス数 (0はCPU数) [default: 1]
+  --fast                            一括登録用の設定で作成する (インデックスは最後に作成、ジャーナル無効)
+  --vacuum                          作成後にVACUUMする
+  --typed                           時刻を整数(秒)、緯度経度を実数で格納する (範囲検索できる. 読み込み時の表記は正規化される)
+  --snapshot                        通過時刻情報のスナップショット(NumPy配列)をDBファイルの隣に書き出す (経路探索が速くなる)
+  --compact-shapes                  描画情報を描画IDごとに1行(エンコードした座標列)にまとめて格納する (--vacuumと合わせるとDBが小さくなる)
+  -i --incremental                  前回から変更されたファイルのテーブルだけを入れ替える
   <dst>                             DB作成先 [default: gtfs-jp.sqlite3]
   -h --help                         Show this screen.
 
 Examples:
   {cli} C:\\Users\\gtfs\\Donanbus
   {cli} C:\\Users\\gtfs\\Donanbus -d tmp.sqlite3
+  {cli} C:\\Users\\gtfs\\Donanbus -d --dedup-buffer 100000
+  {cli} C:\\Users\\gtfs\\Donanbus --batch-size 50000
+  {cli} C:\\Users\\gtfs\\Donanbus -p 0 --fast --vacuum
+  {cli} C:\\Users\\gtfs\\Donanbus -i
+  {cli} C:\\Users\\gtfs\\Donanbus.zip
+  {cli} C:\\Users\\gtfs\\Donanbus.zip --typed
+  {cli} C:\\Users\\gtfs\\Donanbus.zip --snapshot
+  {cli} C:\\Users\\gtfs\\Donanbus.zip --compact-shapes --vacuum
 """
+import os
+import sys
+
 from owlmixin import OwlMixin
 
 from gtfsjpcli.client.gtfsdb import GtfsDbClient
+from gtfsjpcli.dao import snapshot
 
 
 class Args(OwlMixin):
-    gtfs_dir: str
+    gtfs_path: str
     drop_duplicates: bool
+    fast: bool
+    vacuum: bool
+    incremental: bool
+    typed: bool
+    snapshot: bool
+    compact_shapes: bool
+    dedup_buffer: int = 500000
+    batch_size: int = 10000
+    processes: int = 1
     dst: str = "gtfs-jp.sqlite3"
 
 
 def run(args: Args):
-    GtfsDbClient(args.dst).drop_and_create(args.gtfs_dir, drop_duplicates=args.drop_duplicates)
+    if args.snapshot and not snapshot.is_available():
+        sys.exit("--snapshot requires numpy. (pip install gtfsjp-cli[snapshot])")
+
+    GtfsDbClient(args.dst).drop_and_create(
+        args.gtfs_path,
+        drop_duplicates=args.drop_duplicates,
+        dedup_buffer_size=args.dedup_buffer,
+        batch_size=args.batch_size,
+        processes=args.processes or os.cpu_count(),
+        fast=args.fast,
+        vacuum=args.vacuum,
+        incremental=args.incremental,
+        typed=args.typed,
+        snapshot=args.snapshot,
+        compact_shapes=args.compact_shapes,
+    )
@@ -0,0 +1,87 @@
+"""複数のGTFSデータ(フィード)から1つのデータベースを作成します
+
+レコードはフィードIDで区別して格納します. フィードごとに別プロセスで読み込んでからまとめて追加します.
+
+Usage:
+  {cli} <gtfs_path>... [options]
+  {cli} (-h | --help)
+
+Options:
+  <gtfs_path>                       GTFSディレクトリまたはzipファイル. `フィードID=パス` でフィードIDを指定 (省略時はファイル名)
+  -o --output <dst>                 DB作成先 [default: gtfs-jp.sqlite3]
+  -d --drop-duplicates              完全一致するレコードを削除する
+  --dedup-buffer <dedup_buffer>     重複削除でメモリ上に保持する最大件数 (超えた分は一時ファイルで処理) [default: 500000]
+  --batch-size <batch_size>         1回のinsertでまとめて登録するレコード数 [default: 10000]
+  -p --processes <processes>        同時に読み込むフィード数 (0はCPU数) [default: 0]
+  --fast                            一括登録用の設定で作成する (インデックスは最後に作成、ジャーナル無効)
+  --vacuum                          作成後にVACUUMする
+  --typed                           時刻を整数(秒)、緯度経度を実数で格納する (範囲検索できる. 読み込み時の表記は正規化される)
+  --snapshot                        通過時刻情報のスナップショット(NumPy配列)をDBファイルの隣に書き出す (経路探索が速くなる)
+  --compact-shapes                  描画情報を描画IDごとに1行(エンコードした座標列)にまとめて格納する (--vacuumと合わせるとDBが小さくなる)
+  -i --incremental                  前回から変更されたフィードだけを入れ替える (指定しなかったフィードは残す)
+  -h --help                         Show this screen.
+
+Examples:
+  {cli} C:\\Users\\gtfs\\Donanbus.zip C:\\Users\\gtfs\\Toei.zip
+  {cli} donan=C:\\Users\\gtfs\\Donanbus toei=C:\\Users\\gtfs\\Toei.zip -o tmp.sqlite3
+  {cli} C:\\Users\\gtfs\\*.zip -p 4 --fast
+  {cli} C:\\Users\\gtfs\\*.zip -i
+  {cli} C:\\Users\\gtfs\\*.zip --fast --snapshot
+  {cli} C:\\Users\\gtfs\\*.zip --compact-shapes --vacuum
+"""
+import os
+import sys
+from typing import Dict, List
+
+from owlmixin import OwlMixin, TList
+
+from gtfsjpcli.client.gtfsdb import GtfsDbClient
+from gtfsjpcli.dao import snapshot
+
+
+class Args(OwlMixin):
+    gtfs_path: TList[str]
+    drop_duplicates: bool
+    fast: bool
+    vacuum: bool
+    incremental: bool
+    typed: bool
+    snapshot: bool
+    compact_shapes: bool
+    dedup_buffer: int = 500000
+    batch_size: int = 10000
+    processes: int = 0
+    output: str = "gtfs-jp.sqlite3"
+
+
+def to_gtfs_paths(values: List[str]) -> Dict[str, str]:
+    """引数をフィードIDとパスの辞書にします. フィードIDがない場合はファイル名(拡張子なし)をフィードIDにします"""
+    gtfs_paths: Dict[str, str] = {}
+    for value in values:
+        feed_id, sep, path = value.partition("=")
+        if not sep or not feed_id or os.sep in feed_id or "/" in feed_id:
+            path = value
+            feed_id = os.path.splitext(os.path.basename(os.path.normpath(value)))[0]
+        if feed_id in gtfs_paths:
+            sys.exit(f"Duplicate feed id `{feed_id}`: {gtfs_paths[feed_id]}, {path}")
+        gtfs_paths[feed_id] = path
+    return gtfs_paths
+
+
+def run(args: Args):
+    if args.snapshot and not snapshot.is_available():
+        sys.exit("--snapshot requires numpy. (pip install gtfsjp-cli[snapshot])")
+
+    GtfsDbClient(args.output).drop_and_create_feeds(
+        to_gtfs_paths(args.gtfs_path),
+        drop_duplicates=args.drop_duplicates,
+        dedup_buffer_size=args.dedup_buffer,
+        batch_size=args.batch_size,
+        processes=args.processes or os.cpu_count(),
+        fast=args.fast,
+        vacuum=args.vacuum,
+        incremental=args.incremental,
+        typed=args.typed,
+        snapshot=args.snapshot,
+        compact_shapes=args.compact_shapes,
+    )
@@ -0,0 +1,72 @@
+"""停留所/標柱間の経路を探索します (RAPTOR)
+
+出発時刻以降に出発して目的地に最も早く着く経路を、乗り換え回数ごとに返します.
+乗り換えには、近くの停留所/標柱への徒歩を含みます.
+
+Usage:
+  {cli} --from <from_stop_id> --to <to_stop_id> --date <date> --depart <time> [options] [<source>]
+  {cli} (-h | --help)
+
+Options:
+  --from <from_stop_id>             出発地の停留所/標柱ID (親駅IDの場合は属する標柱のいずれか)
+  --to <to_stop_id>                 目的地の停留所/標柱ID (親駅IDの場合は属する標柱のいずれか)
+  --date <date>                     日付 (YYYYMMDD形式). 前日の運行日で24時以降に走る便も使う
+  --depart <time>                   出発時刻 (HH:MM または HH:MM:SS形式)
+  --max-transfers <max_transfers>   最大乗り換え回数 [default: 4]
+  --max-walk <max_walk>             徒歩で乗り換えられる最大の距離(m). 1000まで. 0は徒歩の乗り換えなし [default: 300]
+  --feed <feed_id>                  フィードID (複数のフィードを格納したDBの場合)
+  <source>                          GTFSソースのpath [default: gtfs-jp.sqlite3]
+  -h --help                         Show this screen.
+
+Examples:
+  {cli} --from 100_10 --to 200_20 --date 20240401 --depart 08:30
+  {cli} --from 100 --to 200 --date 20240401 --depart 23:30 --max-walk 500 tmp.sqlite3
+"""
+import sys
+
+from owlmixin import OwlMixin, TOption
+
+from gtfsjpcli.services.plan import plan_journeys
+from gtfsjpcli.utils.times import is_date_text, to_time_option
+
+
+class Args(OwlMixin):
+    from_stop_id: str
+    to: str
+    date: str
+    depart: str
+    max_transfers: int = 4
+    max_walk: float = 300
+    feed: TOption[str]
+    source: str = "gtfs-jp.sqlite3"
+
+    @classmethod
+    def from_dict(cls, d: dict, **kwargs) -> "Args":
+        # fromは予約語で属性名にできないので、--fromをfrom_stop_idに割り当てる
+        return super().from_dict(
+            {("--from-stop-id" if k == "--from" else k): v for k, v in d.items()}, **kwargs
+        )
+
+
+def run(args: Args):
+    if not is_date_text(args.date):
+        sys.exit(f"--date must be in the form of YYYYMMDD: {args.date}")
+    depart = to_time_option(args.depart)
+    if depart is None:
+        sys.exit(f"--depart must be in the form of HH:MM or HH:MM:SS: {args.depart}")
+
+    try:
+        document = plan_journeys(
+            args.source,
+            args.from_stop_id,
+            args.to,
+            args.date,
+            depart,
+            max_transfers=args.max_transfers,
+            max_walk=args.max_walk,
+            feed_id=args.feed.get_or(""),
+        )
+    except ValueError as e:
+        sys.exit(str(e))
+
+    print(document.to_pretty_json())
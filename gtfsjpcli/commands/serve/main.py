@@ -0,0 +1,67 @@
+"""GTFSソースへの問い合わせをHTTPで受け付けるサーバーを起動します
+
+プロセスを起動し続けるので、DBへの接続やキャッシュ(経路探索の時刻表など)がリクエストをまたいで使い回されます.
+リクエストは複数のワーカースレッドで、読み取り専用の接続プールを共有して処理します.
+
+Usage:
+  {cli} [--host <host>] [--port <port>] [--workers <workers>] [<source>]
+  {cli} --socket <socket> [--workers <workers>] [<source>]
+  {cli} (-h | --help)
+
+Options:
+  --host <host>          待ち受けるホスト [default: 127.0.0.1]
+  --port <port>          待ち受けるポート [default: 8000]
+  --socket <socket>      TCPの代わりに待ち受けるUnixドメインソケットのパス
+  --workers <workers>    リクエストを処理するスレッド数 (0はCPU数) [default: 0]
+  <source>               GTFSソースのpath [default: gtfs-jp.sqlite3]
+  -h --help              Show this screen.
+
+Endpoints (GET, レスポンスはgetコマンドと同じ形式のJSON):
+  /agencies    ?feed=
+  /stops       ?id= | ?word=&limit=&offset= | ?near=LAT,LON&radius=&limit=  (共通: &feed=&trips=true)
+  /departures  ?stop=&date=YYYYMMDD&from=HH:MM&limit=&feed=
+  /plan        ?from=&to=&date=YYYYMMDD&depart=HH:MM&max_transfers=&max_walk=&feed=
+
+Examples:
+  {cli}
+  {cli} --port 8080 --workers 8 tmp.sqlite3
+  {cli} --socket /tmp/gtfsjp.sock
+  curl 'http://127.0.0.1:8000/stops?word=東京&limit=3'
+"""
+import os
+import sys
+
+from owlmixin import OwlMixin, TOption
+
+from gtfsjpcli.server.api import create_server
+
+
+class Args(OwlMixin):
+    host: str = "127.0.0.1"
+    port: int = 8000
+    socket: TOption[str]
+    workers: int = 0
+    source: str = "gtfs-jp.sqlite3"
+
+
+def run(args: Args):
+    if not os.path.exists(args.source):
+        sys.exit(f"{args.source} is not found.")
+    if args.socket.any() and os.path.exists(args.socket.get()):
+        sys.exit(f"{args.socket.get()} already exists. Remove it if no server is using it.")
+
+    server = create_server(
+        args.source,
+        args.workers or os.cpu_count(),
+        args.host,
+        args.port,
+        args.socket.get(),
+    )
+    address = args.socket.get() or "http://{}:{}".format(*server.server_address[:2])
+    print(f"Serving {args.source} on {address}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,32 +1,47 @@
 """動作確認用コマンド
 
+系統の運賃を表示します. <source> を省略した場合は、架空のGTFS-JPデータ(小規模)から一時ディレクトリにDBを作成して使います.
+
 Usage:
-  {cli} <something>
+  {cli} [--route <route_id>] [<source>]
   {cli} (-h | --help)
 
 Options:
+  --route <route_id>                表示する系統ID (省略時は最初の系統)
+  <source>                          GTFSソースのpath
   -h --help                         Show this screen.
 
 Examples:
   {cli}
+  {cli} --route 20002_200243_1 gtfs-jp.sqlite3
 """
 
-from owlmixin import OwlMixin, TList
+import os
+import sys
+import tempfile
+
+from owlmixin import OwlMixin, TList, TOption
 
 from gtfsjpcli.client.gtfsdb import GtfsDbClient
 from gtfsjpcli.dao.entities import FareRuleEntity
+from gtfsjpcli.utils.synthetic import SCALES, generate_feed
 
 
 class Args(OwlMixin):
-    something: str
+    route: TOption[str]
+    source: TOption[str]
 
 
 def to_record(x: FareRuleEntity) -> dict:
     return {"fromノード": x.origin_stop.stop_name, "toノード": x.destination_stop.stop_name, "運賃": x.fare_attribute.price}
 
 
-def run(args: Args):
-    route = GtfsDbClient("gtfs-jp.sqlite3").route.find_by_id("20002_200243_1")
+def show_route(client: GtfsDbClient, route_id: TOption[str]):
+    route = (
+        client.route.find_by_id(route_id.get()) if route_id.any() else client.route.all().first()
+    )
+    if route is None:
+        sys.exit(f"Route {route_id.get_or('')} is not found.")
 
     print(
         f"""
@@ -37,3 +52,16 @@ def run(args: Args):
 {TList(map(to_record, route.fare_rules)).to_table(["fromノード", "toノード", "運賃"])}
 """
     )
+
+
+def run(args: Args):
+    if args.source.any():
+        show_route(GtfsDbClient(args.source.get()), args.route)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_feed(os.path.join(tmp, "gtfs"), SCALES["small"])
+        client = GtfsDbClient(os.path.join(tmp, "gtfs-jp.sqlite3"))
+        client.drop_and_create(os.path.join(tmp, "gtfs"))
+        show_route(client, args.route)
+        client.session.close()
@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 
-from typing import Iterable
+from typing import Iterable, Optional
 
 from sqlalchemy.orm import Session
 
@@ -13,5 +13,7 @@ class AgencyDao():
     def __init__(self, session: Session):
         self.session = session
 
-    def all(self) -> Iterable[AgencyEntity]:
-        return self.session.query(AgencyEntity)
+    def all(self, feed_id: Optional[str] = None) -> Iterable[AgencyEntity]:
+        """全ての事業者を取得します. feed_idを指定した場合はそのフィードの事業者だけを取得します"""
+        query = self.session.query(AgencyEntity)
+        return query.filter(AgencyEntity.feed_id == feed_id) if feed_id is not None else query
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""実行されたSQLの件数を数えるフック
+
+N+1問題などでクエリ数が増えていないかを確認するために使います.
+
+Usage:
+
+    with assert_max_queries(client.engine, 3):
+        client.search_stops_by_name("東京", True).to_list()
+"""
+
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """with句の中でengineが実行したSQLを記録する
+
+    Usage:
+
+        >>> from sqlalchemy import create_engine
+        >>> from sqlalchemy.orm import Session
+        >>> from gtfsjpcli.dao.entities import StopEntity, TranslationEntity
+        >>> from gtfsjpcli.dao.schema import create_tables
+        >>> from gtfsjpcli.dao.stop import StopDao
+        >>> engine = create_engine("sqlite://")
+        >>> create_tables(engine)
+        >>> session = Session(bind=engine)
+        >>> session.add(StopEntity(stop_id="1_01", stop_name="東京駅", stop_lat="35", stop_lon="139"))
+        >>> session.add(TranslationEntity(trans_id="東京駅", lang="ja-Hrkt", translation="とうきょう"))
+        >>> session.commit()
+
+        IDでの検索は翻訳情報もまとめて取得するので、参照してもSQLは1件です
+
+        >>> with QueryCounter(engine) as counter:
+        ...     [x.translation_kana.translation for x in StopDao(session).search_by_id("1_01")]
+        ['とうきょう']
+        >>> counter.count
+        1
+    """
+
+    statements: List[str]
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self.record)
+        return self
+
+    def __exit__(self, *_):
+        event.remove(self.engine, "before_cursor_execute", self.record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    # pylint: disable=too-many-arguments
+    def record(self, _conn, _cursor, statement, _parameters, _context, _executemany):
+        """before_cursor_execute イベントのリスナー. 実行するSQLを記録します"""
+        self.statements.append(statement)
+
+
+@contextmanager
+def assert_max_queries(engine, limit: int):
+    """with句の中で実行されたSQLがlimit件を超えたらAssertionErrorにします
+
+    Args:
+        engine: SQLAlchemyのengine
+        limit: 許容するSQLの件数
+
+    Usage:
+
+        >>> from sqlalchemy import create_engine
+        >>> engine = create_engine("sqlite://")
+        >>> with assert_max_queries(engine, 1) as counter:
+        ...     engine.execute("SELECT 1").scalar()
+        1
+        >>> counter.statements
+        ['SELECT 1']
+        >>> with assert_max_queries(engine, 1):
+        ...     engine.execute("SELECT 1").scalar() + engine.execute("SELECT 2").scalar()
+        Traceback (most recent call last):
+            ...
+        AssertionError: 2 queries were executed but the limit is 1.
+          SELECT 1
+          SELECT 2
+    """
+    with QueryCounter(engine) as counter:
+        yield counter
+
+    if counter.count > limit:
+        statements = "\n".join(f"  {x}" for x in counter.statements)
+        raise AssertionError(
+            f"{counter.count} queries were executed but the limit is {limit}.\n{statements}"
+        )
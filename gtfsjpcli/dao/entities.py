@@ -6,14 +6,21 @@
 * 運行間隔情報 (frequencies.txt)
 * 乗換情報 (transfers.txt)
 
+複数のフィードを1つのデータベースに格納できるよう、全てのテーブルにフィードID(feed_id)を追加し、
+主キーと外部キー(結合条件)に含めています. インデックスはIDでの検索にも使えるようfeed_idを後ろにしています.
+feed_idが複数の外部キーに含まれるテーブルは、2つ目以降の関連を参照専用(viewonly)にしています.
+
+時刻と緯度経度は、型付き形式で格納できる型(gtfsjpcli.dao.types)にしています.
 """
 
 from typing import Iterable, Optional
 
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, Float, ForeignKeyConstraint, Index, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
+from gtfsjpcli.dao.types import Coordinate, GtfsTime
+
 BASE = declarative_base()
 
 
@@ -39,6 +46,8 @@ class AgencyEntity(BASE):
     """オンライン購入URL - 乗車券をオンライン購入するサイトのURL"""
     agency_email: Optional[str] = Column(String)
     """事業者Eメール"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
     jp: Optional["AgencyJpEntity"] = relationship(
         "AgencyJpEntity", uselist=False, back_populates="origin"
@@ -55,9 +64,12 @@ class AgencyJpEntity(BASE):
     """
 
     __tablename__ = "agency_jp"
+    __table_args__ = (
+        ForeignKeyConstraint(["agency_id", "feed_id"], ["agency.agency_id", "agency.feed_id"]),
+    )
 
     # XXX: primary keyではないけどORMはprimary keyナシを認めないので追加. 後で定義が変わる可能性は高い
-    agency_id: str = Column(String, ForeignKey("agency.agency_id"), primary_key=True)
+    agency_id: str = Column(String, primary_key=True)
     """事業者ID (ex: 8000020130001)"""
     agency_official_name: Optional[str] = Column(String)
     """事業者正式名称 (ex: 東京都交通局)"""
@@ -69,6 +81,8 @@ class AgencyJpEntity(BASE):
     """代表者肩書き (ex: 局長)"""
     agency_president_name: Optional[str] = Column(String)
     """代表者氏名 (ex: 東京　太郎)"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
     origin: Iterable[AgencyEntity] = relationship(
         "AgencyEntity", uselist=False, back_populates="jp"
@@ -81,18 +95,26 @@ class StopEntity(BASE):
     """
 
     __tablename__ = "stops"
+    __table_args__ = (
+        Index("ix_stops_zone_id", "zone_id", "feed_id"),
+        Index("ix_stops_stop_name", "stop_name", "feed_id"),
+        ForeignKeyConstraint(
+            ["stop_name", "feed_id"], ["translations.trans_id", "translations.feed_id"]
+        ),
+    )
+    """運賃定義(zone_id)と翻訳(stop_name)からの結合用"""
 
     stop_id: str = Column(String, primary_key=True)
     """停留所・標柱ID (ex: [停]100 [柱]100_10)"""
     stop_code: Optional[str] = Column(String)
     """停留所・標柱番号 - ナンバリングなどの番号"""
-    stop_name: str = Column(String, ForeignKey("translations.trans_id"), nullable=False)
+    stop_name: str = Column(String, nullable=False)
     """停留所・標柱名称. ⚠表示名称はtranslationsを使用するのでその為のキー (ex: [停]東京駅八重洲口 [柱]東京駅八重洲口)"""
     stop_desc: Optional[str] = Column(String)
     """停留所・標柱付加情報 (最寄り施設情報など)"""
-    stop_lat: str = Column(String, nullable=False)
+    stop_lat: str = Column(Coordinate, nullable=False)
     """緯度 - Degree/世界測地系 (ex: [停]ターミナル中心 [柱]標柱位置)"""
-    stop_lon: str = Column(String, nullable=False)
+    stop_lon: str = Column(Coordinate, nullable=False)
     """経度 - Degree/世界測地系 (ex: [停]ターミナル中心 [柱]標柱位置)"""
     zone_id: Optional[str] = Column(String)  # 運賃エリアID (標柱のみ)
     """運賃エリアID - 対キロ制の場合は標柱IDを設定? (ex: [停]なし [柱]Z_210)"""
@@ -108,15 +130,18 @@ class StopEntity(BASE):
     """車イス情報 - 設定非推奨"""
     platform_code: Optional[str] = Column(String)  # のりば情報(ID) (標柱のみ)
     """のりば情報 - 『番』『のりば』などの語句は含めない (ex: [停]なし [柱]G,3,センタービル前)"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
     stop_times: Iterable["StopTimeEntity"] = relationship(
-        "StopTimeEntity", uselist=True, back_populates="stop"
+        "StopTimeEntity", uselist=True, viewonly=True
     )
     """紐づく通過時刻情報"""
     translation_ja: "TranslationEntity" = relationship(
         "TranslationEntity",
         uselist=False,
         primaryjoin="and_(StopEntity.stop_name==TranslationEntity.trans_id,"
+        "StopEntity.feed_id==TranslationEntity.feed_id,"
         "TranslationEntity.lang=='ja')",
     )
     """日本語の翻訳情報"""
@@ -124,6 +149,7 @@ class StopEntity(BASE):
         "TranslationEntity",
         uselist=False,
         primaryjoin="and_(StopEntity.stop_name==TranslationEntity.trans_id,"
+        "StopEntity.feed_id==TranslationEntity.feed_id,"
         "TranslationEntity.lang=='ja-Hrkt')",
     )
     """読み仮名の翻訳情報"""
@@ -131,6 +157,7 @@ class StopEntity(BASE):
         "TranslationEntity",
         uselist=False,
         primaryjoin="and_(StopEntity.stop_name==TranslationEntity.trans_id,"
+        "StopEntity.feed_id==TranslationEntity.feed_id,"
         "TranslationEntity.lang=='en')",
     )
     """英語の翻訳情報"""
@@ -141,10 +168,15 @@ class RouteEntity(BASE):
     """
 
     __tablename__ = "routes"
+    __table_args__ = (
+        Index("ix_routes_agency_id", "agency_id", "feed_id"),
+        ForeignKeyConstraint(["agency_id", "feed_id"], ["agency.agency_id", "agency.feed_id"]),
+    )
+    """事業者からの結合用"""
 
     route_id: str = Column(String, primary_key=True)
     """経路ID (ex: 1001)"""
-    agency_id: str = Column(String, ForeignKey("agency.agency_id"), nullable=False)
+    agency_id: str = Column(String, nullable=False)
     """事業者ID (ex: 8000020130001)"""
     route_short_name: Optional[str] = Column(String)
     """経路略称 - route_long_nameが無い場合は必須 (ex: 東16)"""
@@ -162,6 +194,8 @@ class RouteEntity(BASE):
     """経路文字色 - 線やラベル上の文字に使用する色 (ex: 000000)"""
     jp_parent_route_id: Optional[str] = Column(String)
     """路線ID - 複数経路を束ねるために路線と紐付ける"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
     agency: AgencyEntity = relationship("AgencyEntity", uselist=False, back_populates="routes")
     """事業者"""
@@ -183,8 +217,11 @@ class RouteJpEntity(BASE):
     """
 
     __tablename__ = "routes_jp"
+    __table_args__ = (
+        ForeignKeyConstraint(["route_id", "feed_id"], ["routes.route_id", "routes.feed_id"]),
+    )
 
-    route_id: str = Column(String, ForeignKey("routes.route_id"), primary_key=True)
+    route_id: str = Column(String, primary_key=True)
     """経路ID (ex: 1000)"""
     route_update_date: Optional[str] = Column(String, primary_key=True, nullable=True)
     """ダイヤ改正日 (ex: 20170106)"""
@@ -194,6 +231,8 @@ class RouteJpEntity(BASE):
     """経過地 (ex: 月島駅)"""
     destination_stop: Optional[str] = Column(String, primary_key=True, nullable=True)
     """終点 (ex: 東京ビッグサイト)"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
     origin: Iterable[RouteEntity] = relationship("RouteEntity", uselist=False, back_populates="jp")
     """経路情報"""
@@ -204,10 +243,24 @@ class TripEntity(BASE):
     """
 
     __tablename__ = "trips"
+    __table_args__ = (
+        Index("ix_trips_route_id", "route_id", "feed_id"),
+        Index("ix_trips_service_id", "service_id", "feed_id"),
+        Index("ix_trips_shape_id", "shape_id", "feed_id"),
+        Index("ix_trips_jp_office_id", "jp_office_id", "feed_id"),
+        ForeignKeyConstraint(["route_id", "feed_id"], ["routes.route_id", "routes.feed_id"]),
+        ForeignKeyConstraint(
+            ["service_id", "feed_id"], ["calendar.service_id", "calendar.feed_id"]
+        ),
+        ForeignKeyConstraint(
+            ["jp_office_id", "feed_id"], ["office_jp.office_id", "office_jp.feed_id"]
+        ),
+    )
+    """経路/運行区分/描画/営業所からの結合用"""
 
-    route_id: str = Column(String, ForeignKey("routes.route_id"), nullable=False)
+    route_id: str = Column(String, nullable=False)
     """経路ID (ex: 1000)"""
-    service_id: str = Column(String, ForeignKey("calendar.service_id"), nullable=False)
+    service_id: str = Column(String, nullable=False)
     """運行ID - ??? (ex: 平日（月～金）)"""
     trip_id: str = Column(String, primary_key=True)
     """便ID (ex: 1001WD001)"""
@@ -229,13 +282,15 @@ class TripEntity(BASE):
     """便情報 - 特殊な運行など便の補足説明"""
     jp_trip_desc_symbol: Optional[str] = Column(String)
     """便記号 - 時刻に付ける凡例"""
-    jp_office_id: Optional[str] = Column(String, ForeignKey("office_jp.office_id"))
+    jp_office_id: Optional[str] = Column(String)
     """営業所ID (ex: S)"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
     route: RouteEntity = relationship("RouteEntity", uselist=False, back_populates="trips")
     """便の紐づく経路"""
     office: Optional["OfficeJpEntity"] = relationship(
-        "OfficeJpEntity", uselist=False, back_populates="trips"
+        "OfficeJpEntity", uselist=False, viewonly=True
     )
     """便に紐づく営業所"""
     stop_times: Iterable["StopTimeEntity"] = relationship(
@@ -246,14 +301,16 @@ class TripEntity(BASE):
         "ShapeEntity", uselist=True, back_populates="trip"
     )
     """便に紐づく描画情報"""
-    calendar: "CalendarEntity" = relationship(
-        "CalendarEntity", uselist=False, back_populates="trips"
-    )
+    calendar: "CalendarEntity" = relationship("CalendarEntity", uselist=False, viewonly=True)
     """便に紐づく運行区分情報"""
-    calendar_dates: "CalendarDateEntity" = relationship(
-        "CalendarDateEntity", uselist=True, back_populates="trip"
+    calendar_dates: Iterable["CalendarDateEntity"] = relationship(
+        "CalendarDateEntity", uselist=True, viewonly=True
     )
     """便に紐づく運行日情報"""
+    service_days: Iterable["ServiceDayEntity"] = relationship(
+        "ServiceDayEntity", uselist=True, viewonly=True
+    )
+    """便が運行する日"""
 
 
 class OfficeJpEntity(BASE):
@@ -270,8 +327,10 @@ class OfficeJpEntity(BASE):
     """営業所URL - 営業所情報の記載されたサイトURLなど"""
     office_phone: Optional[str] = Column(String)
     """営業所電話番号 (ex: 03-3529-3322)"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
-    trips: Iterable[TripEntity] = relationship("TripEntity", uselist=True, back_populates="office")
+    trips: Iterable[TripEntity] = relationship("TripEntity", uselist=True, viewonly=True)
     """営業所に紐づく便一覧"""
 
 
@@ -280,14 +339,22 @@ class StopTimeEntity(BASE):
     """
 
     __tablename__ = "stop_times"
+    __table_args__ = (
+        Index("ix_stop_times_stop_id_trip_id", "stop_id", "feed_id", "trip_id"),
+        Index("ix_stop_times_stop_id_departure_time", "stop_id", "feed_id", "departure_time"),
+        ForeignKeyConstraint(["trip_id", "feed_id"], ["trips.trip_id", "trips.feed_id"]),
+        ForeignKeyConstraint(["stop_id", "feed_id"], ["stops.stop_id", "stops.feed_id"]),
+    )
+    """停留所/標柱からの結合用. 停留所/標柱ごとの便IDの集約はこのインデックスだけで完結します.
+    出発時刻のインデックスは、型付き形式の場合に時刻の範囲で検索(時刻表)するために使います"""
 
-    trip_id: str = Column(String, ForeignKey("trips.trip_id"), primary_key=True)
+    trip_id: str = Column(String, primary_key=True)
     """便ID (ex: 1001WD001)"""
-    arrival_time: str = Column(String, nullable=False)
+    arrival_time: str = Column(GtfsTime, nullable=False)
     """到着時刻 - HH:MM:SS形式 24時以降は 25:01:00のように表記 (ex: 7:00:00)"""
-    departure_time: str = Column(String, nullable=False)
+    departure_time: str = Column(GtfsTime, nullable=False)
     """出発時刻 - HH:MM:SS形式 24時以降は 25:01:00のように表記 (ex: 7:00:00)"""
-    stop_id: str = Column(String, ForeignKey("stops.stop_id"), nullable=False)
+    stop_id: str = Column(String, nullable=False)
     """標柱ID - stops.location_type=0のstopであること (ex: 100_10)"""
     stop_sequence: int = Column(Integer, primary_key=True)
     """通過順位 - 通過順序.. 昇順になっていれば連番である必要はない (ex: 0)"""
@@ -301,10 +368,12 @@ class StopTimeEntity(BASE):
     """通算距離 - 単位はm"""
     timepoint: Optional[int] = Column(Integer)
     """発着時間精度 - 日本では使用しない"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
     trip: TripEntity = relationship("TripEntity", uselist=False, back_populates="stop_times")
     """紐づく便情報"""
-    stop: StopEntity = relationship("StopEntity", uselist=False, back_populates="stop_times")
+    stop: StopEntity = relationship("StopEntity", uselist=False, viewonly=True)
     """紐づく停留所/標柱情報"""
 
 
@@ -334,10 +403,10 @@ class CalendarEntity(BASE):
     """サービス開始日 - YYYYMMDD形式 (ex: 20170101)"""
     end_date: str = Column(String, nullable=False)
     """サービス終了日 - YYYYMMDD形式 (ex: 20171231)"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
-    trips: "Iterable[TripEntity]" = relationship(
-        "TripEntity", uselist=True, back_populates="calendar"
-    )
+    trips: "Iterable[TripEntity]" = relationship("TripEntity", uselist=True, viewonly=True)
     """紐づく便一覧"""
 
 
@@ -346,16 +415,46 @@ class CalendarDateEntity(BASE):
     """
 
     __tablename__ = "calendar_dates"
+    __table_args__ = (
+        ForeignKeyConstraint(["service_id", "feed_id"], ["trips.service_id", "trips.feed_id"]),
+    )
 
-    service_id: str = Column(String, ForeignKey("trips.service_id"), primary_key=True)
+    service_id: str = Column(String, primary_key=True)
     """運行ID - ??? (ex: 平日（月～金）)"""
     date: str = Column(String, primary_key=True)
     """日付 - YYYYMMDD形式 (ex: 20170503)"""
     exception_type: int = Column(Integer, nullable=False)
     """利用タイプ - 運行: 1 非運行: 2"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
+
+    trips: Iterable[TripEntity] = relationship("TripEntity", uselist=True, viewonly=True)
+    """この運行日情報を使用している便一覧"""
+
+
+class ServiceDayEntity(BASE):
+    """運行日ごとの運行するサービス (GTFS-JPの定義外)
 
-    trip: TripEntity = relationship("TripEntity", uselist=False, back_populates="calendar_dates")
-    """この運行日情報を使用している便 (XXX: 本当は複数のtripsと紐づくが、簡略化のため単一のtripと紐づくようにしている)"""
+    運行区分情報(曜日と期間)を日付に展開し、運行日情報の例外を反映したものです.
+    GTFSファイルではなく、読み込み後に calendar と calendar_dates から作成します.
+    """
+
+    __tablename__ = "service_days"
+    __table_args__ = (
+        Index("ix_service_days_service_id", "service_id", "feed_id"),
+        ForeignKeyConstraint(["service_id", "feed_id"], ["trips.service_id", "trips.feed_id"]),
+    )
+    """主キーは日付からサービスを求めるため、インデックスは便(サービス)から運行日を求めるためのものです"""
+
+    date: str = Column(String, primary_key=True)
+    """運行日 - YYYYMMDD形式 (ex: 20170503)"""
+    service_id: str = Column(String, primary_key=True)
+    """運行ID (ex: 平日（月～金）)"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字"""
+
+    trips: Iterable[TripEntity] = relationship("TripEntity", uselist=True, viewonly=True)
+    """この日に運行する便一覧"""
 
 
 class FareAttributeEntity(BASE):
@@ -376,9 +475,11 @@ class FareAttributeEntity(BASE):
     """乗換 - 0:料金で乗換不可 1:1度乗換可 2:2度乗換可 空白:乗換回数制限なし"""
     transfer_duration: Optional[int] = Column(Integer)
     """乗換有効期限 - 未指定と空白は等価"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
     fare_rules: Iterable["FareRuleEntity"] = relationship(
-        "FareRuleEntity", uselist=True, back_populates="fare_attribute"
+        "FareRuleEntity", uselist=True, viewonly=True
     )
     """紐づく運賃定義情報一覧。currency_typeがJPY固定であるため擬似的にone to manyとみなすことができる"""
 
@@ -388,36 +489,50 @@ class FareRuleEntity(BASE):
     """
 
     __tablename__ = "fare_rules"
+    __table_args__ = (
+        Index("ix_fare_rules_route_id", "route_id", "feed_id"),
+        Index("ix_fare_rules_origin_id", "origin_id", "feed_id"),
+        Index("ix_fare_rules_destination_id", "destination_id", "feed_id"),
+        ForeignKeyConstraint(
+            ["fare_id", "feed_id"], ["fare_attributes.fare_id", "fare_attributes.feed_id"]
+        ),
+        ForeignKeyConstraint(["route_id", "feed_id"], ["routes.route_id", "routes.feed_id"]),
+        ForeignKeyConstraint(["origin_id", "feed_id"], ["stops.zone_id", "stops.feed_id"]),
+        ForeignKeyConstraint(["destination_id", "feed_id"], ["stops.zone_id", "stops.feed_id"]),
+    )
+    """経路/停留所/標柱からの結合用"""
 
-    fare_id: str = Column(String, ForeignKey("fare_attributes.fare_id"), primary_key=True)
+    fare_id: str = Column(String, primary_key=True)
     """運賃ID (ex: F_210)"""
-    route_id: Optional[str] = Column(
-        String, ForeignKey("routes.route_id"), primary_key=True, nullable=True
-    )
+    route_id: Optional[str] = Column(String, primary_key=True, nullable=True)
     """経路ID (ex: 1001)"""
-    origin_id: Optional[str] = Column(
-        String, ForeignKey("stops.zone_id"), primary_key=True, nullable=True
-    )
+    origin_id: Optional[str] = Column(String, primary_key=True, nullable=True)
     """乗車地ゾーン (ex: Z_210)"""
-    destination_id: Optional[str] = Column(
-        String, ForeignKey("stops.zone_id"), primary_key=True, nullable=True
-    )
+    destination_id: Optional[str] = Column(String, primary_key=True, nullable=True)
     """降車地ゾーン (ex: Z_210)"""
     contains_id: Optional[str] = Column(String)
     """通過ゾーン - 使用していないので不要"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
     route: RouteEntity = relationship("RouteEntity", uselist=False, back_populates="fare_rules")
     """紐づく系統"""
     fare_attribute: FareAttributeEntity = relationship(
-        "FareAttributeEntity", uselist=False, back_populates="fare_rules"
+        "FareAttributeEntity", uselist=False, viewonly=True
     )
     """紐づく運賃属性情報。fare_attributes.currency_typeがJPY固定であるため擬似的にmany to oneとみなすことができる"""
     origin_stop: StopEntity = relationship(
-        "StopEntity", primaryjoin="FareRuleEntity.origin_id==StopEntity.zone_id"
+        "StopEntity",
+        primaryjoin="and_(foreign(FareRuleEntity.origin_id)==StopEntity.zone_id,"
+        "foreign(FareRuleEntity.feed_id)==StopEntity.feed_id)",
+        viewonly=True,
     )
     """乗車地の停留所/標柱"""
     destination_stop: StopEntity = relationship(
-        "StopEntity", primaryjoin="FareRuleEntity.destination_id==StopEntity.zone_id"
+        "StopEntity",
+        primaryjoin="and_(foreign(FareRuleEntity.destination_id)==StopEntity.zone_id,"
+        "foreign(FareRuleEntity.feed_id)==StopEntity.feed_id)",
+        viewonly=True,
     )
     """降車地の停留所/標柱"""
 
@@ -427,22 +542,54 @@ class ShapeEntity(BASE):
     """
 
     __tablename__ = "shapes"
+    __table_args__ = (
+        ForeignKeyConstraint(["shape_id", "feed_id"], ["trips.shape_id", "trips.feed_id"]),
+    )
 
-    shape_id: str = Column(String, ForeignKey("trips.shape_id"), primary_key=True)
+    shape_id: str = Column(String, primary_key=True)
     """描画ID (ex: S_1001)"""
-    shape_pt_lat: str = Column(String, nullable=False)
+    shape_pt_lat: str = Column(Coordinate, nullable=False)
     """描画緯度 - 度/世界測地系? (ex: 35.679752)"""
-    shape_pt_lon: str = Column(String, nullable=False)
+    shape_pt_lon: str = Column(Coordinate, nullable=False)
     """描画経度 - 度/世界測地系? (ex: 139.76833)"""
     shape_pt_sequence: int = Column(Integer, primary_key=True)
     """描画順序 (ex: 0)"""
     shape_dist_traveled: Optional[int] = Column(Integer)
     """描画距離 - 使用しない"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
     trip: TripEntity = relationship("TripEntity", uselist=False, back_populates="shapes")
     """紐づく便"""
 
 
+class ShapeGeometryEntity(BASE):
+    """描画IDごとにまとめた描画情報 (GTFS-JPの定義外)
+
+    描画情報の点を描画順序の順に並べ、エンコードした1つの文字列(gtfsjpcli.utils.polyline)にしたものです.
+    GTFSファイルではなく、読み込み後に shapes から作成します (--compact-shapes). 作成後、shapes の行は削除します.
+    """
+
+    __tablename__ = "shape_geometries"
+
+    shape_id: str = Column(String, primary_key=True)
+    """描画ID (ex: S_1001)"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字"""
+    points: int = Column(Integer, nullable=False)
+    """点の数"""
+    min_lat: float = Column(Float, nullable=False)
+    """最小の緯度"""
+    min_lon: float = Column(Float, nullable=False)
+    """最小の経度"""
+    max_lat: float = Column(Float, nullable=False)
+    """最大の緯度"""
+    max_lon: float = Column(Float, nullable=False)
+    """最大の経度"""
+    polyline: str = Column(String, nullable=False)
+    """点の(緯度, 経度)をエンコードした文字列 (Encoded Polyline Algorithm Format, 精度は小数点以下6桁)"""
+
+
 class FeedInfoEntity(BASE):
     """提供情報
     主キーなしだがSQL Alchemyの動作仕様を満たす為 primary_key=True を全フィールドに付けています
@@ -462,6 +609,8 @@ class FeedInfoEntity(BASE):
     """有効期間終了日 - YYYYMMDD形式"""
     feed_version: Optional[str] = Column(String, primary_key=True, nullable=True)
     """提供データバージョン (ex: 20170401A0015)"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
 
 
 class TranslationEntity(BASE):
@@ -476,3 +625,39 @@ class TranslationEntity(BASE):
     """言語 - 日本語『ja』、読み仮名である『ja-Hrkt』は必須 (ex: en)"""
     translation: str = Column(String, nullable=False)
     """翻訳先言語 (ex: すきやばし)"""
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 複数のフィードを格納する場合の名前空間. 単一フィードの場合は空文字 (GTFS-JPの定義外)"""
+
+
+class SourceFileEntity(BASE):
+    """読み込んだGTFSファイルの情報 (GTFS-JPの定義外. 差分更新に使用します)
+    """
+
+    __tablename__ = "gtfsjp_source_files"
+
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 単一フィードの場合は空文字"""
+    file_name: str = Column(String, primary_key=True)
+    """ファイル名 (ex: stop_times.txt)"""
+    size: int = Column(Integer, nullable=False)
+    """ファイルサイズ(byte)"""
+    mtime_ns: int = Column(Integer, nullable=False)
+    """最終更新日時(ナノ秒のUNIX時間)"""
+    sha256: str = Column(String, nullable=False)
+    """内容のハッシュ値"""
+    loaded_at: str = Column(String, nullable=False)
+    """読み込んだ日時 - ISO8601形式 (ex: 2019-10-01T12:34:56)"""
+
+
+class PropertyEntity(BASE):
+    """データベースの属性情報 (GTFS-JPの定義外)
+    """
+
+    __tablename__ = "gtfsjp_properties"
+
+    feed_id: str = Column(String, primary_key=True, default="", server_default="")
+    """フィードID - 単一フィードの場合やデータベース全体の属性は空文字"""
+    key: str = Column(String, primary_key=True)
+    """キー (ex: feed_version)"""
+    value: Optional[str] = Column(String)
+    """値"""
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""DAOが発行するクエリの実行計画(EXPLAIN QUERY PLAN)
+
+インデックスが効いているか(SCANではなくSEARCHになっているか)を確認するために使います.
+"""
+
+from typing import Dict, List
+
+from sqlalchemy.orm import Query, Session
+
+from gtfsjpcli.dao.agency import AgencyDao
+from gtfsjpcli.dao.entities import (
+    AgencyEntity,
+    CalendarDateEntity,
+    FareRuleEntity,
+    RouteEntity,
+    ShapeEntity,
+    StopEntity,
+    StopTimeEntity,
+    TranslationEntity,
+    TripEntity,
+)
+from gtfsjpcli.dao.route import RouteDao
+from gtfsjpcli.dao.service_day import ServiceDayDao
+from gtfsjpcli.dao.shape import ShapeDao
+from gtfsjpcli.dao.stop import StopDao
+from gtfsjpcli.dao.stop_time import StopTimeDao
+from gtfsjpcli.dao.trip import TripDao
+
+
+def explain(session: Session, query: Query) -> List[str]:
+    """クエリの実行計画を取得します
+
+    Args:
+        session: セッション
+        query: 対象のクエリ
+
+    Returns:
+        実行計画の各ステップ (ex: SEARCH stop_times USING INDEX ix_stop_times_stop_id (stop_id=?))
+    """
+    compiled = query.statement.compile(dialect=session.bind.dialect)
+    params = [compiled.params[x] for x in compiled.positiontup]
+
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {compiled}", params)
+        return [x[-1] for x in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def to_targets(session: Session) -> Dict[str, Query]:
+    """実行計画を確認するクエリ. DAOのメソッドと、関連エンティティを遅延ロードするクエリが対象です"""
+    return {
+        "AgencyDao.all": AgencyDao(session).all(),
+        "AgencyDao.all(feed_id)": AgencyDao(session).all(""),
+        "RouteDao.all": RouteDao(session).all(),
+        "RouteDao.find_by_id": session.query(RouteEntity).filter(
+            RouteEntity.route_id == "", RouteEntity.feed_id == ""
+        ),
+        "ShapeDao.geometries": ShapeDao(session).geometries(""),
+        "ShapeDao.geometries(route_id)": ShapeDao(session).geometries(route_id=""),
+        "ShapeDao.points": ShapeDao(session).points(""),
+        "ShapeDao.points(route_id)": ShapeDao(session).points(route_id=""),
+        "StopDao.all": StopDao(session).all(),
+        "StopDao.search_by_id": StopDao(session).search_by_id(""),
+        "StopDao.search_by_id(feed_id)": StopDao(session).search_by_id("", ""),
+        "StopDao.search_by_name": StopDao(session).search_by_name("東京駅", 10),
+        "StopDao.search_near": StopDao(session).to_within_query(35.681236, 139.767125, 500),
+        "StopTimeDao.trip_ids_by_stop_ids": StopTimeDao(session).to_trip_ids_query(["", ""], ""),
+        "StopTimeDao.search_departures": StopTimeDao(session).to_departures_query(
+            "", "", {""}, 0, 10
+        ),
+        "StopTimeDao.search_departures(typed)": StopTimeDao(session).to_departures_query(
+            "", "", {""}, 0, 10, typed=True
+        ),
+        "StopTimeDao.iter_timetable_rows": StopTimeDao(session).to_timetable_rows_query("", {""}),
+        "ServiceDayDao.service_ids_on": ServiceDayDao(session).to_service_ids_query("", ""),
+        "TripDao.all": TripDao(session).all(),
+        "TripDao.head": TripDao(session).head(10),
+        "AgencyEntity.routes": with_parent(
+            session, AgencyEntity(agency_id="", feed_id=""), "routes"
+        ),
+        "StopEntity.stop_times": with_parent(
+            session, StopEntity(stop_id="", feed_id=""), "stop_times"
+        ),
+        "StopEntity.translation_ja": with_parent(
+            session, StopEntity(stop_name="", feed_id=""), "translation_ja"
+        ),
+        "RouteEntity.trips": with_parent(session, RouteEntity(route_id="", feed_id=""), "trips"),
+        "RouteEntity.fare_rules": with_parent(
+            session, RouteEntity(route_id="", feed_id=""), "fare_rules"
+        ),
+        "TripEntity.stop_times": with_parent(
+            session, TripEntity(trip_id="", feed_id=""), "stop_times"
+        ),
+        "TripEntity.shapes": with_parent(session, TripEntity(shape_id="", feed_id=""), "shapes"),
+        "TripEntity.service_days": with_parent(
+            session, TripEntity(service_id="", feed_id=""), "service_days"
+        ),
+        "CalendarDateEntity.trips": with_parent(
+            session, CalendarDateEntity(service_id="", feed_id=""), "trips"
+        ),
+        "ShapeEntity.trip": with_parent(session, ShapeEntity(shape_id="", feed_id=""), "trip"),
+        "FareRuleEntity.origin_stop": with_parent(
+            session, FareRuleEntity(origin_id="", feed_id=""), "origin_stop"
+        ),
+        "TranslationEntity -> StopEntity": session.query(StopEntity)
+        .join(
+            TranslationEntity,
+            (TranslationEntity.trans_id == StopEntity.stop_name)
+            & (TranslationEntity.feed_id == StopEntity.feed_id),
+        )
+        .filter(TranslationEntity.translation == ""),
+        "StopTimeEntity.stop": with_parent(session, StopTimeEntity(stop_id="", feed_id=""), "stop"),
+    }
+
+
+def with_parent(session: Session, instance, attr: str) -> Query:
+    relationship = getattr(type(instance), attr)
+    return session.query(relationship.property.mapper.class_).with_parent(instance, attr)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from gtfsjpcli.dao.entities import FeedInfoEntity, PropertyEntity, SourceFileEntity
+
+
+class MetadataDao:
+    """読み込んだファイルやデータベースの属性情報"""
+
+    session: Session
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def feed_ids(self) -> List[str]:
+        """読み込んだファイルの情報があるフィードID"""
+        return [x for x, in self.session.query(SourceFileEntity.feed_id).distinct()]
+
+    def source_files(self, feed_id: str = "") -> Dict[str, SourceFileEntity]:
+        return {
+            x.file_name: x
+            for x in self.session.query(SourceFileEntity).filter(
+                SourceFileEntity.feed_id == feed_id
+            )
+        }
+
+    def save_source_file(self, source_file: SourceFileEntity):
+        self.session.merge(source_file)
+
+    def delete_source_file(self, file_name: str, feed_id: str = ""):
+        self.session.query(SourceFileEntity).filter(
+            SourceFileEntity.file_name == file_name, SourceFileEntity.feed_id == feed_id
+        ).delete()
+
+    def find_property(self, key: str, feed_id: str = "") -> Optional[str]:
+        record: Optional[PropertyEntity] = self.session.query(PropertyEntity).get((feed_id, key))
+        return record.value if record else None
+
+    def save_property(self, key: str, value: Optional[str], feed_id: str = ""):
+        self.session.merge(PropertyEntity(feed_id=feed_id, key=key, value=value))
+
+    def feed_version(self, feed_id: str = "") -> Optional[str]:
+        """feed_info.txtの提供データバージョン"""
+        record: Optional[FeedInfoEntity] = (
+            self.session.query(FeedInfoEntity).filter(FeedInfoEntity.feed_id == feed_id).first()
+        )
+        return record.feed_version if record else None
@@ -16,5 +16,5 @@ class RouteDao():
     def all(self) -> Iterable[RouteEntity]:
         return self.session.query(RouteEntity)
 
-    def find_by_id(self, id_: str) -> Optional[RouteEntity]:
-        return self.session.query(RouteEntity).get(id_)
+    def find_by_id(self, id_: str, feed_id: str = "") -> Optional[RouteEntity]:
+        return self.session.query(RouteEntity).get((id_, feed_id))
@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+"""テーブルやインデックスなどスキーマの作成
+
+一括登録を速くするため、主キー(SQLiteではユニークインデックスとして実装される)と
+エンティティに定義したインデックスを、登録後にまとめて作成できるようにしています.
+"""
+
+from contextlib import contextmanager
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, List, Tuple, Union
+
+from sqlalchemy import Column, Index, MetaData, Table, event, inspect, text
+from sqlalchemy.exc import OperationalError
+
+from gtfsjpcli.dao.entities import BASE, ShapeGeometryEntity
+from gtfsjpcli.dao.types import to_storage_type
+from gtfsjpcli.utils import polyline
+from gtfsjpcli.utils.iterators import chunked
+
+FAST_LOAD_PRAGMAS: Dict[str, Union[str, int]] = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "temp_store": "MEMORY",
+    "cache_size": -256 * 1024,
+}
+"""一括登録中だけ使うPRAGMA. 途中で異常終了した場合はDBが壊れるので作り直しが前提です"""
+
+
+STOP_SEARCH_TABLE = "stops_fts"
+"""停留所/標柱名称の全文検索用テーブル (FTS5 trigram)"""
+STOP_SPATIAL_TABLE = "stops_rtree"
+"""停留所/標柱の位置の空間インデックス用テーブル (R*Tree)"""
+SHAPE_GEOMETRY_BATCH_SIZE = 1000
+"""描画IDごとにまとめた描画情報を1回のinsertで登録する件数"""
+
+
+def to_key_index_name(table: Table) -> str:
+    return f"pk_{table.name}"
+
+
+def create_tables(engine, *, with_keys: bool = True, typed: bool = False):
+    """全テーブルを作成します
+
+    Args:
+        engine: SQLAlchemyのengine
+        with_keys: Falseの場合は主キーとインデックスを付けずに作成します.
+            登録後に create_indexes を実行してください
+        typed: 時刻や緯度経度を型付き形式(整数/実数)で格納するテーブルにするかどうか
+    """
+    if with_keys:
+        to_storage_metadata(typed).create_all(engine)
+    else:
+        for table in to_keyless_tables(typed):
+            table.create(engine)
+
+
+def create_indexes(engine):
+    """with_keys=False で作成したテーブルに主キー相当のユニークインデックスと、エンティティに定義したインデックスを作成します"""
+    for index in to_key_indexes() + to_secondary_indexes():
+        index.create(engine)
+
+
+def to_storage_metadata(typed: bool) -> MetaData:
+    """格納形式に応じた型のテーブル定義"""
+    if not typed:
+        return BASE.metadata
+
+    metadata = MetaData()
+    for table in BASE.metadata.sorted_tables:
+        for column in table.tometadata(metadata).columns:
+            column.type = to_storage_type(column.type, typed)
+    return metadata
+
+
+def to_keyless_tables(typed: bool = False) -> List[Table]:
+    metadata = MetaData()
+    return [
+        Table(
+            table.name,
+            metadata,
+            *[
+                Column(
+                    x.name,
+                    to_storage_type(x.type, typed),
+                    nullable=x.nullable,
+                    server_default=x.server_default.arg if x.server_default else None,
+                )
+                for x in table.columns
+            ],
+        )
+        for table in BASE.metadata.sorted_tables
+    ]
+
+
+def to_key_indexes() -> List[Index]:
+    return [
+        Index(
+            to_key_index_name(table),
+            *[keyless.c[x.name] for x in table.primary_key.columns],
+            unique=True,
+        )
+        for table, keyless in zip(BASE.metadata.sorted_tables, to_keyless_tables())
+    ]
+
+
+def to_secondary_indexes() -> List[Index]:
+    return [
+        index
+        for table in BASE.metadata.sorted_tables
+        for index in sorted(table.indexes, key=lambda x: x.name)
+    ]
+
+
+def has_current_schema(engine) -> bool:
+    """全てのテーブルが、現在のエンティティ定義と同じカラムとインデックスで存在するかどうか. 古いバージョンで作成したDBはFalseになります"""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    return all(
+        table.name in tables
+        and {x["name"] for x in inspector.get_columns(table.name)}
+        == {x.name for x in table.columns}
+        and {x.name for x in table.indexes}
+        <= {x["name"] for x in inspector.get_indexes(table.name)}
+        for table in BASE.metadata.sorted_tables
+    )
+
+
+def drop_tables(engine):
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {STOP_SEARCH_TABLE}"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {STOP_SPATIAL_TABLE}"))
+    BASE.metadata.drop_all(engine)
+
+
+def create_stop_search_index(engine) -> bool:
+    """停留所/標柱のID、フィードID、名称キー、日本語/読み仮名/英語名称を全文検索するためのテーブルを作成します
+
+    trigramトークナイザを使うので3文字以上であれば部分一致でインデックスが効きます.
+
+    Returns:
+        作成できたかどうか. SQLiteがFTS5のtrigramに対応していない(3.34未満)場合はFalse
+    """
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {STOP_SEARCH_TABLE}"))
+        try:
+            conn.execute(
+                text(
+                    f"CREATE VIRTUAL TABLE {STOP_SEARCH_TABLE}"
+                    " USING fts5(stop_id UNINDEXED, feed_id UNINDEXED, stop_name, name, kana, en,"
+                    " tokenize='trigram')"
+                )
+            )
+        except OperationalError:
+            return False
+
+        conn.execute(
+            text(
+                f"""
+INSERT INTO {STOP_SEARCH_TABLE} (stop_id, feed_id, stop_name, name, kana, en)
+SELECT s.stop_id, s.feed_id, s.stop_name, ja.translation, kana.translation, en.translation
+FROM stops s
+LEFT JOIN translations ja
+  ON ja.trans_id = s.stop_name AND ja.feed_id = s.feed_id AND ja.lang = 'ja'
+LEFT JOIN translations kana
+  ON kana.trans_id = s.stop_name AND kana.feed_id = s.feed_id AND kana.lang = 'ja-Hrkt'
+LEFT JOIN translations en
+  ON en.trans_id = s.stop_name AND en.feed_id = s.feed_id AND en.lang = 'en'
+"""
+            )
+        )
+        return True
+
+
+def create_stop_spatial_index(engine) -> bool:
+    """停留所/標柱の緯度経度で範囲検索するための空間インデックス(R*Tree)を作成します
+
+    VACUUMでstopsのrowidが変わっても使えるよう、停留所/標柱ID、フィードIDを補助カラムに持ちます.
+
+    Returns:
+        作成できたかどうか. SQLiteがR*Treeの補助カラムに対応していない(3.24未満)場合はFalse
+    """
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {STOP_SPATIAL_TABLE}"))
+        try:
+            conn.execute(
+                text(
+                    f"CREATE VIRTUAL TABLE {STOP_SPATIAL_TABLE}"
+                    " USING rtree(id, min_lat, max_lat, min_lon, max_lon, +stop_id, +feed_id)"
+                )
+            )
+        except OperationalError:
+            return False
+
+        conn.execute(
+            text(
+                f"""
+INSERT INTO {STOP_SPATIAL_TABLE} (id, min_lat, max_lat, min_lon, max_lon, stop_id, feed_id)
+SELECT rowid, CAST(stop_lat AS REAL), CAST(stop_lat AS REAL),
+       CAST(stop_lon AS REAL), CAST(stop_lon AS REAL), stop_id, feed_id
+FROM stops
+"""
+            )
+        )
+        return True
+
+
+def create_service_days(engine):
+    """運行区分情報を日付ごとに展開し、運行日情報の例外を反映して service_days に作り直します
+
+    曜日は日曜始まりの7文字のフラグ(ex: 0111110)にして、再帰CTEで期間内の日付を1日ずつ判定します.
+    """
+    with engine.connect() as conn, conn.begin():
+        conn.execute(text("DELETE FROM service_days"))
+        conn.execute(
+            text(
+                """
+INSERT INTO service_days (date, service_id, feed_id)
+WITH RECURSIVE days (service_id, feed_id, weekdays, day, end_day) AS (
+  SELECT service_id, feed_id,
+         sunday || monday || tuesday || wednesday || thursday || friday || saturday,
+         date(substr(start_date, 1, 4) || '-' || substr(start_date, 5, 2) || '-' || substr(start_date, 7, 2)),
+         date(substr(end_date, 1, 4) || '-' || substr(end_date, 5, 2) || '-' || substr(end_date, 7, 2))
+  FROM calendar
+  UNION ALL
+  SELECT service_id, feed_id, weekdays, date(day, '+1 day'), end_day
+  FROM days
+  WHERE day < end_day
+)
+SELECT replace(d.day, '-', ''), d.service_id, d.feed_id
+FROM days d
+WHERE substr(d.weekdays, strftime('%w', d.day) + 1, 1) = '1'
+  AND NOT EXISTS (
+    SELECT 1 FROM calendar_dates x
+    WHERE x.date = replace(d.day, '-', '') AND x.service_id = d.service_id
+      AND x.feed_id = d.feed_id AND x.exception_type = 2
+  )
+UNION
+SELECT date, service_id, feed_id FROM calendar_dates WHERE exception_type = 1
+"""
+            )
+        )
+
+
+def create_shape_geometries(engine, batch_size: int = SHAPE_GEOMETRY_BATCH_SIZE):
+    """描画情報の点を描画IDごとに1行にまとめて shape_geometries に格納し、shapes の行を削除します
+
+    shapes に行があるフィードだけを作り直すので、フィードを入れ替えた場合も他のフィードのものは残ります.
+    点は描画順序の順にストリームで読み込むので、メモリ上に保持するのは1描画ID分の点とbatch_size件だけです.
+
+    Args:
+        engine: SQLAlchemyのengine
+        batch_size: 1回のinsertで登録する件数
+    """
+    table = ShapeGeometryEntity.__table__
+    with engine.connect() as conn, conn.begin():
+        for (feed_id,) in conn.execute(text("SELECT DISTINCT feed_id FROM shapes")).fetchall():
+            conn.execute(table.delete().where(table.c.feed_id == feed_id))
+
+        points = conn.execute(
+            text(
+                """
+SELECT feed_id, shape_id, shape_pt_lat, shape_pt_lon
+FROM shapes
+ORDER BY feed_id, shape_id, shape_pt_sequence
+"""
+            )
+        )
+        # SQLiteのCASTは10進数の文字列を最も近い実数にするとは限らないので、Pythonで変換する
+        geometries = (
+            to_shape_geometry(feed_id, shape_id, [(float(x[2]), float(x[3])) for x in group])
+            for (feed_id, shape_id), group in groupby(points, key=itemgetter(0, 1))
+        )
+        for chunk in chunked(geometries, batch_size):
+            conn.execute(table.insert(), chunk)
+        conn.execute(text("DELETE FROM shapes"))
+
+
+def to_shape_geometry(feed_id: str, shape_id: str, points: List[Tuple[float, float]]) -> dict:
+    """1描画IDの点(緯度, 経度)を、描画順序の順に shape_geometries の1行にします"""
+    lats = [x[0] for x in points]
+    lons = [x[1] for x in points]
+    return {
+        "feed_id": feed_id,
+        "shape_id": shape_id,
+        "points": len(points),
+        "min_lat": min(lats),
+        "min_lon": min(lons),
+        "max_lat": max(lats),
+        "max_lon": max(lons),
+        "polyline": polyline.encode(points),
+    }
+
+
+def merge_database(engine, path: str, tables: List[Table]):
+    """別のSQLiteファイルにある同じ名前のテーブルの全レコードを、1トランザクションでまとめて追加します
+
+    ATTACHしてINSERT ... SELECTするので、レコードをPythonに読み込みません.
+
+    Args:
+        engine: SQLAlchemyのengine
+        path: 追加するレコードがあるSQLiteファイルのパス
+        tables: 対象のテーブル
+    """
+    with engine.connect() as conn:
+        conn.execute(text("ATTACH DATABASE :path AS staging"), {"path": path})
+        try:
+            with conn.begin():
+                for table in tables:
+                    columns = ", ".join(x.name for x in table.columns)
+                    conn.execute(
+                        text(
+                            f"INSERT INTO main.{table.name} ({columns})"
+                            f" SELECT {columns} FROM staging.{table.name}"
+                        )
+                    )
+        finally:
+            conn.execute(text("DETACH DATABASE staging"))
+
+
+def analyze_database(engine):
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def vacuum_database(engine):
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+
+
+@contextmanager
+def sqlite_pragmas(engine, pragmas: Dict[str, Union[str, int]]):
+    """with句の中で新しく接続したコネクションにPRAGMAを設定します
+
+    Args:
+        engine: SQLAlchemyのengine
+        pragmas: PRAGMA名と値
+    """
+
+    def set_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    event.listen(engine, "connect", set_pragmas)
+    engine.dispose()
+    try:
+        yield
+    finally:
+        event.remove(engine, "connect", set_pragmas)
+        engine.dispose()
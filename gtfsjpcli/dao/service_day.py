@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+from typing import Dict, Optional, Set
+
+from sqlalchemy.orm import Query, Session
+
+from gtfsjpcli.dao.entities import ServiceDayEntity
+
+
+class ServiceDayDao:
+    session: Session
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def service_ids_on(self, date: str, feed_id: Optional[str] = None) -> Dict[str, Set[str]]:
+        """運行日に運行するサービスIDを取得します. 主キー(date, service_id, feed_id)の範囲検索で完結します
+
+        Args:
+            date: 運行日 (YYYYMMDD形式)
+            feed_id: フィードID (Noneの場合は全てのフィード)
+
+        Returns:
+            フィードIDをキー、運行するサービスIDを値とする辞書. 運行するサービスがないフィードは含みません
+        """
+        service_ids: Dict[str, Set[str]] = {}
+        for feed_id_, service_id in self.to_service_ids_query(date, feed_id):
+            service_ids.setdefault(feed_id_, set()).add(service_id)
+        return service_ids
+
+    def to_service_ids_query(self, date: str, feed_id: Optional[str] = None) -> Query:
+        """運行日に運行する (フィードID, サービスID) を取得するクエリ"""
+        query = self.session.query(ServiceDayEntity.feed_id, ServiceDayEntity.service_id).filter(
+            ServiceDayEntity.date == date
+        )
+        if feed_id is not None:
+            query = query.filter(ServiceDayEntity.feed_id == feed_id)
+        return query
+
+    def is_running(self, service_id: str, date: str, feed_id: str = "") -> bool:
+        """サービスが運行日に運行するかどうか. 主キーの1回の検索で判定します
+
+        Args:
+            service_id: 運行ID (便の場合は trips.service_id)
+            date: 運行日 (YYYYMMDD形式)
+            feed_id: フィードID
+        """
+        return self.session.query(ServiceDayEntity).get((date, service_id, feed_id)) is not None
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from gtfsjpcli.dao.entities import ShapeEntity, ShapeGeometryEntity, TripEntity
+
+YIELD_PER = 1000
+"""描画情報を一度に読み込む件数"""
+
+
+class ShapeDao:
+    session: Session
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def geometries(
+        self,
+        shape_id: Optional[str] = None,
+        route_id: Optional[str] = None,
+        feed_id: Optional[str] = None,
+    ) -> Iterable[ShapeGeometryEntity]:
+        """描画IDごとにまとめた描画情報を、フィードIDと描画IDの順に少しずつ読み込みます
+
+        Args:
+            shape_id: 描画ID (Noneの場合は全て)
+            route_id: 経路ID. 経路の便が使う描画IDに絞り込みます (Noneの場合は全て)
+            feed_id: フィードID (Noneの場合は全てのフィード)
+        """
+        columns = (ShapeGeometryEntity.shape_id, ShapeGeometryEntity.feed_id)
+        return (
+            self.session.query(ShapeGeometryEntity)
+            .filter(*self.__to_conditions(columns, shape_id, route_id, feed_id))
+            .order_by(ShapeGeometryEntity.feed_id, ShapeGeometryEntity.shape_id)
+            .yield_per(YIELD_PER)
+        )
+
+    def points(
+        self,
+        shape_id: Optional[str] = None,
+        route_id: Optional[str] = None,
+        feed_id: Optional[str] = None,
+    ) -> Iterable[Tuple[str, str, str, str]]:
+        """描画情報の点を (フィードID, 描画ID, 緯度, 経度) で、フィードID、描画ID、描画順序の順に少しずつ読み込みます
+
+        緯度経度は格納形式(テキスト/型付き)に関わらず文字列で返します. 型付き形式では正規化した表記です (35.00355 など).
+
+        Args:
+            shape_id: 描画ID (Noneの場合は全て)
+            route_id: 経路ID. 経路の便が使う描画IDに絞り込みます (Noneの場合は全て)
+            feed_id: フィードID (Noneの場合は全てのフィード)
+        """
+        columns = (ShapeEntity.shape_id, ShapeEntity.feed_id)
+        return (
+            self.session.query(
+                ShapeEntity.feed_id,
+                ShapeEntity.shape_id,
+                ShapeEntity.shape_pt_lat,
+                ShapeEntity.shape_pt_lon,
+            )
+            .filter(*self.__to_conditions(columns, shape_id, route_id, feed_id))
+            .order_by(ShapeEntity.feed_id, ShapeEntity.shape_id, ShapeEntity.shape_pt_sequence)
+            .yield_per(YIELD_PER)
+        )
+
+    def __to_conditions(
+        self,
+        columns: tuple,
+        shape_id: Optional[str],
+        route_id: Optional[str],
+        feed_id: Optional[str],
+    ) -> List:
+        shape_id_column, feed_id_column = columns
+        conditions = []
+        if shape_id is not None:
+            conditions.append(shape_id_column == shape_id)
+        if feed_id is not None:
+            conditions.append(feed_id_column == feed_id)
+        if route_id is not None:
+            # 便は経路IDのインデックスで探し、(描画ID, フィードID)の組で絞り込む
+            trips = self.session.query(TripEntity.shape_id, TripEntity.feed_id).filter(
+                TripEntity.route_id == route_id
+            )
+            if feed_id is not None:
+                trips = trips.filter(TripEntity.feed_id == feed_id)
+            conditions.append(tuple_(shape_id_column, feed_id_column).in_(trips.subquery()))
+        return conditions
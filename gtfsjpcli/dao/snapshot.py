@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""通過時刻情報(stop_times)の列指向スナップショット
+
+DBファイルの隣のディレクトリ(ex: gtfs-jp.sqlite3.snapshot)に、カラムごとのNumPy配列(.npy)と
+ID文字列の表(intern table)を書き出します. 読み込む時はメモリマップで開くので、
+レコードをパースしたりコピーしたりせずに、新しいプロセスでもすぐに全件を参照できます.
+
+NumPyはオプションの依存です (pip install gtfsjp-cli[snapshot]).
+"""
+
+import json
+import os
+import shutil
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import text
+
+from gtfsjpcli.utils.times import to_seconds
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SNAPSHOT_SUFFIX = ".snapshot"
+"""スナップショットのディレクトリ名にする、DBファイル名への接尾辞"""
+SNAPSHOT_VERSION = 1
+"""スナップショットの形式のバージョン. 形式が変わった場合は読み込みません"""
+MANIFEST_FILE = "manifest.json"
+NO_TIME = -1
+"""時刻がないことを表す値"""
+
+
+def is_available() -> bool:
+    """スナップショットを使えるかどうか (NumPyがインストールされているか)"""
+    return np is not None
+
+
+def to_snapshot_dir(database_path: str) -> str:
+    return database_path + SNAPSHOT_SUFFIX
+
+
+def write_snapshot(engine, database_path: str):
+    """DBの通過時刻情報から、スナップショットを作り直します
+
+    stop_timesはrowid順に読み込み、(便, 通過順位)で並べ替えて書き出します.
+    書き出し中に失敗しても既存のスナップショットを壊さないよう、一時ディレクトリに書いてから入れ替えます.
+    DBの更新日時とサイズを記録するので、以降にDBを更新した場合は古いスナップショットとして使われません.
+
+    Args:
+        engine: SQLAlchemyのengine
+        database_path: DBファイルのパス
+
+    Raises:
+        RuntimeError: NumPyがインストールされていない場合
+    """
+    if np is None:
+        raise RuntimeError("numpy is required to write a snapshot. (pip install numpy)")
+
+    with engine.connect() as conn:
+        feed_ids = sorted(
+            {x for (x,) in conn.execute(text("SELECT DISTINCT feed_id FROM trips"))}
+            | {x for (x,) in conn.execute(text("SELECT DISTINCT feed_id FROM stops"))}
+        )
+        feed_index = {x: i for i, x in enumerate(feed_ids)}
+
+        stops = conn.execute(
+            text("SELECT stop_id, feed_id FROM stops ORDER BY feed_id, stop_id")
+        ).fetchall()
+        stop_index = {(x.stop_id, x.feed_id): i for i, x in enumerate(stops)}
+
+        trips = conn.execute(
+            text(
+                "SELECT trip_id, feed_id, route_id, service_id FROM trips ORDER BY feed_id, trip_id"
+            )
+        ).fetchall()
+        trip_index = {(x.trip_id, x.feed_id): i for i, x in enumerate(trips)}
+        route_ids, trip_routes = intern([x.route_id for x in trips])
+        service_ids, trip_services = intern([x.service_id for x in trips])
+
+        rows = conn.execute(
+            text(
+                "SELECT trip_id, feed_id, stop_id, stop_sequence, arrival_time, departure_time"
+                " FROM stop_times"
+            )
+        )
+        stop_time_trips, stop_time_stops, stop_sequences, arrivals, departures = (
+            np.array(x, dtype=np.int32)
+            for x in to_columns(
+                (
+                    trip_index.get((trip_id, feed_id), -1),
+                    stop_index.get((stop_id, feed_id), -1),
+                    sequence,
+                    to_stored_seconds(arrival),
+                    to_stored_seconds(departure),
+                )
+                for trip_id, feed_id, stop_id, sequence, arrival, departure in rows
+            )
+        )
+
+    order = np.lexsort((stop_sequences, stop_time_trips))
+    stop_time_trips = stop_time_trips[order]
+    columns = {
+        "feed_ids": to_strings(feed_ids),
+        "stop_ids": to_strings([x.stop_id for x in stops]),
+        "stop_feeds": np.array([feed_index[x.feed_id] for x in stops], dtype=np.int32),
+        "trip_ids": to_strings([x.trip_id for x in trips]),
+        "trip_feeds": np.array([feed_index[x.feed_id] for x in trips], dtype=np.int32),
+        "route_ids": to_strings(route_ids),
+        "trip_routes": trip_routes,
+        "service_ids": to_strings(service_ids),
+        "trip_services": trip_services,
+        # 便ごとの通過時刻の範囲 (CSR形式). 便に紐付かない通過時刻(-1)は先頭に集まるので除きます
+        "trip_stop_times_start": np.searchsorted(
+            stop_time_trips, np.arange(len(trips) + 1), side="left"
+        ).astype(np.int64),
+        "stop_time_trips": stop_time_trips,
+        "stop_time_stops": stop_time_stops[order],
+        "stop_sequences": stop_sequences[order],
+        "arrivals": arrivals[order],
+        "departures": departures[order],
+    }
+
+    directory = to_snapshot_dir(database_path)
+    work_dir = directory + ".tmp"
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir)
+    for name, values in columns.items():
+        np.save(os.path.join(work_dir, f"{name}.npy"), values, allow_pickle=False)
+    with open(os.path.join(work_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": SNAPSHOT_VERSION,
+                "database": to_database_stamp(database_path),
+                "stop_times": len(stop_time_trips),
+                "trips": len(trips),
+                "stops": len(stops),
+            },
+            f,
+        )
+
+    remove_snapshot(database_path)
+    os.replace(work_dir, directory)
+
+
+def remove_snapshot(database_path: str):
+    shutil.rmtree(to_snapshot_dir(database_path), ignore_errors=True)
+
+
+def open_snapshot(database_path: str) -> Optional["Snapshot"]:
+    """スナップショットをメモリマップで開きます
+
+    Returns:
+        スナップショット. 存在しない場合、NumPyがない場合、形式が古い場合、DBの方が新しい場合はNone
+    """
+    directory = to_snapshot_dir(database_path)
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if np is None or not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_VERSION or manifest.get("database") != to_database_stamp(
+        database_path
+    ):
+        return None
+    return Snapshot(directory)
+
+
+class Snapshot:
+    """メモリマップで開いたスナップショット
+
+    stop_time_xxx, stop_sequences, arrivals, departures は通過時刻ごとの配列で、(便, 通過順位)の順です.
+    便の通過時刻は `trip_stop_times_start[i]:trip_stop_times_start[i + 1]` の範囲にあります.
+    時刻は運行日の0時からの秒数で、ない場合はNO_TIMEです.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.feed_ids = self.__load("feed_ids")
+        self.stop_ids = self.__load("stop_ids")
+        self.stop_feeds = self.__load("stop_feeds")
+        self.trip_ids = self.__load("trip_ids")
+        self.trip_feeds = self.__load("trip_feeds")
+        self.route_ids = self.__load("route_ids")
+        self.trip_routes = self.__load("trip_routes")
+        self.service_ids = self.__load("service_ids")
+        self.trip_services = self.__load("trip_services")
+        self.trip_stop_times_start = self.__load("trip_stop_times_start")
+        self.stop_time_trips = self.__load("stop_time_trips")
+        self.stop_time_stops = self.__load("stop_time_stops")
+        self.stop_sequences = self.__load("stop_sequences")
+        self.arrivals = self.__load("arrivals")
+        self.departures = self.__load("departures")
+
+    def iter_timetable_rows(
+        self, feed_id: str, service_ids: Set[str]
+    ) -> Iterator[Tuple[str, str, str, Optional[int], Optional[int]]]:
+        """StopTimeDao.iter_timetable_rows と同じ行を、DBを読まずに返します
+
+        Args:
+            feed_id: フィードID
+            service_ids: 運行するサービスID
+
+        Returns:
+            (便ID, 経路ID, 停留所/標柱ID, 到着時刻(秒), 出発時刻(秒))
+        """
+        feeds = np.flatnonzero(self.feed_ids == feed_id)
+        services = np.flatnonzero(np.isin(self.service_ids, list(service_ids)))
+        if not len(feeds) or not len(services):
+            return
+
+        trip_mask = (self.trip_feeds == feeds[0]) & np.isin(self.trip_services, services)
+        # 便に紐付かない通過時刻(-1)は先頭に集まっているので除きます
+        begin = int(self.trip_stop_times_start[0])
+        rows = begin + np.flatnonzero(trip_mask[self.stop_time_trips[begin:]])
+
+        trips = self.stop_time_trips[rows]
+        stops = self.stop_time_stops[rows]
+        yield from zip(
+            self.trip_ids[trips].tolist(),
+            self.route_ids[self.trip_routes[trips]].tolist(),
+            [None if i < 0 else x for i, x in zip(stops.tolist(), self.stop_ids[stops].tolist())],
+            [None if x == NO_TIME else x for x in self.arrivals[rows].tolist()],
+            [None if x == NO_TIME else x for x in self.departures[rows].tolist()],
+        )
+
+    def __load(self, name: str):
+        return np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+
+
+def intern(values: List[str]) -> Tuple[List[str], "np.ndarray"]:
+    """文字列を、重複しない文字列の表と、表のindexの配列にします"""
+    table: Dict[str, int] = {}
+    indexes = np.array([table.setdefault(x, len(table)) for x in values], dtype=np.int32)
+    return list(table), indexes
+
+
+def to_columns(rows: Iterator[Tuple[int, ...]], width: int = 5) -> List[List[int]]:
+    """行のタプルをカラムごとのリストにします"""
+    columns: List[List[int]] = [[] for _ in range(width)]
+    appends = [x.append for x in columns]
+    for row in rows:
+        for append, value in zip(appends, row):
+            append(value)
+    return columns
+
+
+def to_strings(values: List[str]) -> "np.ndarray":
+    """文字列の配列. メモリマップで開けるよう固定長のUnicode文字列(<U)にします"""
+    return np.array(values, dtype=str) if values else np.empty(0, dtype="<U1")
+
+
+def to_stored_seconds(value: Union[int, str, None]) -> int:
+    """格納形式(秒数または文字列)の時刻を秒数にします. ない場合はNO_TIME"""
+    if value is None:
+        return NO_TIME
+    return value if isinstance(value, int) else to_seconds(value)
+
+
+def to_database_stamp(database_path: str) -> Dict[str, int]:
+    stat = os.stat(database_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
@@ -1,10 +1,21 @@
 #!/usr/bin/env python
 
-from typing import Iterable, Optional
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import Float, String, and_, cast, func, text
+from sqlalchemy.orm import Query, Session, joinedload
 
 from gtfsjpcli.dao.entities import StopEntity
+from gtfsjpcli.dao.schema import STOP_SEARCH_TABLE, STOP_SPATIAL_TABLE
+from gtfsjpcli.utils.geo import EARTH_RADIUS_METERS, to_bounding_box, to_distance
+
+MIN_SEARCH_INDEX_LENGTH = 3
+"""全文検索インデックス(trigram)が効く最小の文字数"""
+INITIAL_NEAR_RADIUS = 500
+"""半径を指定せずに近い順に検索する場合に、最初に探す半径(m). 見つからなければ4倍ずつ広げます"""
+MAX_NEAR_RADIUS = math.pi * EARTH_RADIUS_METERS
+"""地球上の2点間の最大距離(m)"""
 
 
 class StopDao:
@@ -12,12 +23,216 @@ class StopDao:
 
     def __init__(self, session: Session):
         self.session = session
+        self._has_tables: Dict[str, bool] = {}
 
     def all(self) -> Iterable[StopEntity]:
         return self.session.query(StopEntity)
 
-    def find_by_id(self, id_: str) -> Optional[StopEntity]:
-        return self.session.query(StopEntity).get(id_)
+    def search_by_id(self, id_: str, feed_id: Optional[str] = None) -> Iterable[StopEntity]:
+        """IDで検索します. 翻訳情報もまとめて取得します
+
+        IDはフィード内でのみ一意なので、feed_idを指定しない場合は複数のフィードの停留所/標柱を返すことがあります.
+
+        Args:
+            id_: 停留所/標柱ID
+            feed_id: フィードID (Noneの場合は全てのフィード)
+        """
+        query = (
+            self.session.query(StopEntity)
+            .options(*to_eager_options())
+            .filter(StopEntity.stop_id == id_)
+        )
+        return (
+            query.filter(StopEntity.feed_id == feed_id)
+            if feed_id is not None
+            else query.order_by(StopEntity.feed_id)
+        )
+
+    def search_by_name(
+        self,
+        name: str,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        feed_id: Optional[str] = None,
+    ) -> Iterable[StopEntity]:
+        """名称(日本語/読み仮名/英語)の部分一致で検索します. 一致度の高い順に返します
+
+        全文検索インデックスがない場合は名称キー(stop_name)の部分一致で検索します.
+        翻訳情報も結合して1回のクエリで取得します.
+
+        Args:
+            name: 検索する名称
+            limit: 最大件数 (Noneの場合は全件)
+            offset: 読み飛ばす件数
+            feed_id: フィードID (Noneの場合は全てのフィード)
+        """
+        query = self.session.query(StopEntity).options(*to_eager_options())
+        if feed_id is not None:
+            query = query.filter(StopEntity.feed_id == feed_id)
+
+        if not self.has_search_index():
+            query = query.filter(StopEntity.stop_name.like(f"%{name}%"))
+        elif len(name) < MIN_SEARCH_INDEX_LENGTH:
+            # trigramは2文字以下だとインデックスが効かないので全文検索テーブルを走査する
+            # 短い名称ほど一致度が高いとみなす
+            matched = (
+                text(
+                    f"SELECT stop_id, feed_id, stop_name FROM {STOP_SEARCH_TABLE}"
+                    " WHERE stop_name LIKE :pattern OR name LIKE :pattern"
+                    " OR kana LIKE :pattern OR en LIKE :pattern"
+                )
+                .bindparams(pattern=f"%{name}%")
+                .columns(stop_id=String, feed_id=String, stop_name=String)
+                .alias("matched")
+            )
+            query = query.join(matched, to_matched_condition(matched)).order_by(
+                func.length(matched.c.stop_name), StopEntity.stop_id, StopEntity.feed_id
+            )
+        else:
+            matched = (
+                text(
+                    f"SELECT stop_id, feed_id, rank FROM {STOP_SEARCH_TABLE}"
+                    f" WHERE {STOP_SEARCH_TABLE} MATCH :phrase"
+                )
+                .bindparams(phrase=to_phrase(name))
+                .columns(stop_id=String, feed_id=String, rank=Float)
+                .alias("matched")
+            )
+            query = query.join(matched, to_matched_condition(matched)).order_by(
+                matched.c.rank, StopEntity.stop_id, StopEntity.feed_id
+            )
+
+        query = query.offset(offset) if offset else query
+        return query.limit(limit) if limit is not None else query
+
+    def search_near(
+        self,
+        lat: float,
+        lon: float,
+        radius: Optional[float] = None,
+        limit: Optional[int] = None,
+        feed_id: Optional[str] = None,
+    ) -> List[Tuple[StopEntity, float]]:
+        """位置から近い順に検索します. 翻訳情報もまとめて取得します
+
+        空間インデックスで範囲を絞り込んでから、大円距離で判定します.
+        空間インデックスがない場合は緯度経度の範囲で全件を走査します.
+
+        Args:
+            lat: 中心の緯度
+            lon: 中心の経度
+            radius: 半径(m). Noneの場合はlimit件見つかるまで範囲を広げます
+            limit: 最大件数 (radiusがNoneの場合は必須)
+            feed_id: フィードID (Noneの場合は全てのフィード)
+
+        Returns:
+            停留所/標柱と中心からの距離(m)
+        """
+        if radius is not None:
+            return self.__search_within(lat, lon, radius, feed_id)[:limit]
+        if limit is None:
+            raise ValueError("Either radius or limit is required.")
+
+        radius = INITIAL_NEAR_RADIUS
+        while True:
+            found = self.__search_within(lat, lon, radius, feed_id)
+            if len(found) >= limit or radius >= MAX_NEAR_RADIUS:
+                return found[:limit]
+            radius *= 4
+
+    def iter_locations(
+        self, feed_id: str
+    ) -> Iterable[Tuple[str, Optional[str], Optional[str], Optional[str]]]:
+        """停留所/標柱の位置と親駅を取得します. 経路探索用の時刻表の作成に使います
+
+        Args:
+            feed_id: フィードID
+
+        Returns:
+            (停留所/標柱ID, 緯度, 経度, 親駅ID)
+        """
+        return self.session.query(
+            StopEntity.stop_id, StopEntity.stop_lat, StopEntity.stop_lon, StopEntity.parent_station
+        ).filter(StopEntity.feed_id == feed_id)
+
+    def has_search_index(self) -> bool:
+        return self.__has_table(STOP_SEARCH_TABLE)
+
+    def has_spatial_index(self) -> bool:
+        return self.__has_table(STOP_SPATIAL_TABLE)
+
+    def to_within_query(
+        self, lat: float, lon: float, radius: float, feed_id: Optional[str] = None
+    ) -> Query:
+        """中心から半径radius(m)の円を含む緯度経度の範囲にある停留所/標柱を取得するクエリ"""
+        min_lat, max_lat, min_lon, max_lon = to_bounding_box(lat, lon, radius)
+        query = self.session.query(StopEntity).options(*to_eager_options())
+        if feed_id is not None:
+            query = query.filter(StopEntity.feed_id == feed_id)
+
+        if not self.has_spatial_index():
+            return query.filter(
+                cast(StopEntity.stop_lat, Float).between(min_lat, max_lat),
+                cast(StopEntity.stop_lon, Float).between(min_lon, max_lon),
+            )
+
+        matched = (
+            text(
+                f"SELECT stop_id, feed_id FROM {STOP_SPATIAL_TABLE}"
+                " WHERE max_lat >= :min_lat AND min_lat <= :max_lat"
+                " AND max_lon >= :min_lon AND min_lon <= :max_lon"
+            )
+            .bindparams(min_lat=min_lat, max_lat=max_lat, min_lon=min_lon, max_lon=max_lon)
+            .columns(stop_id=String, feed_id=String)
+            .alias("matched")
+        )
+        return query.join(matched, to_matched_condition(matched))
+
+    def __search_within(
+        self, lat: float, lon: float, radius: float, feed_id: Optional[str]
+    ) -> List[Tuple[StopEntity, float]]:
+        found = [
+            (x, to_distance(lat, lon, float(x.stop_lat), float(x.stop_lon)))
+            for x in self.to_within_query(lat, lon, radius, feed_id)
+            if x.stop_lat is not None and x.stop_lon is not None
+        ]
+        return sorted(
+            [x for x in found if x[1] <= radius],
+            key=lambda x: (x[1], x[0].stop_id, x[0].feed_id),
+        )
+
+    def __has_table(self, name: str) -> bool:
+        if name not in self._has_tables:
+            self._has_tables[name] = bool(
+                self.session.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": name}
+                ).first()
+            )
+        return self._has_tables[name]
+
+
+def to_matched_condition(matched):
+    return and_(matched.c.stop_id == StopEntity.stop_id, matched.c.feed_id == StopEntity.feed_id)
+
+
+def to_eager_options() -> list:
+    """StopEntityを出力用に変換する際に参照する翻訳情報を、結合して同じクエリで取得するためのオプション
+
+    通過する便IDは StopTimeDao.trip_ids_by_stop_ids でまとめて取得してください
+    """
+    return [
+        joinedload(StopEntity.translation_ja),
+        joinedload(StopEntity.translation_kana),
+        joinedload(StopEntity.translation_en),
+    ]
+
+
+def to_phrase(word: str) -> str:
+    """FTS5のMATCHで語句全体を部分一致させるためのフレーズ表現にします
+
+    Usage:
 
-    def search_by_name(self, name: str) -> Iterable[StopEntity]:
-        return self.session.query(StopEntity).filter(StopEntity.stop_name.like(f"%{name}%"))
+        >>> to_phrase('東京"駅')
+        '"東京""駅"'
+    """
+    return '"' + word.replace('"', '""') + '"'
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import func, or_, type_coerce
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.types import NullType
+
+from gtfsjpcli.dao.entities import StopTimeEntity, TripEntity
+from gtfsjpcli.utils.iterators import chunked
+from gtfsjpcli.utils.times import to_seconds, to_time_text
+
+MAX_IN_CLAUSE_SIZE = 500
+"""IN句に指定する値の最大数. SQLiteのバインド変数上限(999)を超えないようにしています"""
+TIMETABLE_BATCH_SIZE = 10000
+"""時刻表の作成で、カーソルから1回に読み込む件数"""
+
+
+class StopTimeDao:
+    session: Session
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def all(self) -> Iterable[StopTimeEntity]:
+        return self.session.query(StopTimeEntity)
+
+    def trip_ids_by_stop_ids(
+        self, stop_ids: Iterable[str], feed_id: Optional[str] = None
+    ) -> Dict[Tuple[str, str], List[str]]:
+        """停留所/標柱ごとに通過する便IDを重複なしで取得します
+
+        集約はSQLで行い、(stop_id, feed_id, trip_id)のインデックスだけで完結します.
+
+        Args:
+            stop_ids: 停留所/標柱ID
+            feed_id: フィードID (Noneの場合は全てのフィード)
+
+        Returns:
+            (フィードID, 停留所/標柱ID)をキー、便IDのリスト(昇順)を値とする辞書.
+            通過する便がないIDはキーに含まれません
+        """
+        trip_ids_by_stop: Dict[Tuple[str, str], List[str]] = {}
+        for ids in chunked(stop_ids, MAX_IN_CLAUSE_SIZE):
+            for feed_id_, stop_id, trip_id in self.to_trip_ids_query(ids, feed_id):
+                trip_ids_by_stop.setdefault((feed_id_, stop_id), []).append(trip_id)
+        return trip_ids_by_stop
+
+    def to_trip_ids_query(self, stop_ids: List[str], feed_id: Optional[str] = None) -> Query:
+        """停留所/標柱ごとに通過する便IDを重複なしで取得するクエリ. stop_idsは MAX_IN_CLAUSE_SIZE 件まで
+
+        Returns:
+            (フィードID, 停留所/標柱ID, 便ID) を停留所/標柱ID、フィードID、便IDの順に返すクエリ
+        """
+        query = self.session.query(
+            StopTimeEntity.feed_id, StopTimeEntity.stop_id, StopTimeEntity.trip_id
+        ).filter(StopTimeEntity.stop_id.in_(stop_ids))
+        if feed_id is not None:
+            query = query.filter(StopTimeEntity.feed_id == feed_id)
+        return query.distinct().order_by(
+            StopTimeEntity.stop_id, StopTimeEntity.feed_id, StopTimeEntity.trip_id
+        )
+
+    def search_departures(
+        self,
+        stop_id: str,
+        feed_id: str,
+        service_ids: Set[str],
+        from_seconds: int,
+        limit: Optional[int] = None,
+        typed: bool = False,
+    ) -> List[Tuple[int, StopTimeEntity, TripEntity]]:
+        """停留所/標柱を指定時刻以降に出発する便を、出発時刻の早い順に取得します. 乗車できない便は除きます
+
+        型付き形式の場合は(stop_id, feed_id, departure_time)のインデックスの範囲検索で、limit件で打ち切ります.
+        テキスト形式の場合は時が1桁の時刻(7:00:00)もあるので、時を2桁にそろえた文字列で比較します.
+        インデックスは停留所/標柱の絞り込みにだけ効きます.
+
+        Args:
+            stop_id: 停留所/標柱ID
+            feed_id: フィードID
+            service_ids: 運行するサービスID
+            from_seconds: この時刻(運行日の0時からの秒数)以降に出発する便が対象
+            limit: 最大件数 (Noneの場合は全件)
+            typed: DBが型付き形式かどうか
+
+        Returns:
+            出発時刻(運行日の0時からの秒数)、通過時刻情報、便情報
+        """
+        query = self.to_departures_query(stop_id, feed_id, service_ids, from_seconds, limit, typed)
+        return [(to_seconds(st.departure_time), st, trip) for st, trip in query]
+
+    def to_departures_query(
+        self,
+        stop_id: str,
+        feed_id: str,
+        service_ids: Set[str],
+        from_seconds: int,
+        limit: Optional[int] = None,
+        typed: bool = False,
+    ) -> Query:
+        """search_departures が実行するクエリ. (通過時刻情報, 便情報) を出発時刻の早い順に返します"""
+        departure_time = (
+            StopTimeEntity.departure_time
+            if typed
+            else func.substr("0" + StopTimeEntity.departure_time, -len("00:00:00"))
+        )
+        query = (
+            self.session.query(StopTimeEntity, TripEntity)
+            .join(StopTimeEntity.trip)
+            .filter(
+                StopTimeEntity.stop_id == stop_id,
+                StopTimeEntity.feed_id == feed_id,
+                TripEntity.service_id.in_(service_ids),
+                or_(StopTimeEntity.pickup_type.is_(None), StopTimeEntity.pickup_type != 1),
+                departure_time >= (from_seconds if typed else to_time_text(from_seconds)),
+            )
+            .order_by(departure_time, StopTimeEntity.trip_id)
+        )
+        return query.limit(limit) if limit is not None else query
+
+    def iter_timetable_rows(
+        self, feed_id: str, service_ids: Set[str]
+    ) -> Iterator[Tuple[str, str, str, Union[int, str], Union[int, str]]]:
+        """運行するサービスの便の通過時刻を、便ごとに停車順で取得します. 経路探索用の時刻表の作成に使います
+
+        ORMのオブジェクトは作らず、時刻も格納形式のまま(型付き形式は秒数、テキスト形式は文字列)返します.
+
+        Args:
+            feed_id: フィードID
+            service_ids: 運行するサービスID
+
+        Returns:
+            (便ID, 経路ID, 停留所/標柱ID, 到着時刻, 出発時刻)
+        """
+        return iter(
+            self.to_timetable_rows_query(feed_id, service_ids).yield_per(TIMETABLE_BATCH_SIZE)
+        )
+
+    def to_timetable_rows_query(self, feed_id: str, service_ids: Set[str]) -> Query:
+        """iter_timetable_rows が実行するクエリ"""
+        # 格納形式の値をそのまま受け取るため、GtfsTimeの変換(process_result_value)を通さない
+        return (
+            self.session.query(
+                StopTimeEntity.trip_id,
+                TripEntity.route_id,
+                StopTimeEntity.stop_id,
+                type_coerce(StopTimeEntity.arrival_time, NullType),
+                type_coerce(StopTimeEntity.departure_time, NullType),
+            )
+            .join(StopTimeEntity.trip)
+            .filter(StopTimeEntity.feed_id == feed_id, TripEntity.service_id.in_(service_ids))
+            .order_by(StopTimeEntity.trip_id, StopTimeEntity.stop_sequence)
+        )
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""格納形式を切り替えられるカラム型
+
+テキスト形式(既定)ではGTFSの値をそのまま文字列で格納します.
+型付き形式では時刻を整数(運行日の0時からの秒数)、緯度経度を実数で格納するので、時刻や位置の範囲で検索できます.
+DBは少し小さくなります (架空のデータで small が約6%、medium が約10%).
+型付き形式で読み込む時は文字列に戻しますが、GTFSの文字列そのものではなく正規化した表記になります.
+時は2桁にそろえ (7:05:00 -> 07:05:00)、緯度経度は同じ値になる最短の表記にします (35.003550 -> 35.00355).
+"""
+
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Union
+
+from sqlalchemy import Float, Integer, String, Table
+from sqlalchemy.types import TypeDecorator, TypeEngine
+
+from gtfsjpcli.utils.times import to_coordinate, to_coordinate_text, to_seconds, to_time_text
+
+
+class TypedText(TypeDecorator):
+    """型付き形式では別の型で格納する文字列"""
+
+    impl = String
+    storage_type: TypeEngine
+    """型付き形式で格納する型"""
+    to_storage: Callable
+    """文字列を型付き形式で格納する値にする関数"""
+    to_text: Callable
+    """型付き形式で格納した値を文字列に戻す関数"""
+
+    def process_result_value(self, value, dialect):
+        return value if value is None or isinstance(value, str) else self.to_text(value)
+
+
+class GtfsTime(TypedText):
+    """HH:MM:SS形式の時刻. 型付き形式では運行日の0時からの秒数(INTEGER)で格納し、時を2桁にそろえて読み込みます"""
+
+    storage_type = Integer()
+    to_storage = staticmethod(to_seconds)
+    to_text = staticmethod(to_time_text)
+
+
+class Coordinate(TypedText):
+    """緯度/経度. 型付き形式では実数(REAL)で格納し、同じ値になる最短の表記で読み込みます (末尾の0は付きません)"""
+
+    storage_type = Float()
+    to_storage = staticmethod(to_coordinate)
+    to_text = staticmethod(to_coordinate_text)
+
+
+def to_storage_type(type_: TypeEngine, typed: bool) -> TypeEngine:
+    """格納形式に応じたDDL用の型"""
+    return type_.storage_type if typed and isinstance(type_, TypedText) else type_
+
+
+def to_nullable_text(text: str) -> Optional[str]:
+    """CSVの値. 空文字はNoneにします"""
+    return text or None
+
+
+def to_integer(text: str) -> Union[int, str, None]:
+    """整数のカラムに格納するCSVの値. 空文字はNoneにします
+
+    整数として解釈できない値(1.0など)は、これまで通りSQLiteの型変換に任せるため文字列のまま返します.
+    """
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def to_storage_value(to_storage: Callable, text: str) -> Any:
+    """型付き形式で格納する値. 空文字はNoneにします"""
+    return to_storage(text) if text else None
+
+
+def to_column_converters(table: Table, typed: bool) -> Dict[str, Callable[[str], Any]]:
+    """CSVの値(文字列)を格納する値にする関数. カラム名がキーで、テーブルの全カラムを含みます
+
+    空文字はNoneにして、整数のカラムは整数にします. 型付き形式では時刻や緯度経度を格納する型にします.
+    ワーカープロセスに渡せるようにモジュールレベルの関数(とpartial)だけを使います.
+    """
+
+    def to_converter(type_: TypeEngine) -> Callable[[str], Any]:
+        if typed and isinstance(type_, TypedText):
+            return partial(to_storage_value, type_.to_storage)
+        if isinstance(type_, Integer):
+            return to_integer
+        return to_nullable_text
+
+    return {x.name: to_converter(x.type) for x in table.columns}
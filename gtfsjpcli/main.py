@@ -2,6 +2,7 @@
 
 import os
 import sys
+from typing import List
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 sys.path.append(PROJECT_ROOT)
@@ -9,15 +10,33 @@ sys.path.append(os.getcwd())
 
 import owcli  # pylint: disable=wrong-import-position
 
+from gtfsjpcli.utils.lazy import lazy_import  # pylint: disable=wrong-import-position
+
+# --stats を指定した場合しか使わないので、指定しないコマンドの起動を遅くしないよう参照するまで読み込まない
+stats = lazy_import("gtfsjpcli.utils.stats")
+
 __version__ = "0.1.0"
 
 
+def has_stats_option(argv: List[str]) -> bool:
+    """--stats (--stats=<path>) を指定したかどうか. statsを読み込まずに判定します"""
+    return any(x == "--stats" or x.startswith("--stats=") for x in argv[1:])
+
+
 def main():
-    owcli.run(
-        cli="gtfsjp",
-        version=__version__,
-        root=os.path.dirname(os.path.realpath(__file__)),
-    )
+    # --stats は全てのコマンドで使えるオプションなので、owcliがコマンドの引数を解析する前に取り除く
+    output = stats.pop_option(sys.argv) if has_stats_option(sys.argv) else None
+    if output is not None:
+        stats.enable()
+    try:
+        owcli.run(
+            cli="gtfsjp",
+            version=__version__,
+            root=os.path.dirname(os.path.realpath(__file__)),
+        )
+    finally:
+        if output is not None:
+            stats.write_report(output, sys.argv[1:])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+"""RAPTOR (Round-bAsed Public Transit Optimized Router) による経路探索
+
+参考 Delling et al. "Round-Based Public Transit Routing" (2012)
+
+k回目のラウンドでは、k-1回目までに到着時刻が早くなった停留所/標柱を通るパターンだけを走査し、
+k本目の便に乗って到着できる最も早い時刻を求めます. その後、到着した停留所/標柱から徒歩で乗り換えます.
+ラウンドごとに目的地の到着時刻が早くなった経路を、乗り換え回数と到着時刻のパレート最適解として返します.
+"""
+
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from gtfsjpcli.planner.timetable import Timetable
+
+INFINITY = 2**31 - 1
+"""到着できない停留所/標柱の到着時刻"""
+WALK = -1
+"""徒歩の区間を表す便index"""
+MAX_TRANSFERS = 4
+"""既定の最大乗り換え回数"""
+
+
+class Leg(NamedTuple):
+    """経路の1区間"""
+
+    trip: int
+    """便index. 徒歩の場合はWALK"""
+    from_stop: int
+    to_stop: int
+    departure: int
+    """出発時刻(秒)"""
+    arrival: int
+    """到着時刻(秒)"""
+
+
+class Journey(NamedTuple):
+    """出発地から目的地までの経路"""
+
+    legs: List[Leg]
+
+    @property
+    def departure(self) -> int:
+        return self.legs[0].departure
+
+    @property
+    def arrival(self) -> int:
+        return self.legs[-1].arrival
+
+    @property
+    def transfers(self) -> int:
+        return max(sum(1 for x in self.legs if x.trip != WALK) - 1, 0)
+
+
+def plan(
+    timetable: Timetable,
+    origins: List[int],
+    destinations: List[int],
+    departure: int,
+    max_transfers: int = MAX_TRANSFERS,
+    max_walk: Optional[float] = None,
+) -> List[Journey]:
+    """出発時刻以降に出発して、目的地に最も早く着く経路を乗り換え回数ごとに求めます
+
+    Args:
+        timetable: 時刻表
+        origins: 出発地の停留所/標柱のindex (いずれかから出発)
+        destinations: 目的地の停留所/標柱のindex (いずれかに到着)
+        departure: 出発時刻(秒)
+        max_transfers: 最大乗り換え回数
+        max_walk: 徒歩で乗り換えられる最大の距離(m). 0以下の場合は徒歩で乗り換えません.
+            Noneの場合は時刻表の全ての乗り換えを使います
+
+    Returns:
+        乗り換え回数が少ない順の経路. 乗り換えが多い経路ほど到着時刻が早くなります.
+        到着できない場合や、出発地と目的地が同じ場合は空
+    """
+    if set(origins) & set(destinations):
+        return []
+
+    tt = timetable
+    targets = set(destinations)
+    best = [INFINITY] * len(tt.stop_ids)
+    labels: List[List[int]] = []
+    parents: List[Dict[int, Leg]] = []
+
+    round_labels = [INFINITY] * len(tt.stop_ids)
+    round_parents: Dict[int, Leg] = {}
+    for stop in origins:
+        round_labels[stop] = best[stop] = departure
+    marked = set(origins) | relax_transfers(
+        tt, set(origins), round_labels, round_parents, best, targets, max_walk
+    )
+    labels.append(round_labels)
+    parents.append(round_parents)
+
+    for _ in range(max_transfers + 1):
+        if not marked:
+            break
+        round_labels = list(labels[-1])
+        round_parents = {}
+        marked = scan_patterns(tt, marked, labels[-1], round_labels, round_parents, best, targets)
+        marked |= relax_transfers(tt, marked, round_labels, round_parents, best, targets, max_walk)
+        labels.append(round_labels)
+        parents.append(round_parents)
+
+    journeys = []
+    arrival = INFINITY
+    for k in range(1, len(labels)):
+        destination = min(destinations, key=lambda x: labels[k][x])
+        if labels[k][destination] < arrival:
+            arrival = labels[k][destination]
+            journeys.append(to_journey(parents, k, destination))
+    return journeys
+
+
+def scan_patterns(
+    tt: Timetable,
+    marked: Set[int],
+    previous_labels: List[int],
+    labels: List[int],
+    parents: Dict[int, Leg],
+    best: List[int],
+    targets: Set[int],
+) -> Set[int]:
+    """前のラウンドで早くなった停留所/標柱を通るパターンを走査し、便に乗って早く着ける停留所/標柱を返します"""
+    queue: Dict[int, int] = {}
+    for stop in marked:
+        for i in range(tt.stop_patterns_start[stop], tt.stop_patterns_start[stop + 1]):
+            pattern, position = tt.stop_patterns[i], tt.stop_pattern_positions[i]
+            if position < queue.get(pattern, INFINITY):
+                queue[pattern] = position
+
+    improved = set()
+    bound = min(best[x] for x in targets)
+    for pattern, first_position in queue.items():
+        stops_start = tt.pattern_stops_start[pattern]
+        stop_count = tt.pattern_stops_start[pattern + 1] - stops_start
+        trips_start = tt.pattern_trips_start[pattern]
+        trip_count = tt.pattern_trips_start[pattern + 1] - trips_start
+        times_start = tt.pattern_times_start[pattern]
+
+        trip = -1
+        boarded_stop = boarded_time = -1
+        for position in range(first_position, stop_count):
+            stop = tt.pattern_stops[stops_start + position]
+            if trip >= 0:
+                arrival = tt.arrivals[times_start + trip * stop_count + position]
+                if arrival < best[stop] and arrival < bound:
+                    labels[stop] = best[stop] = arrival
+                    parents[stop] = Leg(
+                        trips_start + trip, boarded_stop, stop, boarded_time, arrival
+                    )
+                    improved.add(stop)
+                    if stop in targets:
+                        bound = arrival
+
+            ready = previous_labels[stop]
+            if ready == INFINITY:
+                continue
+            if trip >= 0 and ready > tt.departures[times_start + trip * stop_count + position]:
+                continue
+            earlier = find_earliest_trip(
+                tt, times_start, stop_count, position, trip if trip >= 0 else trip_count, ready
+            )
+            if earlier is not None:
+                trip = earlier
+                boarded_stop = stop
+                boarded_time = tt.departures[times_start + trip * stop_count + position]
+    return improved
+
+
+def find_earliest_trip(
+    tt: Timetable, times_start: int, stop_count: int, position: int, trip_count: int, ready: int
+) -> Optional[int]:
+    """パターンの先頭trip_count本のうち、停車順positionをready以降に出発する最も早い便
+
+    パターン内の便は追い越さないので、どの停車順でも出発時刻は便の順に並んでいます.
+    """
+    departures = Column(tt.departures, times_start + position, stop_count)
+    trip = bisect_left(departures, ready, 0, trip_count)
+    return trip if trip < trip_count else None
+
+
+def relax_transfers(
+    tt: Timetable,
+    marked: Set[int],
+    labels: List[int],
+    parents: Dict[int, Leg],
+    best: List[int],
+    targets: Set[int],
+    max_walk: Optional[float] = None,
+) -> Set[int]:
+    """便で着いた停留所/標柱から徒歩で乗り換え、早く着ける停留所/標柱を返します. 徒歩を続けて使うことはしません
+
+    乗り換えは距離順に並んでいるので、max_walk(m)を超えたところで打ち切ります.
+
+    Usage:
+
+        >>> from gtfsjpcli.planner.transfers import to_walking_transfers
+        >>> transfers = to_walking_transfers([(35.0, 139.0), (35.0039, 139.0)], 1000)
+        >>> tt = Timetable(["A", "B"], [], transfers)
+        >>> round(tt.transfer_meters[0], 2)
+        433.66
+        >>> relax_transfers(tt, {0}, [0, INFINITY], {}, [0, INFINITY], {1}, max_walk=433.7)
+        {1}
+        >>> relax_transfers(tt, {0}, [0, INFINITY], {}, [0, INFINITY], {1}, max_walk=433.6)
+        set()
+    """
+    improved: Set[int] = set()
+    if max_walk is not None and max_walk <= 0:
+        return improved
+    bound = min(best[x] for x in targets)
+    readies = {x: labels[x] for x in marked}
+    for stop, ready in readies.items():
+        for i in range(tt.transfers_start[stop], tt.transfers_start[stop + 1]):
+            if max_walk is not None and tt.transfer_meters[i] > max_walk:
+                break
+            to_stop = tt.transfer_stops[i]
+            arrival = ready + tt.transfer_seconds[i]
+            if arrival < best[to_stop] and arrival < bound:
+                labels[to_stop] = best[to_stop] = arrival
+                parents[to_stop] = Leg(WALK, stop, to_stop, ready, arrival)
+                improved.add(to_stop)
+                if to_stop in targets:
+                    bound = arrival
+    return improved
+
+
+def to_journey(parents: List[Dict[int, Leg]], k: int, destination: int) -> Journey:
+    """k回目のラウンドで目的地に着いた経路を、到着した区間からたどって復元します"""
+    legs = []
+    stop = destination
+    while k >= 0:
+        leg = parents[k].get(stop)
+        if leg is None:
+            k -= 1
+            continue
+        legs.append(leg)
+        stop = leg.from_stop
+        if leg.trip != WALK:
+            k -= 1
+    return Journey(list(reversed(legs)))
+
+
+class Column:
+    """[便][停車順] の時刻の配列のうち、1つの停車順の列を便の順に参照する (二分探索用)
+
+    配列をコピーせずに、bisectで便の範囲を二分探索するために使います.
+    """
+
+    def __init__(self, values, start: int, step: int):
+        self.values = values
+        self.start = start
+        self.step = step
+
+    def __getitem__(self, trip: int) -> int:
+        return self.values[self.start + trip * self.step]
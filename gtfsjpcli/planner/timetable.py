@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+"""経路探索(RAPTOR)用の1運行日分の時刻表
+
+ORMのオブジェクトは使わず、停留所/標柱と便を連番(index)にして整数の配列(array)で持ちます.
+停車する停留所/標柱の並びが同じ便をまとめたものを「パターン」とし、パターンごとに
+[便][停車順] の2次元の時刻を1次元の配列に詰めています. 時刻は運行日の0時からの秒数です.
+
+パターン内の便は、どの停留所/標柱でも追い越しが起きないように分けているので、
+ある停留所/標柱で乗れる最も早い便を二分探索で求められます.
+"""
+
+from array import array
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from gtfsjpcli.utils.times import to_seconds
+
+
+class TripTimes(NamedTuple):
+    """1便分の停車する停留所/標柱と時刻"""
+
+    trip_id: str
+    route_id: str
+    service_date: str
+    """運行日 (YYYYMMDD形式)"""
+    stops: List[int]
+    """停留所/標柱のindex (停車順)"""
+    arrivals: List[int]
+    """到着時刻(秒)"""
+    departures: List[int]
+    """出発時刻(秒)"""
+
+
+class Timetable:
+    """RAPTOR用の時刻表
+
+    `xxx_start` は、対象ごとの範囲を `xxx[xxx_start[i]:xxx_start[i + 1]]` で表す配列です (CSR形式).
+    """
+
+    stop_ids: List[str]
+    """停留所/標柱ID (indexの順)"""
+    stop_index: Dict[str, int]
+    """停留所/標柱IDからindex"""
+    stations: Dict[str, List[int]]
+    """親駅IDごとの、属する停留所/標柱のindex"""
+
+    pattern_stops_start: array
+    pattern_stops: array
+    """パターンごとの停留所/標柱のindex (停車順)"""
+    pattern_trips_start: array
+    """パターンごとの便(全体の便index)の範囲. 便は出発時刻順"""
+    pattern_times_start: array
+    """パターンごとの時刻(arrivals/departures)の開始位置"""
+    arrivals: array
+    departures: array
+    """パターンごとの [便][停車順] の到着/出発時刻(秒)"""
+
+    trip_ids: List[str]
+    trip_route_ids: List[str]
+    trip_service_dates: List[str]
+    """全体の便indexごとの便ID、経路ID、運行日"""
+
+    stop_patterns_start: array
+    stop_patterns: array
+    stop_pattern_positions: array
+    """停留所/標柱ごとの、停車するパターンとその中での停車順"""
+
+    transfers_start: array
+    transfer_stops: array
+    transfer_seconds: array
+    transfer_meters: array
+    """停留所/標柱ごとの、徒歩で乗り換えられる停留所/標柱と所要時間(秒)、距離(m). 停留所/標柱ごとに距離順"""
+
+    def __init__(
+        self,
+        stop_ids: List[str],
+        trips: Iterable[TripTimes],
+        transfers: List[List[Tuple[int, int, float]]],
+        stations: Optional[Dict[str, List[int]]] = None,
+    ):
+        """
+        Args:
+            stop_ids: 停留所/標柱ID (indexの順)
+            trips: 便ごとの時刻 (順不同)
+            transfers: 停留所/標柱のindexごとの、(徒歩で乗り換えられる停留所/標柱のindex, 所要時間(秒), 距離(m))
+                の距離順のリスト
+            stations: 親駅IDごとの、属する停留所/標柱のindex
+        """
+        self.stop_ids = stop_ids
+        self.stop_index = {x: i for i, x in enumerate(stop_ids)}
+        self.stations = stations or {}
+
+        self.pattern_stops_start = array("i", [0])
+        self.pattern_stops = array("i")
+        self.pattern_trips_start = array("i", [0])
+        self.pattern_times_start = array("i")
+        self.arrivals = array("i")
+        self.departures = array("i")
+        self.trip_ids = []
+        self.trip_route_ids = []
+        self.trip_service_dates = []
+
+        patterns_by_stop: List[List[Tuple[int, int]]] = [[] for _ in stop_ids]
+        for pattern, pattern_trips in enumerate(to_patterns(trips)):
+            stops = pattern_trips[0].stops
+            self.pattern_stops.extend(stops)
+            self.pattern_stops_start.append(len(self.pattern_stops))
+            self.pattern_times_start.append(len(self.arrivals))
+            for trip in pattern_trips:
+                self.arrivals.extend(trip.arrivals)
+                self.departures.extend(trip.departures)
+                self.trip_ids.append(trip.trip_id)
+                self.trip_route_ids.append(trip.route_id)
+                self.trip_service_dates.append(trip.service_date)
+            self.pattern_trips_start.append(len(self.trip_ids))
+            for position, stop in enumerate(stops):
+                patterns_by_stop[stop].append((pattern, position))
+
+        self.stop_patterns_start, (self.stop_patterns, self.stop_pattern_positions) = to_csr(
+            patterns_by_stop, 2
+        )
+        self.transfers_start, (
+            self.transfer_stops,
+            self.transfer_seconds,
+            self.transfer_meters,
+        ) = to_csr(transfers, 3, "iid")
+
+    def to_stop_indexes(self, stop_id: str) -> List[int]:
+        """停留所/標柱IDのindex. 親駅IDの場合は属する停留所/標柱のindexも含みます. 存在しない場合は空"""
+        own = [self.stop_index[stop_id]] if stop_id in self.stop_index else []
+        return own + self.stations.get(stop_id, [])
+
+    @property
+    def pattern_count(self) -> int:
+        return len(self.pattern_stops_start) - 1
+
+    @property
+    def trip_count(self) -> int:
+        return len(self.trip_ids)
+
+
+def to_trip_times(
+    rows: Iterable[Tuple[str, str, str, Union[int, str, None], Union[int, str, None]]],
+    stop_index: Dict[str, int],
+    service_date: str,
+    offset: int = 0,
+) -> Iterator[TripTimes]:
+    """便ごとに停車順に並んだ通過時刻の行を、便ごとの時刻にします
+
+    時刻の格納形式(秒数または文字列)はどちらでも構いません. 時刻がない停留所/標柱や、
+    存在しない停留所/標柱を通る便と、offsetを引くと全ての時刻が負になる便は除きます.
+
+    Args:
+        rows: (便ID, 経路ID, 停留所/標柱ID, 到着時刻, 出発時刻)
+        stop_index: 停留所/標柱IDからindex
+        service_date: 運行日 (YYYYMMDD形式)
+        offset: 時刻から引く秒数. 前日の運行日の便を当日の時刻にする場合は1日の秒数
+    """
+    for (trip_id, route_id), group in groupby(rows, key=lambda x: (x[0], x[1])):
+        times = [
+            (stop_index.get(stop_id), to_seconds_value(arrival), to_seconds_value(departure))
+            for _, _, stop_id, arrival, departure in group
+        ]
+        if any(stop is None or (a is None and d is None) for stop, a, d in times):
+            continue
+        arrivals = [(d if a is None else a) - offset for _, a, d in times]
+        departures = [(a if d is None else d) - offset for _, a, d in times]
+        if departures[-1] < 0 and arrivals[-1] < 0:
+            continue
+        yield TripTimes(
+            trip_id, route_id, service_date, [x[0] for x in times], arrivals, departures
+        )
+
+
+def to_seconds_value(value: Union[int, str, None]) -> Optional[int]:
+    """格納形式の時刻を秒数にします
+
+    Usage:
+
+        >>> to_seconds_value("25:01:00"), to_seconds_value(90060), to_seconds_value(None)
+        (90060, 90060, None)
+    """
+    return value if value is None or isinstance(value, int) else to_seconds(value)
+
+
+def to_patterns(trips: Iterable[TripTimes]) -> List[List[TripTimes]]:
+    """便をパターンに分けます
+
+    停車する停留所/標柱の並びが同じ便を出発時刻順に並べ、前の便を追い越す便は別のパターンにします.
+    """
+    trips_by_stops: Dict[Tuple[int, ...], List[TripTimes]] = {}
+    for trip in trips:
+        if len(trip.stops) > 1:
+            trips_by_stops.setdefault(tuple(trip.stops), []).append(trip)
+
+    patterns = []
+    for same_stop_trips in trips_by_stops.values():
+        split: List[List[TripTimes]] = []
+        for trip in sorted(same_stop_trips, key=lambda x: (x.departures[0], x.arrivals[-1])):
+            pattern = next((x for x in split if not overtakes(x[-1], trip)), None)
+            if pattern is None:
+                split.append([trip])
+            else:
+                pattern.append(trip)
+        patterns.extend(split)
+    return patterns
+
+
+def overtakes(former: TripTimes, latter: TripTimes) -> bool:
+    """後の便がどこかの停留所/標柱で前の便より早く着く(発つ)かどうか"""
+    return any(a > b for a, b in zip(former.arrivals, latter.arrivals)) or any(
+        a > b for a, b in zip(former.departures, latter.departures)
+    )
+
+
+def to_csr(
+    rows: List[List[tuple]], width: int, typecodes: Optional[str] = None
+) -> Tuple[array, List[array]]:
+    """行ごとのタプルのリストを、開始位置の配列と、タプルの要素ごとの配列にします
+
+    要素ごとの配列の型は typecodes (arrayの型コードを要素の順に並べたもの) で、省略時は全て整数("i")です.
+
+    Usage:
+
+        >>> start, (values,) = to_csr([[(1,)], [], [(2,), (3,)]], 1)
+        >>> start.tolist(), values.tolist()
+        ([0, 1, 1, 3], [1, 2, 3])
+        >>> start, (stops, meters) = to_csr([[(1, 0.5)], [(0, 0.5)]], 2, "id")
+        >>> meters.tolist()
+        [0.5, 0.5]
+    """
+    start = array("i", [0])
+    columns = [array(x) for x in typecodes or "i" * width]
+    for row in rows:
+        for values in row:
+            for column, value in zip(columns, values):
+                column.append(value)
+        start.append(start[-1] + len(row))
+    return start, columns
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""停留所/標柱間の徒歩による乗り換え"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+from gtfsjpcli.utils.geo import METERS_PER_DEGREE, to_distance
+
+WALKING_METERS_PER_SECOND = 80 / 60
+"""徒歩の速さ. 不動産の表示と同じ分速80m"""
+MAX_WALK_METERS = 1000
+"""経路探索で指定できる徒歩の最大距離(m). 時刻表の乗り換えはこの距離で1回だけ求め、探索ごとに絞り込みます"""
+MIN_COSINE = 0.01
+"""極付近で経度方向の格子の幅が無限大にならないようにするための下限"""
+
+
+def to_walking_transfers(
+    coordinates: List[Optional[Tuple[float, float]]],
+    max_distance: float,
+    meters_per_second: float = WALKING_METERS_PER_SECOND,
+) -> List[List[Tuple[int, int, float]]]:
+    """max_distance(m)以内にある停留所/標柱の組を、徒歩で乗り換えられるものとして求めます
+
+    一辺がmax_distance以上の格子に停留所/標柱を振り分け、隣接する格子の中だけで距離を計算します.
+
+    Args:
+        coordinates: 停留所/標柱のindexごとの (緯度, 経度). 位置がない場合はNone
+        max_distance: 乗り換えられる最大の距離(m)
+        meters_per_second: 徒歩の速さ(m/秒)
+
+    Returns:
+        停留所/標柱のindexごとの、(乗り換えられる停留所/標柱のindex, 所要時間(秒), 距離(m)) の距離順のリスト.
+        所要時間は秒単位に切り上げます. 距離は丸めないので、探索時にmax_distance以下の任意の距離で絞り込めます.
+        自身は含みません
+
+    Usage:
+
+        >>> transfers = to_walking_transfers([(35.0, 139.0), (35.001, 139.0), (35.1, 139.0), None], 200)
+        >>> [[(stop, seconds, round(meters, 1)) for stop, seconds, meters in x] for x in transfers]
+        [[(1, 84, 111.2)], [(0, 84, 111.2)], [], []]
+    """
+    transfers: List[List[Tuple[int, int, float]]] = [[] for _ in coordinates]
+    if max_distance <= 0:
+        return transfers
+
+    # 経度1度あたりの距離は高緯度ほど短いので、最も高緯度の停留所/標柱に合わせて経度方向の幅を広げる
+    max_lat = max((abs(x[0]) for x in coordinates if x is not None), default=0)
+    cell_size = (
+        max_distance / METERS_PER_DEGREE,
+        max_distance / METERS_PER_DEGREE / max(math.cos(math.radians(max_lat)), MIN_COSINE),
+    )
+    cells: Dict[Tuple[int, int], List[int]] = {}
+    for stop, coordinate in enumerate(coordinates):
+        if coordinate is not None:
+            cells.setdefault(to_cell(coordinate, cell_size), []).append(stop)
+
+    for (row, column), stops in cells.items():
+        neighbors = [
+            x
+            for d_row in (-1, 0, 1)
+            for d_column in (-1, 0, 1)
+            for x in cells.get((row + d_row, column + d_column), [])
+        ]
+        for stop in stops:
+            lat, lon = coordinates[stop]
+            for neighbor in neighbors:
+                if neighbor == stop:
+                    continue
+                distance = to_distance(lat, lon, *coordinates[neighbor])
+                if distance <= max_distance:
+                    transfers[stop].append(
+                        (neighbor, math.ceil(distance / meters_per_second), distance)
+                    )
+    for stop_transfers in transfers:
+        stop_transfers.sort(key=lambda x: x[2])
+    return transfers
+
+
+def to_cell(coordinate: Tuple[float, float], cell_size: Tuple[float, float]) -> Tuple[int, int]:
+    """位置が含まれる格子 (緯度方向の番号, 経度方向の番号)"""
+    lat, lon = coordinate
+    return math.floor(lat / cell_size[0]), math.floor(lon / cell_size[1])
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+"""サービスをHTTPで公開するサーバー
+
+リクエストはワーカースレッドのプールで処理します. 全てのワーカースレッドがGTFSソースの読み取り専用クライアントを
+共有するので、DBへの接続プールやキャッシュ(経路探索の時刻表など)はリクエストをまたいで残ります.
+レスポンスはサービスが返すドキュメントのJSONです. パラメータが正しくない場合は400で {"error": メッセージ} を返します.
+"""
+
+import json
+import os
+import socketserver
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from owlmixin import OwlMixin
+
+from gtfsjpcli.client.factory import release_gtfs_clients
+from gtfsjpcli.services import agency, departure, plan, stop
+from gtfsjpcli.utils.geo import to_location_option
+from gtfsjpcli.utils.times import is_date_text, to_time_option
+
+DEFAULT_NEAR_LIMIT = 10
+"""位置で検索する場合に、半径を指定しない時の最大件数"""
+REQUEST_TIMEOUT_SECONDS = 10
+"""接続してからリクエストを受け取り終えるまでを待つ最大の秒数"""
+
+
+class Params:
+    """クエリ文字列のパラメータ. 形式が正しくない場合はValueErrorにします"""
+
+    def __init__(self, query: str):
+        self.values: Dict[str, List[str]] = parse_qs(query)
+
+    def get(self, name: str) -> Optional[str]:
+        values = self.values.get(name)
+        return values[-1] if values else None
+
+    def require(self, name: str) -> str:
+        value = self.get(name)
+        if value is None:
+            raise ValueError(f"{name} is required.")
+        return value
+
+    def get_int(self, name: str, default: Optional[int] = None) -> Optional[int]:
+        return self.__convert(name, int, "an integer", default)
+
+    def get_float(self, name: str, default: Optional[float] = None) -> Optional[float]:
+        return self.__convert(name, float, "a number", default)
+
+    def get_bool(self, name: str) -> bool:
+        return (self.get(name) or "").lower() in ("1", "true", "yes")
+
+    def get_date(self, name: str) -> str:
+        value = self.require(name)
+        if not is_date_text(value):
+            raise ValueError(f"{name} must be in the form of YYYYMMDD: {value}")
+        return value
+
+    def get_time(self, name: str) -> str:
+        value = self.require(name)
+        time = to_time_option(value)
+        if time is None:
+            raise ValueError(f"{name} must be in the form of HH:MM or HH:MM:SS: {value}")
+        return time
+
+    def __convert(self, name: str, convert: Callable, kind: str, default):
+        value = self.get(name)
+        if value is None:
+            return default
+        try:
+            return convert(value)
+        except ValueError:
+            raise ValueError(f"{name} must be {kind}: {value}") from None
+
+
+def get_agencies(source: str, params: Params) -> OwlMixin:
+    return agency.fetch_agencies(source, params.get("feed"))
+
+
+def get_stops(source: str, params: Params) -> OwlMixin:
+    """id, word, nearのいずれか1つで検索します (get stopコマンドと同じ)"""
+    keys = [x for x in ("id", "word", "near") if params.get(x) is not None]
+    if len(keys) != 1:
+        raise ValueError("Exactly one of id, word or near is required.")
+
+    trips = params.get_bool("trips")
+    feed_id = params.get("feed")
+    if keys[0] == "id":
+        return stop.search_by_id(source, params.require("id"), trips, feed_id)
+    if keys[0] == "word":
+        return stop.search_by_word(
+            source,
+            params.require("word"),
+            trips,
+            params.get_int("limit"),
+            params.get_int("offset", 0),
+            feed_id,
+        )
+
+    location = to_location_option(params.require("near"))
+    if location is None:
+        raise ValueError(f"near must be in the form of LAT,LON within range: {params.get('near')}")
+    radius = params.get_float("radius")
+    limit = (
+        params.get_int("limit")
+        if radius is not None
+        else params.get_int("limit", DEFAULT_NEAR_LIMIT)
+    )
+    return stop.search_by_location(source, *location, radius, trips, limit, feed_id)
+
+
+def get_departures(source: str, params: Params) -> OwlMixin:
+    return departure.fetch_departures(
+        source,
+        params.require("stop"),
+        params.get_date("date"),
+        params.get_time("from") if params.get("from") is not None else "00:00:00",
+        params.get_int("limit", 10),
+        params.get("feed"),
+    )
+
+
+def get_plan(source: str, params: Params) -> OwlMixin:
+    return plan.plan_journeys(
+        source,
+        params.require("from"),
+        params.require("to"),
+        params.get_date("date"),
+        params.get_time("depart"),
+        max_transfers=params.get_int("max_transfers", 4),
+        max_walk=params.get_float("max_walk", 300),
+        feed_id=params.get("feed") or "",
+    )
+
+
+ROUTES: Dict[str, Callable[[str, Params], OwlMixin]] = {
+    "/agencies": get_agencies,
+    "/stops": get_stops,
+    "/departures": get_departures,
+    "/plan": get_plan,
+}
+"""パスと、GTFSソースとパラメータからドキュメントを返す関数"""
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """1つの接続で1つのリクエストを処理します
+
+    接続は処理している間ワーカースレッドを1つ占有するので、持続的接続(keep-alive)にはせず
+    レスポンスを返したら閉じます (HTTP/1.0). 待っているだけのクライアントがワーカーを使い切らないようにするためです.
+    """
+
+    timeout = REQUEST_TIMEOUT_SECONDS
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        url = urlsplit(self.path)
+        route = ROUTES.get(url.path)
+        if route is None:
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path: {url.path}"})
+            return
+
+        try:
+            document = route(self.server.source, Params(url.query))
+        except ValueError as e:
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        except Exception:  # pylint: disable=broad-except
+            traceback.print_exc(file=sys.stderr)
+            self.send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error."})
+            return
+        finally:
+            release_gtfs_clients()
+        self.send_body(HTTPStatus.OK, document.to_json())
+
+    def send_json(self, status: HTTPStatus, value: dict):
+        self.send_body(status, json.dumps(value, ensure_ascii=False))
+
+    def send_body(self, status: HTTPStatus, text: str):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unixドメインソケットの場合はクライアントのアドレスがない
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "-"
+
+
+class WorkerPoolMixIn(socketserver.ThreadingMixIn):
+    """リクエストごとにスレッドを作らず、決まった数のワーカースレッドで処理します
+
+    ワーカースレッドは共有のクライアントを使い回すので、接続やキャッシュが温まったまま残ります.
+    接続はレスポンスごとに閉じるので、ワーカーの数より多いクライアントが同時に接続しても順に処理されます.
+
+    Usage:
+
+        >>> import http.client, threading
+        >>> server = create_server("unused.sqlite3", workers=1, port=0)
+        >>> threading.Thread(target=server.serve_forever, daemon=True).start()
+        >>> clients = [http.client.HTTPConnection(*server.server_address, timeout=5) for _ in range(2)]
+        >>> clients[0].request("GET", "/unknown")
+        >>> clients[0].getresponse().status
+        404
+        >>> clients[1].request("GET", "/unknown")
+        >>> clients[1].getresponse().status
+        404
+        >>> server.shutdown(); server.server_close()
+    """
+
+    def __init__(self, address, source: str, workers: int):
+        self.source = source
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="gtfsjp-worker")
+        super().__init__(address, RequestHandler)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+class PooledHTTPServer(WorkerPoolMixIn, HTTPServer):
+    pass
+
+
+class PooledUnixHTTPServer(WorkerPoolMixIn, socketserver.UnixStreamServer):
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def create_server(
+    source: str,
+    workers: int,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    socket_path: Optional[str] = None,
+) -> socketserver.BaseServer:
+    """サーバーを作成します. serve_forever() で待ち受けを開始します
+
+    Args:
+        source: GTFSソースのpath
+        workers: リクエストを処理するスレッド数
+        host: 待ち受けるホスト
+        port: 待ち受けるポート (0の場合は空いているポート)
+        socket_path: 指定した場合はTCPの代わりにこのパスのUnixドメインソケットで待ち受けます
+    """
+    if socket_path:
+        return PooledUnixHTTPServer(socket_path, source, workers)
+    return PooledHTTPServer((host, port), source, workers)
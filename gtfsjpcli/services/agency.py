@@ -1,3 +1,5 @@
+from typing import Optional
+
 from owlmixin import OwlMixin, TList
 
 from gtfsjpcli.client.factory import create_gtfs_client
@@ -9,6 +11,6 @@ class AgencyDocument(OwlMixin):
     agencies: TList[Agency]
 
 
-def fetch_agencies(source: str) -> TList[AgencyDocument]:
-    agencies = create_gtfs_client(source).fetch_agencies()
+def fetch_agencies(source: str, feed_id: Optional[str] = None) -> AgencyDocument:
+    agencies = create_gtfs_client(source).fetch_agencies(feed_id)
     return AgencyDocument.from_dict({"count": agencies.size(), "agencies": agencies})
@@ -0,0 +1,25 @@
+from typing import Optional
+
+from owlmixin import OwlMixin, TList
+
+from gtfsjpcli.client.factory import create_gtfs_client
+from gtfsjpcli.client.gtfs import Departure
+
+
+class DepartureDocument(OwlMixin):
+    count: int
+    departures: TList[Departure]
+
+
+def fetch_departures(
+    source: str,
+    stop_id: str,
+    date: str,
+    from_time: str,
+    limit: Optional[int] = None,
+    feed_id: Optional[str] = None,
+) -> DepartureDocument:
+    departures = create_gtfs_client(source).fetch_departures(
+        stop_id, date, from_time, limit, feed_id
+    )
+    return DepartureDocument.from_dict({"count": departures.size(), "departures": departures})
@@ -0,0 +1,32 @@
+from owlmixin import OwlMixin, TList
+
+from gtfsjpcli.client.factory import create_gtfs_client
+from gtfsjpcli.client.gtfs import Journey
+
+
+class PlanDocument(OwlMixin):
+    count: int
+    journeys: TList[Journey]
+
+
+def plan_journeys(
+    source: str,
+    from_stop_id: str,
+    to_stop_id: str,
+    date: str,
+    departure_time: str,
+    *,
+    max_transfers: int,
+    max_walk: float,
+    feed_id: str = "",
+) -> PlanDocument:
+    journeys = create_gtfs_client(source).plan_journeys(
+        from_stop_id,
+        to_stop_id,
+        date,
+        departure_time,
+        max_transfers=max_transfers,
+        max_walk=max_walk,
+        feed_id=feed_id,
+    )
+    return PlanDocument.from_dict({"count": journeys.size(), "journeys": journeys})
@@ -0,0 +1,55 @@
+"""描画情報のGeoJSON
+
+座標の数が多いので、描画情報はOwlMixinのモデルにせず、描画IDごとにGeoJSONのFeature(辞書)にして順次出力します.
+"""
+
+import json
+from typing import Iterable, Iterator, Optional, TextIO
+
+from gtfsjpcli.client.factory import create_gtfs_client
+from gtfsjpcli.client.gtfs import Shape
+from gtfsjpcli.utils import polyline
+
+
+def to_feature(shape: Shape) -> dict:
+    """描画情報をLineStringのFeatureにします. 座標はGeoJSONの順序(経度, 緯度)です"""
+    properties = {"shape_id": shape.id, "points": shape.points}
+    if shape.feed_id.any():
+        properties["feed_id"] = shape.feed_id.get()
+    return {
+        "type": "Feature",
+        "bbox": list(shape.bbox),
+        "properties": properties,
+        "geometry": {
+            "type": "LineString",
+            "coordinates": [[lon, lat] for lat, lon in polyline.decode(shape.polyline)],
+        },
+    }
+
+
+def iter_features(
+    source: str,
+    shape_id: Optional[str] = None,
+    route_id: Optional[str] = None,
+    feed_id: Optional[str] = None,
+) -> Iterator[dict]:
+    return create_gtfs_client(source).iter_shapes(shape_id, route_id, feed_id).map(to_feature)
+
+
+def to_json(feature: dict) -> str:
+    return json.dumps(feature, ensure_ascii=False, separators=(",", ":"))
+
+
+def write_feature_collection(features: Iterable[dict], out: TextIO) -> int:
+    """FeatureCollectionを、Featureを1件ずつ書き出しながら出力します. 全件をメモリ上に保持しません
+
+    Returns:
+        出力したFeatureの数
+    """
+    count = 0
+    out.write('{"type":"FeatureCollection","features":[\n')
+    for feature in features:
+        out.write(("," if count else "") + to_json(feature) + "\n")
+        count += 1
+    out.write("]}\n")
+    return count
@@ -1,4 +1,6 @@
-from owlmixin import OwlMixin, TList
+from typing import Optional
+
+from owlmixin import OwlMixin, TIterator, TList
 
 from gtfsjpcli.client.factory import create_gtfs_client
 from gtfsjpcli.client.gtfs import Stop
@@ -9,13 +11,67 @@ class StopDocument(OwlMixin):
     stops: TList[Stop]
 
 
-def search_by_id(source: str, id_: str, with_trips: bool) -> StopDocument:
-    stop = create_gtfs_client(source).find_stop_by_id(id_, with_trips)
-    return StopDocument.from_dict(
-        {"count": 1 if stop.any() else 0, "stops": stop.map(lambda x: [x]).get_or([])}
-    )
+def search_by_id(
+    source: str, id_: str, with_trips: bool, feed_id: Optional[str] = None
+) -> StopDocument:
+    stops = create_gtfs_client(source).find_stops_by_id(id_, with_trips, feed_id)
+    return StopDocument.from_dict({"count": stops.size(), "stops": stops})
 
 
-def search_by_word(source: str, word: str, with_trips: bool) -> StopDocument:
-    stops = create_gtfs_client(source).search_stops_by_name(word, with_trips).to_list()
+def search_by_word(
+    source: str,
+    word: str,
+    with_trips: bool,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    feed_id: Optional[str] = None,
+) -> StopDocument:
+    stops = iter_by_word(source, word, with_trips, limit, offset, feed_id).to_list()
+    return StopDocument.from_dict({"count": stops.size(), "stops": stops})
+
+
+def search_by_location(
+    source: str,
+    lat: float,
+    lon: float,
+    radius: Optional[float],
+    with_trips: bool,
+    limit: Optional[int] = None,
+    feed_id: Optional[str] = None,
+) -> StopDocument:
+    stops = create_gtfs_client(source).search_stops_near(
+        lat, lon, radius, with_trips, limit, feed_id
+    )
     return StopDocument.from_dict({"count": stops.size(), "stops": stops})
+
+
+def iter_by_id(
+    source: str, id_: str, with_trips: bool, feed_id: Optional[str] = None
+) -> TIterator[Stop]:
+    return TIterator(create_gtfs_client(source).find_stops_by_id(id_, with_trips, feed_id))
+
+
+def iter_by_word(
+    source: str,
+    word: str,
+    with_trips: bool,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    feed_id: Optional[str] = None,
+) -> TIterator[Stop]:
+    """名称で検索した停留所/標柱を、DBから読み込んだ順に返します. 全件をメモリに展開しません"""
+    return create_gtfs_client(source).search_stops_by_name(word, with_trips, limit, offset, feed_id)
+
+
+def iter_by_location(
+    source: str,
+    lat: float,
+    lon: float,
+    radius: Optional[float],
+    with_trips: bool,
+    limit: Optional[int] = None,
+    feed_id: Optional[str] = None,
+) -> TIterator[Stop]:
+    return TIterator(
+        create_gtfs_client(source).search_stops_near(lat, lon, radius, with_trips, limit, feed_id)
+    )
@@ -0,0 +1,127 @@
+import hashlib
+import heapq
+import json
+import os
+import pickle
+import tempfile
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterable, Iterator, Sequence, Tuple, TypeVar, Union
+
+from gtfsjpcli.utils.iterators import chunked
+
+T = TypeVar("T", dict, list, tuple)
+
+DEFAULT_BUFFER_SIZE = 500000
+"""メモリ上で重複判定する最大件数のデフォルト"""
+
+EMITTED_SEQUENCE = -1
+"""外部ソート時に『ハッシュセットの段階で出力済み』を表す通し番号"""
+
+
+def to_digest(record: Union[dict, Sequence]) -> bytes:
+    """レコードの値から重複判定用のダイジェスト(16byte)を作成する
+
+    同一ファイルのレコードはカラム順が同じなので値だけを対象にしています
+
+    :param record: レコード (辞書、またはCSVの1行の値のリスト)
+    :return: ダイジェスト
+
+    Usage:
+
+        >>> to_digest({"a": "1", "b": ""}) == to_digest({"a": "1", "b": ""})
+        True
+        >>> to_digest({"a": "1", "b": ""}) == to_digest({"a": "1", "b": "2"})
+        False
+        >>> to_digest(["1", ""]) == to_digest({"a": "1", "b": ""})
+        True
+    """
+    values = list(record.values()) if isinstance(record, dict) else list(record)
+    return hashlib.blake2b(json.dumps(values, ensure_ascii=False).encode(), digest_size=16).digest()
+
+
+def drop_duplicates(records: Iterable[T], *, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[T]:
+    """完全重複するレコードを除外する (出現順は維持する)
+
+    ダイジェストをハッシュセットで管理してストリームのまま除外します.
+    件数がbuffer_sizeを超えたら、残りのレコードは一時ファイルを使った外部マージソートで除外します.
+
+    :param records: レコード
+    :param buffer_size: メモリ上に保持するダイジェスト/レコードの最大件数
+    :return: 重複を除外したレコード
+
+    Usage:
+
+        >>> list(drop_duplicates([{"a": "2"}, {"a": "1"}, {"a": "2"}, {"a": "3"}, {"a": "1"}]))
+        [{'a': '2'}, {'a': '1'}, {'a': '3'}]
+        >>> list(drop_duplicates([{"a": "2"}, {"a": "1"}, {"a": "2"}, {"a": "3"}, {"a": "1"}], buffer_size=1))
+        [{'a': '2'}, {'a': '1'}, {'a': '3'}]
+    """
+    if buffer_size < 1:
+        raise ValueError(f"buffer_size must be positive: {buffer_size}")
+
+    it = iter(records)
+    seen = set()
+    for record in it:
+        digest = to_digest(record)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        yield record
+        if len(seen) >= buffer_size:
+            break
+    else:
+        return
+
+    yield from drop_duplicates_externally(it, seen, buffer_size)
+
+
+def drop_duplicates_externally(records: Iterator[T], emitted: set, buffer_size: int) -> Iterator[T]:
+    """ハッシュセットで出力済みのダイジェストを除いて、残りのレコードの重複を外部マージソートで除外する
+
+    :param records: 残りのレコード
+    :param emitted: 出力済みのレコードのダイジェスト (ランに書き出した後に空にします)
+    :param buffer_size: 1つのランに含める最大件数
+    :return: 重複を除外したレコード (出現順)
+    """
+    with tempfile.TemporaryDirectory(prefix="gtfsjp-dedup-") as tmp_dir:
+        # 1. (ダイジェスト, 通し番号)でソートしたランを作成する. 出力済みのダイジェストもランとして扱う
+        runs = [write_run(tmp_dir, sorted((x, EMITTED_SEQUENCE, None) for x in emitted))]
+        emitted.clear()
+        annotated = ((to_digest(x), i, x) for i, x in enumerate(records))
+        runs.extend(
+            write_run(tmp_dir, sorted(chunk, key=itemgetter(0, 1)))
+            for chunk in chunked(annotated, buffer_size)
+        )
+
+        # 2. マージしながらダイジェストごとに最初の1件だけを残す
+        merged = heapq.merge(*[read_run(x) for x in runs], key=itemgetter(0, 1))
+        firsts = (next(group) for _, group in groupby(merged, key=itemgetter(0)))
+        survivors = (x for x in firsts if x[1] != EMITTED_SEQUENCE)
+
+        # 3. 通し番号でソートし直して出現順に戻す
+        seq_runs = [
+            write_run(tmp_dir, sorted(chunk, key=itemgetter(1)))
+            for chunk in chunked(survivors, buffer_size)
+        ]
+        for _, _, record in heapq.merge(*[read_run(x) for x in seq_runs], key=itemgetter(1)):
+            yield record
+
+
+def write_run(tmp_dir: str, items: Iterable[Tuple]) -> str:
+    """ソート済みの要素を一時ファイル(ラン)に書き出して、そのpathを返す"""
+    fd, path = tempfile.mkstemp(dir=tmp_dir, suffix=".run")
+    with os.fdopen(fd, "wb") as f:
+        for item in items:
+            pickle.dump(item, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def read_run(path: str) -> Iterator[Tuple]:
+    """write_run で書き出した要素を順に読み込む"""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
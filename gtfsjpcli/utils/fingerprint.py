@@ -0,0 +1,69 @@
+import hashlib
+import os
+import zipfile
+from datetime import datetime
+from typing import BinaryIO, NamedTuple, Optional
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+class Fingerprint(NamedTuple):
+    """ファイルの内容が変わったかを判定するための情報"""
+
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+def to_fingerprint(path: str, previous: Optional[Fingerprint] = None) -> Fingerprint:
+    """ファイルのFingerprintを作成します
+
+    サイズと更新日時がpreviousと同じ場合は、内容も同じとみなしてハッシュ値の計算を省略します.
+
+    :param path: ファイルのパス
+    :param previous: 前回のFingerprint
+    :return: Fingerprint
+    """
+    stat = os.stat(path)
+    if previous and previous.size == stat.st_size and previous.mtime_ns == stat.st_mtime_ns:
+        return previous
+
+    with open(path, "rb") as f:
+        return Fingerprint(stat.st_size, stat.st_mtime_ns, to_sha256(f))
+
+
+def to_member_fingerprint(
+    zip_path: str, member: str, previous: Optional[Fingerprint] = None
+) -> Fingerprint:
+    """zipファイル内のファイルのFingerprintを作成します
+
+    展開後のサイズと更新日時(zipに記録された値)がpreviousと同じ場合は、展開してハッシュ値を計算するのを省略します.
+
+    :param zip_path: zipファイルのパス
+    :param member: zipファイル内のパス
+    :param previous: 前回のFingerprint
+    :return: Fingerprint
+    """
+    with zipfile.ZipFile(zip_path) as z:
+        info = z.getinfo(member)
+        mtime_ns = int(datetime(*info.date_time).timestamp()) * 1_000_000_000
+        if previous and previous.size == info.file_size and previous.mtime_ns == mtime_ns:
+            return previous
+
+        with z.open(info) as f:
+            return Fingerprint(info.file_size, mtime_ns, to_sha256(f))
+
+
+def to_sha256(f: BinaryIO) -> str:
+    """ストリームを最後まで読み込んでSHA-256のハッシュ値(16進数)を計算します
+
+    Usage:
+
+        >>> import io
+        >>> to_sha256(io.BytesIO(b""))
+        'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855'
+    """
+    sha256 = hashlib.sha256()
+    for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+        sha256.update(chunk)
+    return sha256.hexdigest()
@@ -0,0 +1,84 @@
+import math
+from typing import Optional, Tuple
+
+EARTH_RADIUS_METERS = 6371008.8
+"""地球の平均半径(m)"""
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+"""経線方向に緯度1度あたりの距離(m)"""
+
+
+def to_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """2点間の大円距離(m)をhaversine formulaで計算する
+
+    :param lat1: 1点目の緯度
+    :param lon1: 1点目の経度
+    :param lat2: 2点目の緯度
+    :param lon2: 2点目の経度
+    :return: 距離(m)
+
+    Usage:
+
+        >>> round(to_distance(35.681236, 139.767125, 35.666379, 139.758380))
+        1831
+        >>> to_distance(35.0, 139.0, 35.0, 139.0)
+        0.0
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    h = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(h)))
+
+
+def to_bounding_box(lat: float, lon: float, radius: float) -> Tuple[float, float, float, float]:
+    """中心からradius(m)以内の点を全て含む緯度経度の範囲を計算する
+
+    極に近く経度の範囲が求まらない場合や、範囲が180度経線をまたぐ場合は、経度は全範囲にする
+
+    :param lat: 中心の緯度
+    :param lon: 中心の経度
+    :param radius: 半径(m)
+    :return: (最小緯度, 最大緯度, 最小経度, 最大経度)
+
+    Usage:
+
+        >>> [round(x, 4) for x in to_bounding_box(35.0, 139.0, 1000)]
+        [34.991, 35.009, 138.989, 139.011]
+        >>> to_bounding_box(35.0, 179.999, 1000)[2:]
+        (-180.0, 180.0)
+    """
+    dlat = radius / METERS_PER_DEGREE
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+
+    dlon = math.degrees(
+        math.asin(min(1.0, math.sin(radius / EARTH_RADIUS_METERS) / math.cos(math.radians(lat))))
+    )
+    if lon - dlon < -180 or lon + dlon > 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, lon - dlon, lon + dlon
+
+
+def to_location_option(value: str) -> Optional[Tuple[float, float]]:
+    """緯度と経度をカンマで区切った文字列を (緯度, 経度) にする
+
+    :param value: 緯度,経度 (ex: 35.681236,139.767125)
+    :return: (緯度, 経度). 形式が正しくない場合や範囲外の場合はNone
+
+    Usage:
+
+        >>> to_location_option("35.681236,139.767125")
+        (35.681236, 139.767125)
+        >>> to_location_option("35.681236"), to_location_option("91,0")
+        (None, None)
+    """
+    try:
+        lat, lon = [float(x) for x in value.split(",")]
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
@@ -0,0 +1,31 @@
+from itertools import islice
+from typing import Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """iterableを先頭から最大size件ずつのリストに分割する
+
+    iterableは必要な分だけ遅延評価されるので、巨大なiterableでもメモリ使用量はsize件分に抑えられる
+
+    :param iterable: 分割対象
+    :param size: 1チャンクあたりの最大件数
+    :return: チャンクのイテレータ
+
+    Usage:
+
+        >>> list(chunked([1, 2, 3, 4, 5], 2))
+        [[1, 2], [3, 4], [5]]
+        >>> list(chunked([], 2))
+        []
+    """
+    if size < 1:
+        raise ValueError(f"size must be positive: {size}")
+
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,64 @@
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Dict
+
+LAZY_MODULE_TYPES: Dict[str, type] = {}
+"""lazy_import したモジュール名と、読み込み前のモジュールの型. 読み込むと型が ModuleType に戻ります"""
+
+
+def lazy_import(name: str) -> ModuleType:
+    """モジュールを、属性に初めてアクセスした時に読み込むようにして返す
+
+    一部のコマンドでしか使わない重いモジュール(halo、CSVの読み込み、NumPyなど)で、
+    全てのコマンドの起動が遅くならないようにするために使う. 読み込み済みの場合はそのまま返す
+
+    :param name: モジュール名 (ex: gtfsjpcli.client.loader)
+    :return: モジュール
+
+    Usage:
+
+        >>> colorsys = lazy_import("colorsys")
+        >>> colorsys.rgb_to_hsv(1.0, 0.0, 0.0)
+        (0.0, 1.0, 1.0)
+        >>> lazy_import("colorsys") is colorsys
+        True
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    LAZY_MODULE_TYPES[name] = type(module)
+    return module
+
+
+def is_loaded(name: str) -> bool:
+    """モジュールが実行(読み込み)済みかどうか
+
+    lazy_import したモジュールは、属性にアクセスするまでsys.modulesにあっても実行されていない.
+    lazy_import した時の型のままかどうかで判定する. type() はモジュールの属性にアクセスしないので、確認するだけでは読み込まれない
+
+    :param name: モジュール名 (ex: gtfsjpcli.client.loader)
+    :return: 実行済みの場合はTrue. 読み込んでいない場合や、lazy_import して属性にアクセスしていない場合はFalse
+
+    Usage:
+
+        >>> tabnanny = lazy_import("tabnanny")
+        >>> is_loaded("tabnanny")
+        False
+        >>> tabnanny.verbose
+        0
+        >>> is_loaded("tabnanny")
+        True
+        >>> is_loaded("gtfsjpcli.no_such_module")
+        False
+    """
+    module = sys.modules.get(name)
+    return module is not None and type(module) is not LAZY_MODULE_TYPES.get(name)
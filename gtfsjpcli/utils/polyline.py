@@ -0,0 +1,80 @@
+"""座標列をエンコードした文字列 (Encoded Polyline Algorithm Format)
+
+緯度経度を 10^precision 倍した整数の差分を、5bitずつ印字可能なASCII文字にします.
+GTFSの緯度経度は小数点以下6桁までが一般的なので、既定の精度は6(polyline6)です.
+"""
+
+from typing import Iterable, Iterator, List, Tuple
+
+DEFAULT_PRECISION = 6
+
+
+def encode(points: Iterable[Tuple[float, float]], precision: int = DEFAULT_PRECISION) -> str:
+    """(緯度, 経度)の列をエンコードする
+
+    :param points: (緯度, 経度)の列
+    :param precision: 小数点以下の桁数
+    :return: エンコードした文字列
+
+    Usage:
+
+        >>> encode([(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)], precision=5)
+        '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+        >>> encode([])
+        ''
+    """
+    factor = 10**precision
+    chunks: List[str] = []
+    previous_lat = previous_lon = 0
+    for lat, lon in points:
+        current_lat, current_lon = round(lat * factor), round(lon * factor)
+        append_value(chunks, current_lat - previous_lat)
+        append_value(chunks, current_lon - previous_lon)
+        previous_lat, previous_lon = current_lat, current_lon
+    return "".join(chunks)
+
+
+def append_value(chunks: List[str], value: int):
+    """符号付きの整数を、5bitずつの文字にしてchunksに加える"""
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+
+
+def decode(text: str, precision: int = DEFAULT_PRECISION) -> Iterator[Tuple[float, float]]:
+    """エンコードした文字列を(緯度, 経度)の列に戻す
+
+    値は整数を 10^precision で割って求めるので、エンコード前の値が精度の桁数以内であれば同じ値に戻ります.
+
+    :param text: エンコードした文字列
+    :param precision: 小数点以下の桁数
+    :return: (緯度, 経度)の列
+
+    Usage:
+
+        >>> list(decode('_p~iF~ps|U_ulLnnqC_mqNvxq`@', precision=5))
+        [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        >>> list(decode(encode([(35.679752, 139.76833), (35.681236, 139.767125)])))
+        [(35.679752, 139.76833), (35.681236, 139.767125)]
+    """
+    factor = 10**precision
+    values = decode_values(text)
+    lat = lon = 0
+    for delta_lat in values:
+        lat += delta_lat
+        lon += next(values)
+        yield lat / factor, lon / factor
+
+
+def decode_values(text: str) -> Iterator[int]:
+    """エンコードした文字列を符号付きの整数の列に戻す"""
+    value = shift = 0
+    for char in text:
+        byte = ord(char) - 63
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            yield ~(value >> 1) if value & 1 else value >> 1
+            value = shift = 0
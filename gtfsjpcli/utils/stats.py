@@ -0,0 +1,328 @@
+"""--stats オプションで出力する計測結果
+
+DBの作成ではファイルごとのフェーズ(sniff, parse, convert, insert)の時間と行数を、
+問い合わせでは実行したSQLごとの回数、時間、取得した行数を記録し、最後にピークのメモリ使用量と合わせてJSONで出力します.
+計測は enable() を呼んだ場合だけ行います. 呼んでいない場合、計測箇所は何もしません.
+"""
+
+import json
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, TypeVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+T = TypeVar("T")
+
+OPTION = "--stats"
+TOP_STATEMENTS = 10
+"""レポートに出力するSQLの数 (時間の合計と実行回数それぞれの上位)"""
+
+
+class Stats:
+    """1プロセスでの計測結果. 複数のスレッドから記録できます
+
+    Usage:
+
+        >>> stats = Stats()
+        >>> stats.add_time("stops.txt", "parse", 0.5)
+        >>> stats.add_rows("stops.txt", 100)
+        >>> stats.to_report()["files"]["stops.txt"]
+        {'rows': 100, 'seconds': {'parse': 0.5}, 'rows_per_second': 200}
+    """
+
+    files: Dict[str, Dict[str, float]]
+    """ファイル(フィードIDがある場合は フィードID/ファイル名)と、フェーズごとの時間(秒). rowsは行数"""
+    statements: Dict[str, Dict[str, float]]
+    """SQLと、実行回数(count)、時間の合計(seconds)、取得した行数(rows)"""
+    phases: Dict[str, float]
+    """処理全体のフェーズと時間(秒)"""
+
+    def __init__(self):
+        self.begin = time.perf_counter()
+        self.files = {}
+        self.statements = {}
+        self.phases = {}
+        self.lock = threading.Lock()
+
+    def add_time(self, label: str, phase: str, seconds: float):
+        with self.lock:
+            values = self.files.setdefault(label, {"rows": 0})
+            values[phase] = values.get(phase, 0) + seconds
+
+    def add_rows(self, label: str, rows: int):
+        with self.lock:
+            self.files.setdefault(label, {"rows": 0})["rows"] += rows
+
+    def add_statement(self, statement: str, seconds: float):
+        with self.lock:
+            values = self.statements.setdefault(statement, {"count": 0, "seconds": 0, "rows": 0})
+            values["count"] += 1
+            values["seconds"] += seconds
+
+    def add_fetched_rows(self, statement: str, rows: int):
+        with self.lock:
+            values = self.statements.setdefault(statement, {"count": 0, "seconds": 0, "rows": 0})
+            values["rows"] += rows
+
+    def add_phases(self, laps: Dict[str, float]):
+        with self.lock:
+            for phase, seconds in laps.items():
+                self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def take(self) -> dict:
+        """ファイルとSQLの計測結果を取り出して空にします. ワーカープロセスから親プロセスに渡すために使います"""
+        with self.lock:
+            taken = {"files": self.files, "statements": self.statements}
+            self.files, self.statements = {}, {}
+        return taken
+
+    def merge(self, taken: dict):
+        """take() の結果を加えます"""
+        with self.lock:
+            for key, values in taken["files"].items():
+                merged = self.files.setdefault(key, {"rows": 0})
+                for name, value in values.items():
+                    merged[name] = merged.get(name, 0) + value
+            for key, values in taken["statements"].items():
+                merged = self.statements.setdefault(key, {"count": 0, "seconds": 0, "rows": 0})
+                for name, value in values.items():
+                    merged[name] += value
+
+    def to_report(self) -> dict:
+        statements = [
+            {
+                "statement": k,
+                "count": v["count"],
+                "seconds": round(v["seconds"], 6),
+                "mean_ms": round(v["seconds"] * 1000 / v["count"], 3) if v["count"] else None,
+                "rows": v["rows"],
+            }
+            for k, v in self.statements.items()
+        ]
+        return {
+            "elapsed_seconds": round(time.perf_counter() - self.begin, 3),
+            "peak_rss_bytes": to_peak_rss_bytes(False),
+            "peak_children_rss_bytes": to_peak_rss_bytes(True),
+            "phases": {k: round(v, 3) for k, v in self.phases.items()},
+            "files": {k: to_file_report(v) for k, v in self.files.items()},
+            "sql": {
+                "statements": sum(x["count"] for x in statements),
+                "distinct_statements": len(statements),
+                "seconds": round(sum(x["seconds"] for x in statements), 3),
+                "rows": sum(x["rows"] for x in statements),
+                "slowest": sorted(statements, key=lambda x: -x["seconds"])[:TOP_STATEMENTS],
+                "most_executed": sorted(statements, key=lambda x: -x["count"])[:TOP_STATEMENTS],
+            },
+        }
+
+
+def to_file_report(values: Dict[str, float]) -> dict:
+    seconds = {k: round(v, 3) for k, v in values.items() if k != "rows"}
+    total = sum(v for k, v in values.items() if k != "rows")
+    return {
+        "rows": int(values["rows"]),
+        "seconds": seconds,
+        "rows_per_second": round(values["rows"] / total) if total else None,
+    }
+
+
+def to_peak_rss_bytes(children: bool) -> Optional[int]:
+    """ピーク時のメモリ使用量(RSS). childrenの場合は終了した子プロセスの最大. 取得できない環境ではNone"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # macOSはbyte、それ以外はKB
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+_STATS: Optional[Stats] = None
+_LISTENING = False
+
+
+def enable():
+    """計測を開始します. 既に開始している場合は、それまでの計測結果を捨てて開始し直します"""
+    global _STATS, _LISTENING  # pylint: disable=global-statement
+    _STATS = Stats()
+    if not _LISTENING:
+        listen_engine_events()
+        _LISTENING = True
+
+
+def is_enabled() -> bool:
+    return _STATS is not None
+
+
+def get_stats() -> Optional[Stats]:
+    return _STATS
+
+
+def add_time(label: str, phase: str, seconds: float):
+    if _STATS is not None:
+        _STATS.add_time(label, phase, seconds)
+
+
+def add_rows(label: str, rows: int):
+    if _STATS is not None:
+        _STATS.add_rows(label, rows)
+
+
+def add_phases(laps: Dict[str, float]):
+    if _STATS is not None:
+        _STATS.add_phases(laps)
+
+
+@contextmanager
+def measure(label: Optional[str], phase: str):
+    """with句の中の時間を、ファイルのフェーズの時間に加えます. labelがNoneの場合は記録しません"""
+    if _STATS is None or label is None:
+        yield
+        return
+
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        _STATS.add_time(label, phase, time.perf_counter() - begin)
+
+
+def timed(iterable: Iterable[T], label: Optional[str], phase: str) -> Iterable[T]:
+    """要素を取り出すのにかかった時間を、ファイルのフェーズの時間に加えるイテレータにします
+
+    計測していない場合やlabelがNoneの場合はそのまま返します. 取り出した後の処理(呼び出し元)の時間は含みません.
+    """
+    if _STATS is None or label is None:
+        return iterable
+    return iter_timed(iter(iterable), label, phase)
+
+
+def iter_timed(iterator: Iterator[T], label: str, phase: str) -> Iterator[T]:
+    """timed の本体. 取り出し終えた(または閉じた)時に、かかった時間をまとめて加えます"""
+    seconds = 0.0
+    try:
+        while True:
+            begin = time.perf_counter()
+            try:
+                value = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - begin
+            yield value
+    finally:
+        add_time(label, phase, seconds)
+
+
+class StatsCursor(sqlite3.Cursor):
+    """取得した行数を、最後に実行したSQLに記録するカーソル"""
+
+    stats_statement: Optional[str] = None
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            self.__add_rows(1)
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> List:
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self.__add_rows(len(rows))
+        return rows
+
+    def fetchall(self) -> List:
+        rows = super().fetchall()
+        self.__add_rows(len(rows))
+        return rows
+
+    def __add_rows(self, rows: int):
+        if _STATS is not None and self.stats_statement is not None:
+            _STATS.add_fetched_rows(self.stats_statement, rows)
+
+
+class StatsConnection(sqlite3.Connection):
+    def cursor(self, factory=StatsCursor):  # pylint: disable=arguments-differ
+        return super().cursor(factory)
+
+
+def to_connect_args(connect_args: dict) -> dict:
+    """計測している場合は、取得した行数を数える接続を作るように sqlite3.connect の引数を加えます"""
+    return {**connect_args, "factory": StatsConnection} if _STATS is not None else connect_args
+
+
+def listen_engine_events():
+    """全てのengineで、実行したSQLの時間を記録するようにします"""
+    # pylint: disable=import-outside-toplevel,unused-argument,too-many-arguments
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("stats_begin", []).append(time.perf_counter())
+        if isinstance(cursor, StatsCursor):
+            cursor.stats_statement = to_statement_key(statement)
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["stats_begin"].pop()
+        if _STATS is not None:
+            _STATS.add_statement(to_statement_key(statement), seconds)
+
+
+def to_statement_key(statement: str) -> str:
+    """SQLの空白を詰めて、同じSQLを1つにまとめるためのキーにする
+
+    :param statement: SQL
+    :return: 空白を詰めたSQL
+
+    Usage:
+
+        >>> to_statement_key("SELECT *\\n  FROM stops\\n WHERE stop_id = ?")
+        'SELECT * FROM stops WHERE stop_id = ?'
+    """
+    return " ".join(statement.split())
+
+
+def pop_option(argv: List[str]) -> Optional[str]:
+    """引数から --stats を取り除きます. コマンドの前後どこに指定してもよい
+
+    :param argv: コマンドライン引数 (取り除いたものに書き換えます)
+    :return: 指定されていない場合はNone. --stats=<path> の場合は出力先のpath、--stats だけの場合は空文字(標準エラー出力)
+
+    Usage:
+
+        >>> argv = ["gtfsjp", "get", "agency", "--stats", "tmp.sqlite3"]
+        >>> pop_option(argv), argv
+        ('', ['gtfsjp', 'get', 'agency', 'tmp.sqlite3'])
+        >>> pop_option(["gtfsjp", "--stats=stats.json", "get", "agency"])
+        'stats.json'
+        >>> pop_option(["gtfsjp", "get", "agency"]) is None
+        True
+    """
+    output = None
+    for arg in list(argv[1:]):
+        if arg == OPTION or arg.startswith(f"{OPTION}="):
+            output = arg[len(OPTION) + 1 :]
+            argv.remove(arg)
+    return output
+
+
+def write_report(output: str, command: List[str]):
+    """計測結果をJSONで出力します
+
+    :param output: 出力先のpath. 空文字の場合は標準エラー出力
+    :param command: 実行したコマンド
+    """
+    if _STATS is None:
+        return
+    report = json.dumps({"command": command, **_STATS.to_report()}, indent=2, ensure_ascii=False)
+    if not output:
+        print(report, file=sys.stderr)
+        return
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(report + "\n")
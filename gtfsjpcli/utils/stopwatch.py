@@ -0,0 +1,40 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from owlmixin import TList
+
+
+class Stopwatch:
+    """処理のフェーズごとの経過時間(秒)を計測する
+
+    Usage:
+
+        >>> stopwatch = Stopwatch()
+        >>> with stopwatch.measure("load"):
+        ...     pass
+        >>> list(stopwatch.laps.keys())
+        ['load']
+    """
+
+    laps: Dict[str, float]
+
+    def __init__(self):
+        self.laps = {}
+
+    @contextmanager
+    def measure(self, phase: str):
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.laps[phase] = self.laps.get(phase, 0) + time.perf_counter() - begin
+
+    def total(self) -> float:
+        return sum(self.laps.values())
+
+    def to_table(self) -> str:
+        return TList(
+            [{"phase": k, "seconds": f"{v:.3f}"} for k, v in self.laps.items()]
+            + [{"phase": "total", "seconds": f"{self.total():.3f}"}]
+        ).to_table(["phase", "seconds"])
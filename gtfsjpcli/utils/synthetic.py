@@ -0,0 +1,640 @@
+"""ベンチマークや動作確認用に、架空のGTFS-JPデータを作成する
+
+同じ規模とシードからは、常に同じ内容のファイルを作成します.
+停留所は格子状に並べ、1つの停留所に方向別の標柱を2つ置きます. 系統は格子上を重複せずに進む経路です.
+"""
+
+import csv
+import math
+import os
+import random
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from gtfsjpcli.utils.geo import METERS_PER_DEGREE
+
+
+class Scale(NamedTuple):
+    """作成するデータの規模"""
+
+    stops: int
+    """標柱の数 (停留所の数はこの半分)"""
+    routes: int
+    """系統の数"""
+    trips: int
+    """便の数 (系統に均等に割り振る)"""
+    stops_per_trip: int
+    """1便が停車する標柱の数 (stop_timesの行数は trips * stops_per_trip)"""
+    agencies: int = 1
+    """事業者の数"""
+    languages: Tuple[str, ...] = ("ja-Hrkt", "en")
+    """停留所名を翻訳する言語 (jaは常に作成)"""
+    shape_points_per_stop: int = 3
+    """標柱の間の形状点の数"""
+
+
+SCALES: Dict[str, Scale] = {
+    "small": Scale(stops=200, routes=10, trips=200, stops_per_trip=15),
+    "medium": Scale(stops=5000, routes=200, trips=8000, stops_per_trip=25, agencies=5),
+    "national": Scale(stops=200000, routes=8000, trips=400000, stops_per_trip=30, agencies=200),
+}
+"""名前付きの規模. nationalは全国のデータを1つにまとめた程度"""
+
+FILES: Dict[str, List[str]] = {
+    "agency.txt": [
+        "agency_id",
+        "agency_name",
+        "agency_url",
+        "agency_timezone",
+        "agency_lang",
+        "agency_phone",
+        "agency_fare_url",
+        "agency_email",
+    ],
+    "agency_jp.txt": [
+        "agency_id",
+        "agency_official_name",
+        "agency_zip_number",
+        "agency_address",
+        "agency_president_pos",
+        "agency_president_name",
+    ],
+    "routes.txt": [
+        "route_id",
+        "agency_id",
+        "route_short_name",
+        "route_long_name",
+        "route_desc",
+        "route_type",
+        "route_url",
+        "route_color",
+        "route_text_color",
+        "jp_parent_route_id",
+    ],
+    "routes_jp.txt": [
+        "route_id",
+        "route_update_date",
+        "origin_stop",
+        "via_stop",
+        "destination_stop",
+    ],
+    "trips.txt": [
+        "route_id",
+        "service_id",
+        "trip_id",
+        "trip_headsign",
+        "trip_short_name",
+        "direction_id",
+        "block_id",
+        "shape_id",
+        "wheelchair_accessible",
+        "bikes_allowed",
+        "jp_trip_desc",
+        "jp_trip_desc_symbol",
+        "jp_office_id",
+    ],
+    "office_jp.txt": ["office_id", "office_name", "office_url", "office_phone"],
+    "stops.txt": [
+        "stop_id",
+        "stop_code",
+        "stop_name",
+        "stop_desc",
+        "stop_lat",
+        "stop_lon",
+        "zone_id",
+        "stop_url",
+        "location_type",
+        "parent_station",
+        "stop_timezone",
+        "wheelchair_boarding",
+        "platform_code",
+    ],
+    "stop_times.txt": [
+        "trip_id",
+        "arrival_time",
+        "departure_time",
+        "stop_id",
+        "stop_sequence",
+        "stop_headsign",
+        "pickup_type",
+        "drop_off_type",
+        "shape_dist_traveled",
+        "timepoint",
+    ],
+    "calendar.txt": [
+        "service_id",
+        "monday",
+        "tuesday",
+        "wednesday",
+        "thursday",
+        "friday",
+        "saturday",
+        "sunday",
+        "start_date",
+        "end_date",
+    ],
+    "calendar_dates.txt": ["service_id", "date", "exception_type"],
+    "fare_attributes.txt": [
+        "fare_id",
+        "price",
+        "currency_type",
+        "payment_method",
+        "transfers",
+        "transfer_duration",
+    ],
+    "fare_rules.txt": ["fare_id", "route_id", "origin_id", "destination_id", "contains_id"],
+    "shapes.txt": [
+        "shape_id",
+        "shape_pt_lat",
+        "shape_pt_lon",
+        "shape_pt_sequence",
+        "shape_dist_traveled",
+    ],
+    "feed_info.txt": [
+        "feed_publisher_name",
+        "feed_publisher_url",
+        "feed_lang",
+        "feed_start_date",
+        "feed_end_date",
+        "feed_version",
+    ],
+    "translations.txt": ["trans_id", "lang", "translation"],
+}
+"""作成するファイルと列. GTFS-JPの全てのファイルと列を含みます"""
+
+PLACES = [
+    ("中央", "ちゅうおう", "Chuo"),
+    ("本町", "ほんまち", "Hommachi"),
+    ("栄町", "さかえまち", "Sakaemachi"),
+    ("緑町", "みどりちょう", "Midoricho"),
+    ("旭町", "あさひまち", "Asahimachi"),
+    ("桜台", "さくらだい", "Sakuradai"),
+    ("港", "みなと", "Minato"),
+    ("川端", "かわばた", "Kawabata"),
+    ("山手", "やまて", "Yamate"),
+    ("新田", "しんでん", "Shinden"),
+    ("東", "ひがし", "Higashi"),
+    ("西", "にし", "Nishi"),
+    ("南", "みなみ", "Minami"),
+    ("北", "きた", "Kita"),
+    ("松原", "まつばら", "Matsubara"),
+    ("若葉", "わかば", "Wakaba"),
+]
+SUFFIXES = [
+    ("駅前", "えきまえ", "Station"),
+    ("", "", ""),
+    ("公園", "こうえん", "Park"),
+    ("病院", "びょういん", "Hospital"),
+    ("小学校", "しょうがっこう", "Elementary School"),
+    ("市役所", "しやくしょ", "City Hall"),
+    ("団地", "だんち", "Housing Complex"),
+    ("入口", "いりぐち", "Entrance"),
+]
+"""停留所名の組み合わせ (表記、読み、英語)"""
+NAME_LANGUAGES = ("ja", "ja-Hrkt", "en")
+"""停留所名の表記、読み、英語の言語コード"""
+SERVICES = [("WD", 7), ("SA", 2), ("HD", 1)]
+"""運行日IDと、便を割り振る比率"""
+HOLIDAYS = ["0101", "0112", "0211", "0429", "0503", "0504", "0505", "0720", "1103", "1123"]
+"""平日ダイヤの代わりに休日ダイヤで運行する日"""
+STOP_SPACING_METERS = 400
+"""停留所の間隔(m)"""
+BASE_LOCATION = (35.0, 139.0)
+"""格子の南西の端の緯度経度"""
+FIRST_DEPARTURE = 5 * 3600
+"""始発の時刻(秒)"""
+SERVICE_HOURS = 19
+"""始発から最終便の出発までの時間. 24時を過ぎる便もあります"""
+
+
+class Station(NamedTuple):
+    stop_id: str
+    name: Tuple[str, str, str]
+    lat: float
+    lon: float
+    pole_ids: List[str]
+
+
+def to_time(seconds: int) -> str:
+    """秒をGTFSの時刻(24時以降も可)にする
+
+    :param seconds: 0時からの秒
+    :return: HH:MM:SS
+
+    Usage:
+
+        >>> to_time(3723)
+        '01:02:03'
+        >>> to_time(90000)
+        '25:00:00'
+    """
+    return f"{seconds // 3600:02}:{seconds % 3600 // 60:02}:{seconds % 60:02}"
+
+
+def to_station_name(index: int) -> Tuple[str, str, str]:
+    """停留所の番号から、重複しない停留所名(表記、読み、英語)を作る
+
+    :param index: 停留所の番号
+    :return: 表記、読み、英語
+
+    Usage:
+
+        >>> to_station_name(0)
+        ('中央駅前', 'ちゅうおうえきまえ', 'Chuo Station')
+        >>> to_station_name(17)
+        ('本町', 'ほんまち', 'Hommachi')
+        >>> to_station_name(128)
+        ('中央駅前2', 'ちゅうおうえきまえ2', 'Chuo Station 2')
+    """
+    place = PLACES[index % len(PLACES)]
+    suffix = SUFFIXES[index // len(PLACES) % len(SUFFIXES)]
+    number = index // (len(PLACES) * len(SUFFIXES))
+    names = [place[0] + suffix[0], place[1] + suffix[1], f"{place[2]} {suffix[2]}".strip()]
+    if number:
+        names = [names[0] + str(number + 1), names[1] + str(number + 1), f"{names[2]} {number + 1}"]
+    return names[0], names[1], names[2]
+
+
+def generate_feed(directory: str, scale: Scale, seed: int = 0) -> Dict[str, int]:
+    """架空のGTFS-JPデータをディレクトリに作成する. 既にあるファイルは上書きします
+
+    :param directory: 作成先のディレクトリ (なければ作成)
+    :param scale: 規模
+    :param seed: 乱数のシード
+    :return: ファイル名ごとの行数
+
+    Usage:
+
+        >>> import tempfile
+        >>> with tempfile.TemporaryDirectory() as d:
+        ...     counts = generate_feed(d, Scale(stops=10, routes=2, trips=4, stops_per_trip=3))
+        ...     sorted(os.listdir(d)) == sorted(FILES)
+        True
+        >>> counts["stops.txt"], counts["trips.txt"], counts["stop_times.txt"]
+        (15, 4, 12)
+    """
+    if scale.stops < 4 or scale.routes < 1 or scale.stops_per_trip < 2 or scale.agencies < 1:
+        raise ValueError(f"Too small scale: {scale}")
+
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    width = math.ceil(math.sqrt(math.ceil(scale.stops / 2)))
+    stations = to_stations(rng, scale.stops, width)
+    agency_ids = [f"A{i + 1}" for i in range(scale.agencies)]
+    year = "2026"
+    start_date, end_date = f"{year}0101", f"{year}1231"
+
+    rows: Dict[str, Iterator[Sequence]] = {
+        "agency.txt": (
+            (
+                x,
+                f"合成バス{i + 1}",
+                f"https://example.com/{x}",
+                "Asia/Tokyo",
+                "ja",
+                f"03-0000-{i:04}",
+                f"https://example.com/{x}/fare",
+                f"info@{x.lower()}.example.com",
+            )
+            for i, x in enumerate(agency_ids)
+        ),
+        "agency_jp.txt": (
+            (
+                x,
+                f"合成交通株式会社{i + 1}",
+                f"{1000000 + i}",
+                "東京都千代田区",
+                "代表取締役",
+                "山田太郎",
+            )
+            for i, x in enumerate(agency_ids)
+        ),
+        "office_jp.txt": (
+            (f"O{i + 1}", f"合成バス{i + 1}営業所", "", f"03-0001-{i:04}")
+            for i in range(scale.agencies)
+        ),
+        "stops.txt": to_stop_rows(stations),
+        "calendar.txt": (
+            ("WD", 1, 1, 1, 1, 1, 0, 0, start_date, end_date),
+            ("SA", 0, 0, 0, 0, 0, 1, 0, start_date, end_date),
+            ("HD", 0, 0, 0, 0, 0, 0, 1, start_date, end_date),
+        ),
+        "calendar_dates.txt": (
+            row
+            for x in HOLIDAYS
+            for row in (("WD", year + x, 2), ("SA", year + x, 2), ("HD", year + x, 1))
+        ),
+        "fare_attributes.txt": (
+            (f"F_{x}", x, "JPY", 0, 0, "")
+            for x in sorted({to_price(x) for x in range(1, scale.stops_per_trip)})
+        ),
+        "feed_info.txt": (
+            ("合成バス", "https://example.com", "ja", start_date, end_date, f"synthetic-{seed}"),
+        ),
+        "translations.txt": (
+            (x.name[0], lang, translation)
+            for x in stations
+            for lang, translation in zip(NAME_LANGUAGES, x.name)
+            if lang == "ja" or lang in scale.languages
+        ),
+    }
+    counts = {name: write_rows(directory, name, values) for name, values in rows.items()}
+    counts.update(write_routes(directory, rng, scale, stations, width, agency_ids))
+    return {x: counts[x] for x in FILES}
+
+
+def to_stations(rng: random.Random, stops: int, width: int) -> List[Station]:
+    lat_step = STOP_SPACING_METERS / METERS_PER_DEGREE
+    lon_step = lat_step / math.cos(math.radians(BASE_LOCATION[0]))
+    stations = []
+    for index in range(math.ceil(stops / 2)):
+        row, column = divmod(index, width)
+        stop_id = str(index + 1)
+        stations.append(
+            Station(
+                stop_id,
+                to_station_name(index),
+                BASE_LOCATION[0] + (row + rng.uniform(-0.1, 0.1)) * lat_step,
+                BASE_LOCATION[1] + (column + rng.uniform(-0.1, 0.1)) * lon_step,
+                [f"{stop_id}_{x + 1:02}" for x in range(min(2, stops - index * 2))],
+            )
+        )
+    return stations
+
+
+def to_stop_rows(stations: List[Station]) -> Iterator[Sequence]:
+    for x in stations:
+        yield (
+            x.stop_id,
+            "",
+            x.name[0],
+            "",
+            f"{x.lat:.6f}",
+            f"{x.lon:.6f}",
+            "",
+            "",
+            1,
+            "",
+            "",
+            "",
+            "",
+        )
+        for i, pole_id in enumerate(x.pole_ids):
+            yield (
+                pole_id,
+                pole_id,
+                x.name[0],
+                f"{i + 1}番のりば",
+                f"{x.lat + (i - 0.5) * 0.0001:.6f}",
+                f"{x.lon:.6f}",
+                f"Z{pole_id}",
+                "",
+                0,
+                x.stop_id,
+                "",
+                1,
+                str(i + 1),
+            )
+
+
+def to_price(hops: int) -> int:
+    """乗車する区間数から運賃を決める"""
+    return 180 + 30 * (hops // 3)
+
+
+def to_path(rng: random.Random, stations: int, width: int, length: int) -> List[int]:
+    """格子上を、同じ停留所を通らずに上下左右に進む経路. 行き詰まった場合はやり直して最も長いものを返します"""
+    best: List[int] = []
+    for _ in range(20):
+        path = [rng.randrange(stations)]
+        visited = set(path)
+        direction = rng.choice([(0, 1), (1, 0), (0, -1), (-1, 0)])
+        while len(path) < length:
+            if rng.random() < 0.3:
+                direction = rng.choice([(0, 1), (1, 0), (0, -1), (-1, 0)])
+            row, column = divmod(path[-1], width)
+            candidates = [direction] + [(0, 1), (1, 0), (0, -1), (-1, 0)]
+            for d_row, d_column in candidates:
+                next_row, next_column = row + d_row, column + d_column
+                index = next_row * width + next_column
+                if (
+                    0 <= next_row
+                    and 0 <= next_column < width
+                    and index < stations
+                    and index not in visited
+                ):
+                    direction = (d_row, d_column)
+                    break
+            else:
+                break
+            path.append(index)
+            visited.add(index)
+        if len(path) > len(best):
+            best = path
+        if len(best) >= length:
+            break
+    return best
+
+
+def write_routes(
+    directory: str,
+    rng: random.Random,
+    scale: Scale,
+    stations: List[Station],
+    width: int,
+    agency_ids: List[str],
+) -> Dict[str, int]:
+    """系統ごとに関係するファイル(routes, routes_jp, trips, stop_times, fare_rules, shapes)を作成します"""
+    names = [
+        "routes.txt",
+        "routes_jp.txt",
+        "trips.txt",
+        "stop_times.txt",
+        "fare_rules.txt",
+        "shapes.txt",
+    ]
+    files = {
+        x: open(os.path.join(directory, x), "w", encoding="utf_8_sig", newline="") for x in names
+    }
+    try:
+        writers = {x: csv.writer(f) for x, f in files.items()}
+        counts = {x: 0 for x in names}
+
+        def write(name: str, values: Sequence):
+            writers[name].writerow(values)
+            counts[name] += 1
+
+        for name in names:
+            writers[name].writerow(FILES[name])
+
+        trips_per_route, rest = divmod(scale.trips, scale.routes)
+        for r in range(scale.routes):
+            route_id = f"R{r + 1}"
+            agency_index = r % len(agency_ids)
+            path = to_path(rng, len(stations), width, scale.stops_per_trip)
+            origin, destination = stations[path[0]], stations[path[-1]]
+            write(
+                "routes.txt",
+                (
+                    route_id,
+                    agency_ids[agency_index],
+                    f"{r + 1}系統",
+                    f"{origin.name[0]}～{destination.name[0]}",
+                    "",
+                    3,
+                    "",
+                    f"{rng.randrange(0x1000000):06X}",
+                    "FFFFFF",
+                    f"P{r // 2 + 1}",
+                ),
+            )
+            write(
+                "routes_jp.txt",
+                (
+                    route_id,
+                    "20260101",
+                    origin.name[0],
+                    stations[path[len(path) // 2]].name[0],
+                    destination.name[0],
+                ),
+            )
+
+            # 区間ごとの所要時間(秒)は系統で固定. 方向1は方向0の逆順に、反対側の標柱に停車する
+            seconds = [rng.randrange(60, 181) for _ in path[1:]]
+            directions = []
+            for direction, pattern in enumerate([path, path[::-1]]):
+                poles = [
+                    stations[x].pole_ids[min(direction, len(stations[x].pole_ids) - 1)]
+                    for x in pattern
+                ]
+                distances = to_distances(stations, pattern)
+                directions.append(
+                    (pattern, poles, seconds[::-1] if direction else seconds, distances)
+                )
+
+                shape_id = f"{route_id}_{direction}"
+                for i, (lat, lon, distance) in enumerate(
+                    to_shape_points(stations, pattern, distances, scale.shape_points_per_stop)
+                ):
+                    write("shapes.txt", (shape_id, lat, lon, i, distance))
+                zones = [f"Z{x}" for x in poles]
+                for hops, zone in enumerate(zones[1:], 1):
+                    write("fare_rules.txt", (f"F_{to_price(hops)}", route_id, zones[0], zone, ""))
+
+            count = trips_per_route + (1 if r < rest else 0)
+            services = to_services(math.ceil(count / 2))
+            for t in range(count):
+                direction = t % 2
+                pattern, poles, segments, distances = directions[direction]
+                trip_id = f"{route_id}_{t + 1}"
+                service_id, index, size = services[t // 2]
+                write(
+                    "trips.txt",
+                    (
+                        route_id,
+                        service_id,
+                        trip_id,
+                        stations[pattern[-1]].name[0],
+                        "",
+                        direction,
+                        f"{route_id}_B{t // 2 % 4 + 1}",
+                        f"{route_id}_{direction}",
+                        1,
+                        2,
+                        "快速" if t % 10 == 9 else "",
+                        "快" if t % 10 == 9 else "",
+                        f"O{agency_index + 1}",
+                    ),
+                )
+                time = FIRST_DEPARTURE + index * (SERVICE_HOURS * 3600 // size) + rng.randrange(300)
+                for i, pole_id in enumerate(poles):
+                    if i:
+                        time += segments[i - 1]
+                    dwell = 20 if 0 < i < len(poles) - 1 else 0
+                    write(
+                        "stop_times.txt",
+                        (
+                            trip_id,
+                            to_time(time),
+                            to_time(time + dwell),
+                            pole_id,
+                            i + 1,
+                            "",
+                            1 if i == len(poles) - 1 else 0,
+                            1 if i == 0 else 0,
+                            distances[i],
+                            1,
+                        ),
+                    )
+                    time += dwell
+        return counts
+    finally:
+        for f in files.values():
+            f.close()
+
+
+def to_services(count: int) -> List[Tuple[str, int, int]]:
+    """往復の便を比率に応じて運行日IDに割り振る. 運行日IDごとに1日を通して等間隔に走るようにします
+
+    :param count: 往復の数
+    :return: 往復ごとの (運行日ID, 運行日ID内の順番, 運行日IDの往復の数)
+
+    Usage:
+
+        >>> to_services(4)
+        [('WD', 0, 3), ('WD', 1, 3), ('WD', 2, 3), ('SA', 0, 1)]
+    """
+    total = sum(x[1] for x in SERVICES)
+    services = []
+    begin = cumulative = 0
+    for service_id, weight in SERVICES:
+        cumulative += weight
+        end = round(count * cumulative / total)
+        services.extend((service_id, i, end - begin) for i in range(end - begin))
+        begin = end
+    return services
+
+
+def to_distances(stations: List[Station], pattern: List[int]) -> List[int]:
+    """起点からの距離(m)"""
+    distances = [0]
+    for a, b in zip(pattern, pattern[1:]):
+        distances.append(
+            distances[-1]
+            + round(
+                math.hypot(
+                    (stations[a].lat - stations[b].lat) * METERS_PER_DEGREE,
+                    (stations[a].lon - stations[b].lon)
+                    * METERS_PER_DEGREE
+                    * math.cos(math.radians(stations[a].lat)),
+                )
+            )
+        )
+    return distances
+
+
+def to_shape_points(
+    stations: List[Station], pattern: List[int], distances: List[int], points_per_stop: int
+) -> Iterator[Tuple[str, str, Optional[int]]]:
+    """標柱の間を直線で補間した形状点 (緯度, 経度, 起点からの距離)"""
+    for i, (a, b) in enumerate(zip(pattern, pattern[1:])):
+        for k in range(max(1, points_per_stop)):
+            ratio = k / max(1, points_per_stop)
+            yield (
+                f"{stations[a].lat + (stations[b].lat - stations[a].lat) * ratio:.6f}",
+                f"{stations[a].lon + (stations[b].lon - stations[a].lon) * ratio:.6f}",
+                round(distances[i] + (distances[i + 1] - distances[i]) * ratio),
+            )
+    last = stations[pattern[-1]]
+    yield f"{last.lat:.6f}", f"{last.lon:.6f}", distances[-1]
+
+
+def write_rows(directory: str, name: str, rows: Iterator[Sequence]) -> int:
+    """ヘッダと行をCSVで書き込み、行数を返す"""
+    count = 0
+    with open(os.path.join(directory, name), "w", encoding="utf_8_sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FILES[name])
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
@@ -0,0 +1,145 @@
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+
+DAY_SECONDS = 24 * 60 * 60
+"""1日の秒数. 前日の運行日の24時以降の時刻と比較する時に使う"""
+TIME_OPTION_PATTERN = re.compile(r"^\d{1,2}:\d{2}(:\d{2})?$")
+DATE_TEXT_PATTERN = re.compile(r"^\d{8}$")
+
+
+def to_seconds(time_text: Optional[str]) -> Optional[int]:
+    """HH:MM:SS形式の時刻を、運行日の0時からの秒数にする
+
+    24時以降の時刻(25:01:00など)も、そのまま24時間を超える秒数にする
+
+    :param time_text: HH:MM:SS形式の時刻 (時は1桁でもよい)
+    :return: 秒数. time_textがNoneの場合はNone
+
+    Usage:
+
+        >>> to_seconds("7:00:00")
+        25200
+        >>> to_seconds("25:01:00")
+        90060
+        >>> to_seconds(None) is None
+        True
+    """
+    if time_text is None:
+        return None
+    hours, minutes, seconds = time_text.strip().split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def to_time_text(seconds: Optional[int]) -> Optional[str]:
+    """運行日の0時からの秒数をHH:MM:SS形式の時刻にする. 時は2桁にそろえる
+
+    :param seconds: 秒数
+    :return: HH:MM:SS形式の時刻. secondsがNoneの場合はNone
+
+    Usage:
+
+        >>> to_time_text(25200)
+        '07:00:00'
+        >>> to_time_text(90060)
+        '25:01:00'
+    """
+    if seconds is None:
+        return None
+    return f"{seconds // 3600:02}:{seconds % 3600 // 60:02}:{seconds % 60:02}"
+
+
+def to_coordinate(text: Optional[str]) -> Optional[float]:
+    """緯度/経度の文字列を実数にする
+
+    :param text: 緯度/経度 (ex: 35.681236)
+    :return: 実数. textがNoneの場合はNone
+
+    Usage:
+
+        >>> to_coordinate(" 35.681236")
+        35.681236
+    """
+    return float(text) if text is not None else None
+
+
+def to_coordinate_text(value: Optional[float]) -> Optional[str]:
+    """実数の緯度/経度を文字列にする. 元の文字列と同じ値になる最短の表現を使う (末尾の0は残らない)
+
+    0に近い値でも指数表記(1e-05など)にはしない
+
+    :param value: 緯度/経度
+    :return: 文字列. valueがNoneの場合はNone
+
+    Usage:
+
+        >>> to_coordinate_text(139.767125)
+        '139.767125'
+        >>> to_coordinate_text(35.00355)
+        '35.00355'
+        >>> to_coordinate_text(1e-05)
+        '0.00001'
+        >>> to_coordinate_text(-0.000123)
+        '-0.000123'
+    """
+    if value is None:
+        return None
+    text = repr(value)
+    return format(Decimal(text), "f") if "e" in text else text
+
+
+def to_previous_date(date_text: str) -> str:
+    """YYYYMMDD形式の日付の前日
+
+    :param date_text: YYYYMMDD形式の日付
+    :return: YYYYMMDD形式の前日
+
+    Usage:
+
+        >>> to_previous_date("20240301")
+        '20240229'
+        >>> to_previous_date("20250101")
+        '20241231'
+    """
+    return (datetime.strptime(date_text, "%Y%m%d") - timedelta(days=1)).strftime("%Y%m%d")
+
+
+def to_time_option(value: str) -> Optional[str]:
+    """コマンドで指定された HH:MM または HH:MM:SS形式の時刻を、HH:MM:SS形式にする
+
+    :param value: 時刻
+    :return: HH:MM:SS形式の時刻. 形式が正しくない場合はNone
+
+    Usage:
+
+        >>> to_time_option("8:30")
+        '8:30:00'
+        >>> to_time_option("25:01:00")
+        '25:01:00'
+        >>> to_time_option("8") is None
+        True
+    """
+    if not TIME_OPTION_PATTERN.match(value):
+        return None
+    return value if value.count(":") == 2 else f"{value}:00"
+
+
+def is_date_text(value: str) -> bool:
+    """YYYYMMDD形式の日付かどうか
+
+    :param value: 日付
+    :return: 形式が正しく、存在する日付の場合はTrue
+
+    Usage:
+
+        >>> is_date_text("20240229"), is_date_text("20230229"), is_date_text("2024-02-29")
+        (True, False, False)
+    """
+    if not DATE_TEXT_PATTERN.match(value):
+        return False
+    try:
+        datetime.strptime(value, "%Y%m%d")
+    except ValueError:
+        return False
+    return True
@@ -30,6 +30,7 @@ setup(
     maintainer_email="__youraddress",
     packages=find_packages(exclude=["tests*"]),
     install_requires=requirements,
+    extras_require={"snapshot": ["numpy"]},
     entry_points={"console_scripts": ["gtfsjp = gtfsjpcli.main:main"]},
     classifiers=["Programming Language :: Python", "Programming Language :: Python :: 3"],
 )